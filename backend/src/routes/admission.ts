@@ -6,6 +6,7 @@ import { exportToExcel } from '../services/exportService';
 import { getCompare } from '../services/compareService';
 import { getScoreRankMapping } from '../services/scoreRankService';
 import { getUniversityByName, searchUniversities, getAllUniversities } from '../services/universityService';
+import { autocomplete, AutocompleteKind } from '../services/autocompleteService';
 import prisma from '../utils/database';
 
 const router = Router();
@@ -43,11 +44,12 @@ router.post('/export', async (req, res) => {
 // 统计接口
 router.get('/stats', async (req, res) => {
   try {
-    const { year, major, schoolLocation } = req.query;
+    const { year, major, schoolLocation, subjectCategory } = req.query;
     const result = await getStats(
       year ? Number(year) : undefined,
       major as string,
-      schoolLocation as string
+      schoolLocation as string,
+      subjectCategory as string
     );
     res.json(result);
   } catch (error) {
@@ -119,7 +121,7 @@ router.get('/locations', async (req, res) => {
 // 分数位次映射接口
 router.get('/score-rank-mapping', async (req, res) => {
   try {
-    const { year, score, rank } = req.query;
+    const { year, score, rank, category } = req.query;
     if (!year) {
       return res.status(400).json({ error: '年份参数必填' });
     }
@@ -127,7 +129,8 @@ router.get('/score-rank-mapping', async (req, res) => {
     const result = await getScoreRankMapping(
       Number(year),
       score !== undefined ? Number(score) : undefined,
-      rank !== undefined ? Number(rank) : undefined
+      rank !== undefined ? Number(rank) : undefined,
+      category ? String(category) : undefined
     );
     res.json(result);
   } catch (error) {
@@ -170,6 +173,29 @@ router.get('/universities/search', async (req, res) => {
   }
 });
 
+// 院校、专业输入联想（支持名称、全拼、拼音首字母和简称，如 zjdx、浙大）
+router.get('/autocomplete', async (req, res) => {
+  try {
+    const { q, kind, limit = '10' } = req.query;
+    if (!q || typeof q !== 'string') {
+      return res.status(400).json({ error: '输入内容必填' });
+    }
+    if (kind !== undefined && kind !== 'university' && kind !== 'major') {
+      return res.status(400).json({ error: 'kind 只能为 university 或 major' });
+    }
+
+    const items = await autocomplete(
+      q,
+      kind as AutocompleteKind | undefined,
+      Math.min(Math.max(Number(limit) || 10, 1), 50)
+    );
+    res.json(items);
+  } catch (error) {
+    console.error('输入联想错误:', error);
+    res.status(500).json({ error: '输入联想失败' });
+  }
+});
+
 // 获取所有高校列表
 router.get('/universities', async (req, res) => {
   try {
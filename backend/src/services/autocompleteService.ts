@@ -0,0 +1,71 @@
+import prisma from '../utils/database';
+import { readIfFresh } from '../utils/derivedTables';
+
+// 输入联想表（scripts/autocomplete_index.py 生成）：名称、全拼、拼音首字母、简称 -> 名称
+const AUTOCOMPLETE_TABLE = 'autocomplete_terms';
+
+export type AutocompleteKind = 'university' | 'major';
+
+const ALL_KINDS: AutocompleteKind[] = ['university', 'major'];
+
+export interface AutocompleteItem {
+  kind: AutocompleteKind;
+  name: string;
+}
+
+// 输入规范化（与 autocomplete_index.normalize_query 一致）：去掉空格和拼音分隔符，转小写
+const normalizeQuery = (text: string) => text.replace(/[\s']/g, '').toLowerCase();
+
+// LIKE 前缀匹配时转义通配符
+const escapeLike = (text: string) => text.replace(/[\\%_]/g, (c) => `\\${c}`);
+
+export async function autocomplete(
+  query: string,
+  kind?: AutocompleteKind,
+  limit: number = 10
+): Promise<AutocompleteItem[]> {
+  const prefix = normalizeQuery(query);
+  if (!prefix) {
+    return [];
+  }
+  const kinds = kind ? [kind] : ALL_KINDS;
+
+  // (kind, term text_pattern_ops) 索引上的前缀范围扫描
+  const result = await readIfFresh<[AutocompleteItem[]]>(AUTOCOMPLETE_TABLE, [AUTOCOMPLETE_TABLE], () => [
+    prisma.$queryRaw`
+      SELECT kind, name
+      FROM autocomplete_terms
+      WHERE kind = ANY(${kinds}) AND term LIKE ${escapeLike(prefix) + '%'}
+      GROUP BY kind, name
+      ORDER BY MAX(weight) DESC, name
+      LIMIT ${limit}
+    `
+  ]);
+  if (result) {
+    return result[0];
+  }
+
+  // 联想表尚未生成或已过期（数据刚导入）时按名称包含匹配，不支持拼音和简称
+  const items: AutocompleteItem[] = [];
+  if (kinds.includes('university')) {
+    const universities = await prisma.admissionData.findMany({
+      where: { universityName: { contains: query.trim(), mode: 'insensitive' } },
+      select: { universityName: true },
+      distinct: ['universityName'],
+      orderBy: { universityName: 'asc' },
+      take: limit
+    });
+    items.push(...universities.map((u) => ({ kind: 'university' as const, name: u.universityName })));
+  }
+  if (kinds.includes('major')) {
+    const majors = await prisma.admissionData.findMany({
+      where: { major: { contains: query.trim(), mode: 'insensitive' } },
+      select: { major: true },
+      distinct: ['major'],
+      orderBy: { major: 'asc' },
+      take: limit
+    });
+    items.push(...majors.map((m) => ({ kind: 'major' as const, name: m.major })));
+  }
+  return items.slice(0, limit);
+}
@@ -1,14 +1,82 @@
 import prisma from '../utils/database';
+import { readIfFresh } from '../utils/derivedTables';
+
+// 一分一段表（scripts/score_rank_table.py 生成）及其中不分科类的汇总行
+const SCORE_RANK_TABLE = 'score_rank_table';
+const ALL_CATEGORIES = '全部';
+
+type ScoreRankPoint = { score: number; rank: number };
+
+// 在一分一段表中取给定分数（或位次）两侧最近的两行，按主键/位次索引各读一行；
+// 一分一段表未生成或已过期时返回 null
+async function lookupScoreRankTable(
+  year: number,
+  category: string,
+  score?: number,
+  rank?: number
+): Promise<ScoreRankPoint | undefined | null> {
+  const byScore = score !== undefined;
+  const target = byScore ? score : rank ?? 0;
+  const key: keyof ScoreRankPoint = byScore ? 'score' : 'rank';
+
+  const read = () => byScore
+    ? prisma.$queryRaw`
+      (SELECT score, rank FROM score_rank_table
+       WHERE year = ${year} AND category = ${category} AND score <= ${score}
+       ORDER BY score DESC LIMIT 1)
+      UNION ALL
+      (SELECT score, rank FROM score_rank_table
+       WHERE year = ${year} AND category = ${category} AND score > ${score}
+       ORDER BY score ASC LIMIT 1)
+    `
+    : prisma.$queryRaw`
+      (SELECT score, rank FROM score_rank_table
+       WHERE year = ${year} AND category = ${category} AND rank <= ${rank}
+       ORDER BY rank DESC, score ASC LIMIT 1)
+      UNION ALL
+      (SELECT score, rank FROM score_rank_table
+       WHERE year = ${year} AND category = ${category} AND rank > ${rank}
+       ORDER BY rank ASC, score DESC LIMIT 1)
+    `;
+
+  const result = await readIfFresh<[ScoreRankPoint[]]>(SCORE_RANK_TABLE, [SCORE_RANK_TABLE], () => [read()]);
+  if (!result) {
+    return null;
+  }
+  const [rows] = result;
+
+  // 两侧等距时取前一行（分数更低/位次更靠前），与原来的逐条比较一致
+  return rows.reduce<ScoreRankPoint | undefined>((closest, row) => {
+    if (!closest) return row;
+    return Math.abs(row[key] - target) < Math.abs(closest[key] - target) ? row : closest;
+  }, undefined);
+}
 
 // 根据分数获取位次，或根据位次获取分数
-export async function getScoreRankMapping(year: number, score?: number, rank?: number) {
+export async function getScoreRankMapping(
+  year: number,
+  score?: number,
+  rank?: number,
+  category?: string
+) {
   try {
+    if (score !== undefined || rank !== undefined) {
+      const point = await lookupScoreRankTable(year, category || ALL_CATEGORIES, score, rank);
+      if (point !== null) {
+        return point ?? {};
+      }
+    }
+
+    // 一分一段表尚未生成或已过期（数据刚导入）时，直接扫描当年的录取数据
+    const categoryFilter = category && category !== ALL_CATEGORIES ? { category } : {};
+
     // 如果提供了分数，查询对应的位次
     if (score !== undefined) {
       // 查询该分数附近的所有记录，找到最接近的位次
       const records = await prisma.admissionData.findMany({
         where: {
           year,
+          ...categoryFilter,
           minScore: {
             not: null
           },
@@ -50,6 +118,7 @@ export async function getScoreRankMapping(year: number, score?: number, rank?: n
       const records = await prisma.admissionData.findMany({
         where: {
           year,
+          ...categoryFilter,
           minScore: {
             not: null
           },
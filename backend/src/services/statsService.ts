@@ -1,6 +1,85 @@
 import prisma from '../utils/database';
+import { readIfFresh } from '../utils/derivedTables';
+
+// 统计汇总表（scripts/stats_tables.py 生成），不筛选某一维度时读取该维度的汇总行
+const STATS_TABLES = 'stats_summary';
+const ALL_YEARS = 0;
+const ALL_VALUES = '全部';
+
+const STATS_SUMMARY_TABLES = ['stats_summary_totals', 'stats_summary_scores', 'stats_summary_majors'];
+
+type ScoreRow = { score: number; count: number };
+type LocationRow = { location: string; count: number };
+type MajorRow = { major: string; count: number };
+type YearRow = { year: number; score_sum: number; score_count: number };
+
+// 从统计汇总表读取四项统计，每项都是按主键前缀的范围读取；汇总表未生成或已过期时返回 null
+const getStatsFromSummary = async (year?: number, schoolLocation?: string, subjectCategory?: string) => {
+  const y = year || ALL_YEARS;
+  const location = schoolLocation || ALL_VALUES;
+  const discipline = subjectCategory || ALL_VALUES;
+
+  const result = await readIfFresh<[ScoreRow[], LocationRow[], MajorRow[], YearRow[]]>(
+    STATS_TABLES, STATS_SUMMARY_TABLES, () => [
+      prisma.$queryRaw`
+        SELECT min_score AS score, row_count AS count
+        FROM stats_summary_scores
+        WHERE year = ${y} AND school_location = ${location} AND subject_category = ${discipline}
+        ORDER BY min_score
+      `,
+      prisma.$queryRaw`
+        SELECT school_location AS location, row_count AS count
+        FROM stats_summary_totals
+        WHERE year = ${y} AND subject_category = ${discipline}
+          AND school_location <> ${ALL_VALUES}
+          AND (${location} = ${ALL_VALUES} OR school_location = ${location})
+        ORDER BY row_count DESC
+      `,
+      prisma.$queryRaw`
+        SELECT major, row_count AS count
+        FROM stats_summary_majors
+        WHERE year = ${y} AND school_location = ${location} AND subject_category = ${discipline}
+        ORDER BY position
+      `,
+      prisma.$queryRaw`
+        SELECT year, score_sum::float8 AS score_sum, score_count
+        FROM stats_summary_totals
+        WHERE school_location = ${location} AND subject_category = ${discipline}
+          AND year <> ${ALL_YEARS}
+          AND (${y} = ${ALL_YEARS} OR year = ${y})
+        ORDER BY year
+      `
+    ]);
+  if (!result) {
+    return null;
+  }
+  const [scoreDistribution, locationStats, majorStats, yearlyTrend] = result;
+
+  return {
+    scoreDistribution,
+    locationStats,
+    majorStats,
+    yearlyTrend: yearlyTrend.map((item) => ({
+      year: item.year,
+      avgScore: Math.round(item.score_count ? item.score_sum / item.score_count : 0)
+    }))
+  };
+};
+
+export const getStats = async (
+  year?: number,
+  major?: string,
+  schoolLocation?: string,
+  subjectCategory?: string
+) => {
+  // 按专业名称模糊筛选无法预先聚合；汇总表未生成或已过期（数据刚导入）时也使用实时查询
+  if (!major) {
+    const summary = await getStatsFromSummary(year, schoolLocation, subjectCategory);
+    if (summary) {
+      return summary;
+    }
+  }
 
-export const getStats = async (year?: number, major?: string, schoolLocation?: string) => {
   const where: any = {};
 
   if (year) {
@@ -18,6 +97,10 @@ export const getStats = async (year?: number, major?: string, schoolLocation?: s
     where.schoolLocation = schoolLocation;
   }
 
+  if (subjectCategory) {
+    where.subjectCategory = subjectCategory;
+  }
+
   // 分数分布
   const scoreDistribution = await prisma.admissionData.groupBy({
     by: ['minScore'],
@@ -79,14 +162,19 @@ export const getStats = async (year?: number, major?: string, schoolLocation?: s
       score: item.minScore || 0,
       count: item._count.minScore
     })),
-    locationStats: locationStats.map((item) => ({
-      location: item.schoolLocation,
-      count: item._count.schoolLocation
-    })),
-    majorStats: majorStats.map((item) => ({
-      major: item.major,
-      count: item._count.major
-    })),
+    // 地区/专业为空的分组计数为0，汇总表中也不含这些分组，两条路径返回一致
+    locationStats: locationStats
+      .filter((item) => item.schoolLocation != null)
+      .map((item) => ({
+        location: item.schoolLocation,
+        count: item._count.schoolLocation
+      })),
+    majorStats: majorStats
+      .filter((item) => item.major != null)
+      .map((item) => ({
+        major: item.major,
+        count: item._count.major
+      })),
     yearlyTrend: yearlyTrend.map((item) => ({
       year: item.year,
       avgScore: Math.round(item._avg.minScore || 0)
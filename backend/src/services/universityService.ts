@@ -1,4 +1,8 @@
 import prisma from '../utils/database';
+import { readIfFresh } from '../utils/derivedTables';
+
+// 高校详情汇总（scripts/university_summary.py 生成），每所高校一行完整的详情
+const UNIVERSITY_SUMMARY_TABLE = 'university_summary';
 
 export interface UniversityDetail {
   basicInfo: {
@@ -56,6 +60,22 @@ export interface UniversityDetail {
 }
 
 export async function getUniversityByName(name: string): Promise<UniversityDetail | null> {
+  // 汇总表与当前数据版本一致时按主键读取一行；未生成或已过期（数据刚导入）时实时查询
+  const result = await readIfFresh<[Array<{ document: UniversityDetail }>]>(
+    UNIVERSITY_SUMMARY_TABLE, [UNIVERSITY_SUMMARY_TABLE], () => [
+      prisma.$queryRaw`
+        SELECT document FROM university_summary WHERE university_name = ${name}
+      `
+    ]);
+  if (result) {
+    const [summary] = result;
+    return summary[0]?.document ?? null;
+  }
+
+  return getUniversityByNameLive(name);
+}
+
+async function getUniversityByNameLive(name: string): Promise<UniversityDetail | null> {
   // 查询基础信息
   const basicInfoData = await prisma.admissionData.findFirst({
     where: { universityName: name },
@@ -0,0 +1,50 @@
+import { Prisma } from '@prisma/client';
+import prisma from './database';
+
+// 派生表（由 scripts/derived_tables.py 预计算）的读取：
+// 派生表记录的数据版本等于 admission_data 当前版本时才可使用，否则调用方改用实时查询。
+// 版本检查与读取在同一个可重复读事务中执行，看到的是同一份快照，导入提交后不会读到旧的派生表。
+
+// 已确认存在的表（脚本只建表、不删表，存在后无需再查）
+const existingTables = new Set<string>();
+
+async function tablesExist(tables: string[]): Promise<boolean> {
+  const missing = tables.filter((table) => !existingTables.has(table));
+  if (missing.length === 0) {
+    return true;
+  }
+
+  const rows = await prisma.$queryRaw`
+    SELECT name FROM unnest(${missing}::text[]) AS name WHERE to_regclass(name) IS NOT NULL
+  ` as Array<{ name: string }>;
+  rows.forEach((row) => existingTables.add(row.name));
+  return rows.length === missing.length;
+}
+
+// name 为 derived_tables.py 中登记的名称，tables 为读取涉及的表；
+// 派生表未生成或已过期时返回 null，否则按顺序返回各个读取的结果
+export async function readIfFresh<T extends unknown[]>(
+  name: string,
+  tables: string[],
+  reads: () => { [K in keyof T]: Prisma.PrismaPromise<T[K]> }
+): Promise<T | null> {
+  if (!(await tablesExist(['derived_table_versions', 'dataset_versions', ...tables]))) {
+    return null;
+  }
+
+  const [freshness, ...results] = await prisma.$transaction(
+    [
+      prisma.$queryRaw`
+        SELECT EXISTS (
+          SELECT 1 FROM derived_table_versions d
+          WHERE d.name = ${name}
+            AND d.dataset_version = (SELECT COALESCE(MAX(version), 0) FROM dataset_versions)
+        ) AS fresh
+      ` as Prisma.PrismaPromise<Array<{ fresh: boolean }>>,
+      ...reads()
+    ],
+    { isolationLevel: Prisma.TransactionIsolationLevel.RepeatableRead }
+  );
+
+  return (freshness as Array<{ fresh: boolean }>)[0]?.fresh ? (results as T) : null;
+}
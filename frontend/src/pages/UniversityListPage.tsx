@@ -59,16 +59,16 @@ const UniversityListPage = () => {
     fetchUniversities();
   }, [page, pageSize]);
 
-  // 搜索建议
+  // 搜索建议（支持拼音、首字母和简称，如 zjdx、浙大）
   const handleSearch = async (value: string) => {
-    if (!value || value.length < 2) {
+    if (!value || !value.trim()) {
       setSearchOptions([]);
       return;
     }
 
     try {
-      const response = await axios.get('/api/admission/universities/search', {
-        params: { keyword: value }
+      const response = await axios.get('/api/admission/autocomplete', {
+        params: { q: value, kind: 'university' }
       });
       setSearchOptions(response.data.map((u: any) => ({ value: u.name })));
     } catch (error) {
@@ -77,12 +77,14 @@ export const exportAdmission = async (params: SearchParams): Promise<Blob> => {
 export const getStats = async (
   year?: number,
   major?: string,
-  schoolLocation?: string
+  schoolLocation?: string,
+  subjectCategory?: string
 ): Promise<StatsData> => {
   const params: any = {};
   if (year) params.year = year;
   if (major) params.major = major;
   if (schoolLocation) params.schoolLocation = schoolLocation;
+  if (subjectCategory) params.subjectCategory = subjectCategory;
 
   const response = await axios.get(`${API_BASE_URL}/admission/stats`, {
     params
@@ -128,11 +130,13 @@ export const getLocations = async (): Promise<string[]> => {
 export const getScoreRankMapping = async (
   year: number,
   score?: number,
-  rank?: number
+  rank?: number,
+  category?: string
 ): Promise<ScoreRankMapping> => {
   const params: any = { year };
   if (score !== undefined) params.score = score;
   if (rank !== undefined) params.rank = rank;
+  if (category) params.category = category;
 
   const response = await axios.get(`${API_BASE_URL}/admission/score-rank-mapping`, {
     params
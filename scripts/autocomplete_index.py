@@ -0,0 +1,233 @@
+"""
+院校、专业名称的输入联想索引（autocomplete_terms）
+为每个不同的院校名称和专业名称生成可输入的形式，写入一张按前缀查找的紧凑表：
+    name       名称本身                     浙江大学
+    pinyin     全拼                         zhejiangdaxue
+    initials   拼音首字母                   zjdx
+    abbr       简称及其全拼、首字母          浙大 / zheda / zd
+后端 /api/admission/autocomplete 对 (kind, term) 做前缀匹配（text_pattern_ops 索引），
+按名称在录取数据中出现的次数排序。
+
+拼音依赖 pypinyin（见 requirements.txt）；未安装时只生成名称和简称。
+
+用法: python autocomplete_index.py                 重建联想索引
+      python autocomplete_index.py --lookup zjdx   查看某个输入的联想结果
+"""
+import argparse
+import re
+import sys
+
+from bulk_loader import copy_rows
+
+try:
+    from pypinyin import lazy_pinyin
+    HAS_PYPINYIN = True
+except ImportError:
+    HAS_PYPINYIN = False
+
+AUTOCOMPLETE_TABLE = 'autocomplete_terms'
+
+CREATE_AUTOCOMPLETE_SQL = f"""
+CREATE TABLE IF NOT EXISTS {AUTOCOMPLETE_TABLE} (
+    kind VARCHAR(20) NOT NULL,
+    term VARCHAR(200) NOT NULL,
+    name VARCHAR(200) NOT NULL,
+    form VARCHAR(20) NOT NULL,
+    weight INTEGER NOT NULL,
+    PRIMARY KEY (kind, term, name)
+);
+CREATE INDEX IF NOT EXISTS idx_autocomplete_prefix
+    ON {AUTOCOMPLETE_TABLE} (kind, term text_pattern_ops);
+"""
+
+AUTOCOMPLETE_COLUMNS = ['kind', 'term', 'name', 'form', 'weight']
+
+# (kind, 录取数据中的列)
+NAME_SOURCES = [
+    ('university', 'university_name'),
+    ('major', 'major'),
+]
+
+# 同一个输入形式对应多种来源时保留的优先级（名称本身最优先）
+FORM_PRIORITY = ['name', 'abbr', 'initials', 'pinyin']
+
+# 院校名称的后缀，去掉后剩下的部分用于生成简称
+UNIVERSITY_SUFFIXES = ['职业技术学院', '职业学院', '大学', '学院']
+
+# 规则无法得到的常用简称
+KNOWN_ABBREVIATIONS = {
+    '中国人民大学': ['人大'],
+    '中国科学技术大学': ['中科大', '科大'],
+    '哈尔滨工业大学': ['哈工大'],
+    '北京师范大学': ['北师大'],
+    '华东师范大学': ['华师大'],
+    '华中师范大学': ['华中师大'],
+    '上海交通大学': ['上交', '交大'],
+    '西安交通大学': ['西交', '交大'],
+    '北京航空航天大学': ['北航'],
+    '南京航空航天大学': ['南航'],
+    '华中科技大学': ['华科'],
+    '电子科技大学': ['成电', '电子科大'],
+    '对外经济贸易大学': ['贸大'],
+    '中南财经政法大学': ['中南大'],
+    '计算机科学与技术': ['计科'],
+    '软件工程': ['软工'],
+    '电气工程及其自动化': ['电气'],
+    '汉语言文学': ['汉语言'],
+}
+
+
+def normalize_query(text):
+    """输入规范化（与后端一致）：去掉空格和拼音分隔符，转小写"""
+    return re.sub(r"[\s']", '', text).lower()
+
+
+def _ascii_term(syllables):
+    """拼音音节拼成输入形式，只保留字母和数字"""
+    return re.sub(r'[^0-9a-z]', '', ''.join(syllables).lower())
+
+
+def pinyin_forms(text, readings=None):
+    """(全拼, 首字母)；未安装 pypinyin 时为 (None, None)
+
+    readings 为 {字: 拼音}，简称中的多音字按全称里的读音（重庆大学 -> 重大 chongda）。
+    """
+    if not HAS_PYPINYIN:
+        return None, None
+    syllables = lazy_pinyin(text)
+    if readings and len(syllables) == len(text):
+        syllables = [readings.get(char, syllable) for char, syllable in zip(text, syllables)]
+    full = _ascii_term(syllables)
+    initials = _ascii_term(syllable[:1] for syllable in syllables)
+    return full or None, initials or None
+
+
+def char_readings(text):
+    """全称中每个字的读音 {字: 拼音}（取第一次出现的读音）"""
+    if not HAS_PYPINYIN:
+        return {}
+    syllables = lazy_pinyin(text)
+    if len(syllables) != len(text):
+        return {}
+    readings = {}
+    for char, syllable in zip(text, syllables):
+        readings.setdefault(char, syllable)
+    return readings
+
+
+def university_abbreviations(name):
+    """按规则生成院校简称：浙江大学 -> 浙大，北京航空航天大学 -> 北航大，清华大学 -> 清华"""
+    abbreviations = list(KNOWN_ABBREVIATIONS.get(name, []))
+    for suffix in UNIVERSITY_SUFFIXES:
+        if name.endswith(suffix) and len(name) > len(suffix):
+            stem = name[:-len(suffix)]
+            break
+    else:
+        return abbreviations
+
+    tail = '大' if suffix == '大学' else ''
+    if len(stem) == 2:
+        abbreviations.append(stem)
+        if tail:
+            abbreviations.append(stem[0] + tail)
+    elif len(stem) >= 4:
+        # 按两字一词取前两个词的首字
+        abbreviations.append(stem[0] + stem[2] + tail)
+    return [abbr for abbr in dict.fromkeys(abbreviations) if abbr != name]
+
+
+def name_terms(kind, name):
+    """一个名称的全部输入形式 [(term, form)]，与用户输入一样经过 normalize_query"""
+    terms = [(normalize_query(name), 'name')]
+    full, initials = pinyin_forms(name)
+    if full:
+        terms.append((full, 'pinyin'))
+    if initials:
+        terms.append((initials, 'initials'))
+
+    if kind == 'university':
+        abbreviations = university_abbreviations(name)
+    else:
+        abbreviations = KNOWN_ABBREVIATIONS.get(name, [])
+    readings = char_readings(name)
+    for abbr in abbreviations:
+        terms.append((normalize_query(abbr), 'abbr'))
+        full, initials = pinyin_forms(abbr, readings)
+        for term in (full, initials):
+            if term:
+                terms.append((term, 'abbr'))
+    return terms
+
+
+def build_autocomplete_rows(names):
+    """names 为 [(kind, 名称, 出现次数)]，返回去重后的表行"""
+    best = {}
+    for kind, name, weight in names:
+        for term, form in name_terms(kind, name):
+            term = term[:200]
+            key = (kind, term, name)
+            current = best.get(key)
+            if current is None or FORM_PRIORITY.index(form) < FORM_PRIORITY.index(current[0]):
+                best[key] = (form, weight)
+    return [(kind, term, name, form, weight) for (kind, term, name), (form, weight) in best.items()]
+
+
+def refresh_autocomplete_index(cursor):
+    """重建输入联想表（在调用方的事务中），返回写入行数"""
+    if not HAS_PYPINYIN:
+        print("⚠️  未安装 pypinyin，输入联想只包含名称和简称（pip install pypinyin）")
+    cursor.execute(CREATE_AUTOCOMPLETE_SQL)
+    names = []
+    for kind, column in NAME_SOURCES:
+        cursor.execute(f"""
+            SELECT {column}, COUNT(*)
+            FROM admission_data
+            WHERE {column} IS NOT NULL AND {column} <> ''
+            GROUP BY {column}
+        """)
+        names.extend((kind, name, count) for name, count in cursor.fetchall())
+    rows = build_autocomplete_rows(names)
+    cursor.execute(f"DELETE FROM {AUTOCOMPLETE_TABLE}")
+    copy_rows(cursor, rows, table=AUTOCOMPLETE_TABLE, columns=AUTOCOMPLETE_COLUMNS)
+    cursor.execute(f"ANALYZE {AUTOCOMPLETE_TABLE}")
+    return len(rows)
+
+
+if __name__ == '__main__':
+    if sys.platform == 'win32':
+        import io
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+        sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+    from db import connect
+    from derived_tables import refresh_derived_tables
+
+    parser = argparse.ArgumentParser(description='院校、专业名称的输入联想索引')
+    parser.add_argument('--lookup', metavar='TEXT', help='查看某个输入的联想结果')
+    args = parser.parse_args()
+
+    failed = {}
+    conn = connect()
+    if args.lookup:
+        prefix = normalize_query(args.lookup)
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT kind, name, MIN(term), MAX(weight) AS weight
+            FROM {AUTOCOMPLETE_TABLE}
+            WHERE kind = ANY(%s) AND term LIKE %s
+            GROUP BY kind, name
+            ORDER BY weight DESC, name
+            LIMIT 20
+        """, ([kind for kind, _ in NAME_SOURCES],
+              prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'))
+        rows = cursor.fetchall()
+        if not rows:
+            print(f"❌ 没有与 {args.lookup} 匹配的名称")
+        for kind, name, term, weight in rows:
+            print(f"  [{'院校' if kind == 'university' else '专业'}] {name}  ← {term}（{weight:,} 条）")
+        cursor.close()
+    else:
+        _, failed = refresh_derived_tables(conn, names=[AUTOCOMPLETE_TABLE], force=True)
+    conn.close()
+    if failed:
+        sys.exit(1)
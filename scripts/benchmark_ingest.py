@@ -0,0 +1,514 @@
+"""
+导入流程基准测试
+生成与 22-25scoredata.xlsx 列相同的合成录取数据（默认为当前行数的 1x / 10x / 100x），
+分阶段测量导入的各个环节：读取、清洗、学科分类、COPY写入、建索引，
+记录每个阶段的耗时、行/秒和峰值内存（RSS），结果写为JSON，便于比较不同版本。
+
+写入和建索引在单独的基准数据库中进行（默认 admission_query_bench），每次运行都会重建其中的
+admission_data 表，不会改动正式数据。每个倍数在独立的进程中运行，峰值内存互不影响。
+单个工作表最多 1048576 行，超过的倍数直接生成Parquet文件（与Excel缓存格式相同）。
+
+用法: python benchmark_ingest.py                          运行 1x、10x、100x
+      python benchmark_ingest.py --scale 1 --scale 10     只运行指定倍数
+      python benchmark_ingest.py --no-db                  只测读取、清洗、分类
+      python benchmark_ingest.py --compare 上次结果.json   与之前的结果对比
+"""
+import argparse
+import importlib.util
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+from bulk_loader import copy_dataframe
+from cleaning import COLUMN_MAPPING, clean_admission_data
+from excel_cache import HAS_PYARROW, load_source
+from incremental_import import HASHED_COLUMNS, add_row_hashes, ensure_row_hash_column
+from index_manager import analyze, create_indexes, drop_indexes
+from major_discipline_map import MAP_TABLE, DisciplineMap, apply_discipline_map
+from partitioning import ensure_year_partitions
+
+try:
+    import psutil
+    HAS_PSUTIL = True
+except ImportError:
+    HAS_PSUTIL = False
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 合成数据和结果文件目录
+BENCH_DIR = os.path.join(SCRIPTS_DIR, '.bench')
+
+# 当前数据源的行数（1x）
+BASE_ROWS = 89185
+
+DEFAULT_SCALES = [1, 10, 100]
+
+# 基准数据库，运行时会删除并重建其中的 admission_data
+BENCH_DATABASE = 'admission_query_bench'
+
+# 单个工作表的最大数据行数（不含表头）
+MAX_SHEET_ROWS = 1048575
+
+# 合成数据每次生成的行数
+GENERATE_CHUNK_ROWS = 100000
+
+# RSS采样间隔（秒）
+RSS_SAMPLE_INTERVAL = 0.01
+
+# 对比时耗时增加超过该比例视为性能退化
+REGRESSION_THRESHOLD = 0.10
+
+# 耗时低于该值（秒）的阶段波动较大，不参与退化判断
+MIN_COMPARE_WALL_S = 0.1
+
+# Excel列（中文），顺序与数据源一致
+SOURCE_COLUMNS = list(COLUMN_MAPPING)
+
+YEARS = [2022, 2023, 2024, 2025]
+
+UNIVERSITY_CITIES = [
+    '北京', '清华', '浙江', '复旦', '上海', '南京', '武汉', '中山', '四川', '西安',
+    '哈尔滨', '杭州', '宁波', '温州', '湖州', '绍兴', '嘉兴', '台州', '金华', '丽水',
+    '广州', '深圳', '天津', '重庆', '长沙', '郑州', '济南', '青岛', '大连', '沈阳',
+    '长春', '合肥', '南昌', '福州', '厦门', '昆明', '贵州', '兰州', '成都', '苏州',
+]
+
+UNIVERSITY_SUFFIXES = [
+    '大学', '理工大学', '师范大学', '科技大学', '工业大学', '医科大学',
+    '财经大学', '外国语大学', '农林大学', '传媒学院', '职业技术学院', '学院',
+]
+
+LOCATIONS = [
+    '浙江', '北京', '上海', '江苏', '湖北', '广东', '四川', '陕西', '山东', '湖南',
+    '天津', '重庆', '辽宁', '黑龙江', '安徽', '福建', '江西', '河南', '云南', '甘肃',
+]
+
+# (专业名称, 专业代码)，覆盖12个学科门类，也包含关键词无法判断的名称
+MAJORS = [
+    ('哲学', '010101'), ('经济学', '020101'), ('金融学', '020301K'), ('国际经济与贸易', '020401'),
+    ('法学', '030101K'), ('社会工作', '030302'), ('思想政治教育', '030503'),
+    ('学前教育', '040106'), ('体育教育', '040201'), ('汉语言文学', '050101'),
+    ('英语', '050201'), ('日语', '050207'), ('新闻学', '050301'), ('网络与新媒体', '050306T'),
+    ('历史学', '060101'), ('考古学', '060103'), ('数学与应用数学', '070101'),
+    ('物理学', '070201'), ('化学', '070301'), ('地理科学', '070501'), ('统计学', '071201'),
+    ('机械设计制造及其自动化', '080202'), ('电气工程及其自动化', '080601'),
+    ('电子信息工程', '080701'), ('通信工程', '080703'), ('计算机科学与技术', '080901'),
+    ('软件工程', '080902'), ('人工智能', '080717T'), ('土木工程', '081001'),
+    ('化学工程与工艺', '081301'), ('环境工程', '082502'), ('生物工程', '083001'),
+    ('农学', '090101'), ('园艺', '090102'), ('动物医学', '090401'),
+    ('临床医学', '100201K'), ('口腔医学', '100301K'), ('中医学', '100501K'),
+    ('药学', '100701'), ('医学影像技术', '101003'), ('护理学', '101101'),
+    ('工商管理', '120201K'), ('会计学', '120203K'), ('财务管理', '120204'),
+    ('人力资源管理', '120206'), ('电子商务', '120801'), ('物流管理', '120601'),
+    ('音乐学', '130202'), ('视觉传达设计', '130502'), ('数字媒体艺术', '130508'),
+    ('人文科学试验班', ''), ('理科试验班', ''), ('工科试验班', ''), ('自动化类', '0808'),
+]
+
+# 专业名称后缀，使不同名称的数量接近真实数据
+MAJOR_VARIANTS = ['', '', '', '', '（中外合作办学）', '（师范）', '（国际班）', '（卓越工程师班）']
+
+MAJOR_NOTES = ['中外合作办学，学费较高', '只招英语考生', '色盲色弱不予录取', '在杭州校区就读', '实验班']
+
+SUBJECT_REQUIREMENTS = ['不限', '物理', '物理+化学', '化学', '历史', '物理或化学', '思想政治']
+
+
+def _university_pool(rng):
+    """院校表：名称、代码、所在地、性质、985/211、层次（0~1，决定分数高低）"""
+    names = [city + suffix for city in UNIVERSITY_CITIES for suffix in UNIVERSITY_SUFFIXES]
+    count = len(names)
+    tier = rng.beta(2, 3, count)
+    return pd.DataFrame({
+        'name': names,
+        'code': rng.choice(np.arange(10001, 14999), count, replace=False),
+        'location': rng.choice(LOCATIONS, count),
+        'nature': np.where(rng.random(count) < 0.85, '公办', '民办'),
+        'is_985': np.where(tier > 0.85, '是', '否'),
+        'is_211': np.where(tier > 0.7, '是', '否'),
+        'tier': tier,
+    })
+
+
+def generate_chunks(rows, seed=0, chunk_rows=GENERATE_CHUNK_ROWS):
+    """逐块生成合成录取数据（中文列名，取值分布接近真实数据源）
+
+    分数由院校层次决定，位次随分数单调递减；专业代码、专业组、备注、录取人数有一定比例缺失。
+    """
+    universities = _university_pool(np.random.default_rng(seed))
+    major_names = np.array([name for name, _ in MAJORS], dtype=object)
+    major_codes = np.array([code for _, code in MAJORS], dtype=object)
+    variants = np.array(MAJOR_VARIANTS, dtype=object)
+
+    produced = 0
+    chunk_index = 0
+    while produced < rows:
+        n = min(chunk_rows, rows - produced)
+        rng = np.random.default_rng([seed, chunk_index])
+
+        uni = universities.iloc[rng.integers(0, len(universities), n)].reset_index(drop=True)
+        major = rng.integers(0, len(MAJORS), n)
+        variant = variants[rng.integers(0, len(variants), n)]
+
+        score = 480 + uni['tier'].to_numpy() * 210 + rng.normal(0, 12, n)
+        score = np.clip(np.round(score), 400, 705)
+        rank = ((710 - score) / 310) ** 2 * 300000 * rng.uniform(0.95, 1.05, n)
+        rank = np.maximum(rank.round(), 1)
+
+        codes = major_codes[major]
+        codes = np.where((codes == '') | (rng.random(n) < 0.02), None, codes)
+        groups = np.array([f'{g:03d}' for g in rng.integers(1, 40, n)], dtype=object)
+        groups[rng.random(n) < 0.1] = None
+        notes = np.array(MAJOR_NOTES, dtype=object)[rng.integers(0, len(MAJOR_NOTES), n)]
+        notes[rng.random(n) >= 0.15] = None
+
+        category = rng.choice(['综合', '艺术类', '体育类'], n, p=[0.99, 0.006, 0.004])
+        batch = np.where(uni['tier'].to_numpy() + rng.normal(0, 0.1, n) > 0.3, '普通类一段', '普通类二段')
+
+        frame = pd.DataFrame({
+            '年份': rng.choice(YEARS, n),
+            '院校名称': uni['name'],
+            '院校代码': uni['code'],
+            '科类': category,
+            '批次': batch,
+            '选科要求': rng.choice(SUBJECT_REQUIREMENTS, n),
+            '专业': major_names[major] + variant,
+            '专业代码': codes,
+            '所属专业组': groups,
+            '专业备注': notes,
+            '录取人数': pd.array(rng.integers(1, 12, n), dtype='Int64'),
+            '最低分数': pd.array(score.astype('int64'), dtype='Int64'),
+            '最低位次': pd.array(rank.astype('int64'), dtype='Int64'),
+            '学校所在': uni['location'],
+            '学校性质': uni['nature'],
+            '是否985': uni['is_985'],
+            '是否211': uni['is_211'],
+        }, columns=SOURCE_COLUMNS)
+        frame.loc[rng.random(n) < 0.01, '录取人数'] = pd.NA
+
+        yield frame
+        produced += n
+        chunk_index += 1
+
+
+def write_workbook(path, rows, seed=0):
+    """生成合成数据源：不超过单表上限时写Excel，否则写Parquet，返回实际路径"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    if rows > MAX_SHEET_ROWS:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        path = os.path.splitext(path)[0] + '.parquet'
+        tmp_path = path + '.tmp'
+        writer = None
+        try:
+            for chunk in generate_chunks(rows, seed):
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp_path, table.schema)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+        os.replace(tmp_path, path)
+        return path
+
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(SOURCE_COLUMNS)
+    for chunk in generate_chunks(rows, seed):
+        values = chunk.astype(object).where(chunk.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            sheet.append(row)
+    tmp_path = path + '.tmp'
+    workbook.save(tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+
+def synthetic_source(rows, seed=0):
+    """合成数据源的路径；已生成过相同行数和种子的文件时直接复用。返回 (路径, 是否新生成)"""
+    stem = os.path.join(BENCH_DIR, f'synthetic_{rows}_{seed}')
+    for ext in ('.xlsx', '.parquet'):
+        if os.path.exists(stem + ext):
+            return stem + ext, False
+    return write_workbook(stem + '.xlsx', rows, seed), True
+
+
+def current_rss():
+    """当前进程的常驻内存（字节），无法获取时返回None"""
+    if HAS_PSUTIL:
+        return psutil.Process().memory_info().rss
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class RssSampler:
+    """在后台线程中定时采样RSS，记录区间内的峰值"""
+
+    def __init__(self, interval=RSS_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.peak = current_rss()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            rss = current_rss()
+            if rss is not None and (self.peak is None or rss > self.peak):
+                self.peak = rss
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        rss = current_rss()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+
+
+def _mb(value):
+    return None if value is None else round(value / (1024 * 1024), 1)
+
+
+def run_stage(stages, name, func, count=len):
+    """执行一个阶段并记录耗时、处理行数、行/秒和峰值RSS，返回阶段的结果"""
+    with RssSampler() as sampler:
+        start = time.perf_counter()
+        result = func()
+        wall = time.perf_counter() - start
+    rows = int(count(result))
+    stages[name] = {
+        'wall_s': round(wall, 3),
+        'rows': rows,
+        'rows_per_s': round(rows / wall, 1) if wall > 0 else None,
+        'peak_rss_mb': _mb(sampler.peak),
+    }
+    print(f"  {name:<12} {wall:>9.2f}s  {rows:>10,} 行  峰值 {_mb(sampler.peak)} MB")
+    return result
+
+
+def _load_importer():
+    """import-excel.py 文件名含连字符，按路径加载，以使用与正式导入相同的建表语句"""
+    spec = importlib.util.spec_from_file_location(
+        'import_excel', os.path.join(SCRIPTS_DIR, 'import-excel.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def read_source(path):
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    return load_source(path, refresh=True)
+
+
+def load_rows(conn, create_table_sql, df):
+    """在基准库中重建 admission_data 和学科门类对照表，按正式导入的方式COPY写入（不含建索引）"""
+    cursor = conn.cursor()
+    cursor.execute("DROP TABLE IF EXISTS admission_data CASCADE")
+    cursor.execute(f"DROP TABLE IF EXISTS {MAP_TABLE}")
+    cursor.execute(create_table_sql)
+    ensure_row_hash_column(cursor)
+    drop_indexes(cursor)
+    df = apply_discipline_map(cursor, df)
+    ensure_year_partitions(cursor, df['year'].unique())
+    rows = copy_dataframe(cursor, add_row_hashes(df), columns=HASHED_COLUMNS)
+    conn.commit()
+    cursor.close()
+    return rows
+
+
+def build_indexes(conn, rows):
+    cursor = conn.cursor()
+    create_indexes(cursor)
+    analyze(cursor)
+    conn.commit()
+    cursor.close()
+    return rows
+
+
+def run_scale(scale, base_rows, seed, db_config):
+    """运行一个倍数的全部阶段，返回该倍数的结果（在独立进程中执行）"""
+    rows = int(base_rows * scale)
+    print(f"\n【{scale}x：{rows:,} 行】")
+
+    start = time.perf_counter()
+    path, generated = synthetic_source(rows, seed)
+    result = {
+        'scale': scale,
+        'rows': rows,
+        'source_format': os.path.splitext(path)[1].lstrip('.'),
+        'source_bytes': os.path.getsize(path),
+        'generate': {'wall_s': round(time.perf_counter() - start, 3), 'reused': not generated},
+        'stages': {},
+    }
+    print(f"  数据源: {path}（{'新生成' if generated else '复用已有文件'}）")
+
+    stages = result['stages']
+    df = run_stage(stages, 'read', lambda: read_source(path))
+    if result['source_format'] == 'xlsx' and HAS_PYARROW:
+        df = run_stage(stages, 'read_cached', lambda: load_source(path))
+    df = run_stage(stages, 'clean', lambda: clean_admission_data(df))
+    # 与导入时相同：先按专业代码，代码无效的行再按名称分类（对照表为空，相当于首次导入）
+    discipline_map = DisciplineMap()
+    run_stage(stages, 'classify', lambda: discipline_map.apply(df))
+    result['classify_paths'] = {
+        'code': discipline_map.by_code,
+        'name': discipline_map.by_name,
+        'classified_names': discipline_map.classified,
+    }
+
+    if db_config is not None:
+        from db import connect
+
+        importer = _load_importer()
+        # 大倍数下建索引可能很久，基准连接不设语句超时
+        conn = connect(db_config, statement_timeout=0)
+        try:
+            result['server_version'] = conn.server_version
+            loaded = run_stage(stages, 'load', lambda: load_rows(conn, importer.CREATE_TABLE_SQL, df),
+                               count=int)
+            run_stage(stages, 'index', lambda: build_indexes(conn, loaded), count=int)
+        finally:
+            conn.close()
+
+    result['total_wall_s'] = round(sum(s['wall_s'] for s in stages.values()), 3)
+    peaks = [s['peak_rss_mb'] for s in stages.values() if s['peak_rss_mb'] is not None]
+    result['peak_rss_mb'] = max(peaks) if peaks else None
+    return result
+
+
+def ensure_bench_database(db_config):
+    """基准数据库不存在时创建"""
+    from db import connect
+
+    conn = connect({**db_config, 'database': 'postgres'})
+    conn.autocommit = True
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM pg_database WHERE datname = %s", (db_config['database'],))
+    if cursor.fetchone() is None:
+        cursor.execute(f'CREATE DATABASE "{db_config["database"]}"')
+        print(f"✅ 已创建基准数据库 {db_config['database']}")
+    cursor.close()
+    conn.close()
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=SCRIPTS_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(scales, base_rows=BASE_ROWS, seed=0, db_config=None):
+    """依次运行各倍数（每个倍数一个新进程），返回完整的结果字典"""
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': _git_commit(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'base_rows': base_rows,
+        'seed': seed,
+        'database': db_config is not None,
+        'results': [],
+    }
+    context = multiprocessing.get_context('spawn')
+    for scale in scales:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            report['results'].append(
+                executor.submit(run_scale, scale, base_rows, seed, db_config).result())
+    return report
+
+
+def compare_reports(previous, current, threshold=REGRESSION_THRESHOLD):
+    """逐倍数、逐阶段对比两次结果，返回耗时增加超过阈值的 [(倍数, 阶段, 变化比例)]"""
+    before = {r['scale']: r for r in previous['results']}
+    regressions = []
+    print(f"\n【与 {previous.get('git_commit') or previous.get('created_at')} 对比】")
+    for result in current['results']:
+        old = before.get(result['scale'])
+        if old is None or old['rows'] != result['rows']:
+            continue
+        for name, stage in result['stages'].items():
+            old_stage = old['stages'].get(name)
+            if not old_stage or not old_stage['wall_s']:
+                continue
+            change = stage['wall_s'] / old_stage['wall_s'] - 1
+            regressed = change > threshold and stage['wall_s'] >= MIN_COMPARE_WALL_S
+            mark = '⚠️' if regressed else '  '
+            print(f"  {mark} {result['scale']}x {name:<12} "
+                  f"{old_stage['wall_s']:.2f}s -> {stage['wall_s']:.2f}s ({change:+.1%})")
+            if regressed:
+                regressions.append((result['scale'], name, change))
+    return regressions
+
+
+if __name__ == '__main__':
+    if sys.platform == 'win32':
+        import io
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+        sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+    from db import DB_CONFIG
+
+    parser = argparse.ArgumentParser(description='导入流程基准测试')
+    parser.add_argument('--scale', type=float, action='append',
+                        help='数据量倍数，可重复指定（默认 1、10、100）')
+    parser.add_argument('--base-rows', type=int, default=BASE_ROWS, help=f'1x的行数（默认 {BASE_ROWS}）')
+    parser.add_argument('--seed', type=int, default=0, help='合成数据的随机种子')
+    parser.add_argument('--database', default=BENCH_DATABASE, help=f'基准数据库（默认 {BENCH_DATABASE}）')
+    parser.add_argument('--no-db', action='store_true', help='不连接数据库，跳过写入和建索引阶段')
+    parser.add_argument('--output', help='结果JSON路径（默认写入 .bench/ 目录）')
+    parser.add_argument('--compare', help='与之前的结果JSON对比，耗时增加超过10%%的阶段以非零状态退出')
+    args = parser.parse_args()
+
+    db_config = None
+    if not args.no_db:
+        if args.database in ('admission_query', DB_CONFIG['database']):
+            print("❌ 基准测试会重建 admission_data，不能在正式数据库上运行")
+            sys.exit(1)
+        db_config = {**DB_CONFIG, 'database': args.database}
+        ensure_bench_database(db_config)
+
+    scales = [int(s) if s == int(s) else s for s in (args.scale or DEFAULT_SCALES)]
+    report = run_benchmark(scales, args.base_rows, args.seed, db_config)
+
+    output = args.output or os.path.join(
+        BENCH_DIR, f"ingest-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print("\n📊 汇总")
+    for result in report['results']:
+        print(f"  {result['scale']}x: {result['rows']:,} 行，合计 {result['total_wall_s']:.2f}s，"
+              f"峰值 {result['peak_rss_mb']} MB")
+    print(f"\n✅ 结果已写入: {output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            previous = json.load(f)
+        if compare_reports(previous, report):
+            print("\n⚠️ 存在性能退化")
+            sys.exit(2)
@@ -1,8 +1,8 @@
 """
 查询所有年份浙江大学人文科学试验班的专业备注
 """
-import psycopg2
-from dotenv import load_dotenv
+from db import connect
+from diagnostics import sample_section
 import sys
 
 if sys.platform == 'win32':
@@ -10,17 +10,7 @@ if sys.platform == 'win32':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
-load_dotenv('../backend/.env')
-
-DB_CONFIG = {
-    'host': 'localhost',
-    'port': 5432,
-    'database': 'admission_query',
-    'user': 'postgres',
-    'password': 'rainworm'
-}
-
-conn = psycopg2.connect(**DB_CONFIG)
+conn = connect()
 cursor = conn.cursor()
 
 print("=== 查询所有年份浙江大学人文科学试验班 ===\n")
@@ -64,15 +54,10 @@ for status, count in cursor.fetchall():
 
 # 查看一些有备注的示例
 print("\n=== 有专业备注的示例（其他院校）===")
-cursor.execute("""
-    SELECT university_name, major, major_note
-    FROM admission_data
-    WHERE major_note IS NOT NULL
-      AND major_note != ''
-    ORDER BY RANDOM()
-    LIMIT 5
-""")
-for univ, major, note in cursor.fetchall():
+# 抽样比例从小到大尝试，直到取够5条（与 diagnostics.py 一致）
+section = sample_section(cursor, '有专业备注的示例', 'university_name, major, major_note',
+                         "major_note IS NOT NULL AND major_note != ''", 5)
+for univ, major, note in section['rows']:
     print(f"\n{univ} - {major}")
     print(f"  备注: {note}")
 
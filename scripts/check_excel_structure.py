@@ -4,17 +4,17 @@
 import pandas as pd
 import sys
 
+from excel_cache import load_source
+
 if sys.platform == 'win32':
     import io
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
-EXCEL_FILE = '../22-25年全国高校在浙江的专业录取分数.xlsx'
-
 print("=== 读取Excel文件查看结构 ===\n")
 
 # 读取Excel文件，查看列名
-df = pd.read_excel(EXCEL_FILE)
+df = load_source()
 print("Excel列名:")
 print(df.columns.tolist())
 print(f"\n总行数: {len(df)}")
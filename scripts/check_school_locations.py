@@ -1,8 +1,7 @@
 """
 检查院校地区字段的数据情况
 """
-import psycopg2
-from dotenv import load_dotenv
+from db import connect
 import sys
 
 if sys.platform == 'win32':
@@ -10,17 +9,7 @@ if sys.platform == 'win32':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
-load_dotenv('../backend/.env')
-
-DB_CONFIG = {
-    'host': 'localhost',
-    'port': 5432,
-    'database': 'admission_query',
-    'user': 'postgres',
-    'password': 'rainworm'
-}
-
-conn = psycopg2.connect(**DB_CONFIG)
+conn = connect()
 cursor = conn.cursor()
 
 print("=== 检查院校地区字段 ===\n")
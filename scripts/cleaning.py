@@ -0,0 +1,124 @@
+"""
+录取数据清洗
+对整列做类型转换、缺失值/无穷值处理、"是/否"布尔解析和字符串去空格，
+供导入、恢复、更新脚本共用，保证各脚本写入数据库的类型一致。
+"""
+import numpy as np
+import pandas as pd
+
+# Excel列名（中文）到数据库列名的映射
+COLUMN_MAPPING = {
+    '年份': 'year',
+    '院校名称': 'university_name',
+    '院校代码': 'university_code',
+    '科类': 'category',
+    '批次': 'batch',
+    '选科要求': 'subject_requirement',
+    '专业': 'major',
+    '专业代码': 'major_code',
+    '所属专业组': 'major_group',
+    '专业备注': 'major_note',
+    '录取人数': 'admission_count',
+    '最低分数': 'min_score',
+    '最低位次': 'min_rank',
+    '学校所在': 'school_location',
+    '学校性质': 'school_nature',
+    '是否985': 'is_985',
+    '是否211': 'is_211'
+}
+
+# 非空文本列：缺失值写为空字符串
+TEXT_COLUMNS = [
+    'university_name', 'university_code', 'category', 'batch',
+    'subject_requirement', 'major', 'major_code', 'school_location', 'school_nature'
+]
+
+# 可空文本列：缺失或空白写为NULL
+OPTIONAL_TEXT_COLUMNS = ['major_group', 'major_note']
+
+# 可空整数列
+INTEGER_COLUMNS = ['admission_count', 'min_score', 'min_rank']
+
+# 布尔列（"是"为真）
+BOOLEAN_COLUMNS = ['is_985', 'is_211']
+
+
+def _numbers_to_text(series):
+    """把数值写成文本，整数值的浮点数不带小数点（10335.0 -> '10335'）"""
+    numbers = pd.to_numeric(series, errors='coerce')
+    numbers = numbers.where(np.isfinite(numbers))
+    integral = numbers.notna() & (numbers == np.trunc(numbers))
+    text = numbers.astype(str)
+    text[integral] = numbers[integral].astype('int64').astype(str)
+    return text.where(numbers.notna())
+
+
+def clean_text(series):
+    """清洗文本列：去除首尾空白，缺失值为空字符串"""
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        text = _numbers_to_text(series)
+    else:
+        inferred = pd.api.types.infer_dtype(series, skipna=True)
+        if inferred in ('string', 'empty'):
+            text = series.astype(object)
+        else:
+            # 同一列中混有数字和文本（如专业代码），数字部分按整数写出
+            numbers = _numbers_to_text(series)
+            is_number = series.map(lambda v: isinstance(v, (int, float, np.number))
+                                   and not isinstance(v, bool))
+            text = series.astype(object).where(~is_number, numbers)
+    text = text.where(pd.notna(text), '')
+    return text.astype(str).str.strip().astype(object)
+
+
+def clean_optional_text(series):
+    """清洗可空文本列：去除首尾空白，缺失或空白为None"""
+    text = clean_text(series)
+    return text.where(text != '', None)
+
+
+def clean_integer(series):
+    """清洗整数列：非数值、NaN、无穷值为缺失，小数截断为整数"""
+    numbers = pd.to_numeric(series, errors='coerce')
+    numbers = numbers.where(np.isfinite(numbers))
+    return np.trunc(numbers).astype('Int64')
+
+
+def clean_boolean(series):
+    """清洗布尔列："是"为真；非文本值按真值判断；缺失为假"""
+    if pd.api.types.is_bool_dtype(series):
+        return series.fillna(False).astype(bool)
+    text = series.astype(object).where(series.notna(), '').astype(str).str.strip()
+    result = text.eq('是')
+    if pd.api.types.infer_dtype(series, skipna=True) not in ('string', 'empty'):
+        numbers = pd.to_numeric(series, errors='coerce')
+        result |= numbers.notna() & numbers.ne(0)
+    return result
+
+
+def clean_admission_data(df):
+    """清洗录取数据（中文列名或数据库列名均可），返回新的DataFrame
+
+    年份缺失的行被丢弃；只处理存在的列，因此也适用于只读取了部分列的数据。
+    """
+    df = df.rename(columns=COLUMN_MAPPING).copy()
+
+    if 'year' in df.columns:
+        years = pd.to_numeric(df['year'], errors='coerce')
+        df = df[years.notna()].copy()
+        df['year'] = years[years.notna()].astype(int)
+
+    for col in TEXT_COLUMNS:
+        if col in df.columns:
+            df[col] = clean_text(df[col])
+    for col in OPTIONAL_TEXT_COLUMNS:
+        if col in df.columns:
+            df[col] = clean_optional_text(df[col])
+    for col in INTEGER_COLUMNS:
+        if col in df.columns:
+            df[col] = clean_integer(df[col])
+    for col in BOOLEAN_COLUMNS:
+        if col in df.columns:
+            df[col] = clean_boolean(df[col])
+
+    return df.reset_index(drop=True)
@@ -0,0 +1,419 @@
+"""
+admission_data 数据画像
+用服务器端游标逐批读取，一次扫描全表，为每一列计算：空值和空字符串比例、不同值个数、最常见的值，
+数值列的最小/最大/平均值和直方图，以及按年份的分项统计。
+值较少时不同值个数和常见值都是精确的；超过一定数量后分别改用 HyperLogLog 和 Misra-Gries 估算，
+内存占用与行数无关。结果按数据版本（dataset_version.py）缓存，数据未变时再次运行直接读取缓存。
+
+用法: python data_profile.py                    输出画像（有缓存时直接读取）
+      python data_profile.py --refresh          忽略缓存，重新扫描
+      python data_profile.py --json 画像.json   另存一份JSON
+"""
+import argparse
+import heapq
+import json
+import math
+import os
+import sys
+import time
+from datetime import datetime
+from decimal import Decimal
+
+from dataset_version import current_dataset_version
+from db import ITERSIZE, server_cursor
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 画像缓存目录
+PROFILE_CACHE_DIR = os.path.join(SCRIPTS_DIR, '.cache', 'profile')
+
+PROFILE_TABLE = 'admission_data'
+
+# 不做画像的列（也不从数据库读取）
+SKIP_COLUMNS = {'id', 'row_hash'}
+
+# 不同值个数在此以内时精确计数，超过后改用 HyperLogLog
+EXACT_DISTINCT_LIMIT = 10000
+
+# HyperLogLog 精度（2^12 个寄存器，标准误差约1.6%）
+HLL_PRECISION = 12
+
+# 常见值计数器保留的候选值个数
+TOP_CAPACITY = 1000
+
+# 输出中每列显示的常见值个数
+DEFAULT_TOP = 10
+
+# 直方图最多的分箱数
+HISTOGRAM_BINS = 20
+
+_MASK64 = (1 << 64) - 1
+
+
+def _hash64(value):
+    """64位哈希（本进程内稳定即可，草图不跨进程保存）"""
+    h = hash(value if isinstance(value, str) else repr(value)) & _MASK64
+    # splitmix64 混合，使整数等值的哈希也分布均匀
+    h = (h ^ (h >> 30)) * 0xbf58476d1ce4e5b9 & _MASK64
+    h = (h ^ (h >> 27)) * 0x94d049bb133111eb & _MASK64
+    return h ^ (h >> 31)
+
+
+class HyperLogLog:
+    """不同值个数的估算草图"""
+
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(self.size)
+
+    def add_hash(self, h):
+        index = h >> (64 - self.precision)
+        rest = (h << self.precision) & _MASK64
+        rank = 64 - self.precision + 1 if rest == 0 else 65 - rest.bit_length()
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def estimate(self):
+        m = self.size
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            # 小基数时用线性计数
+            return round(m * math.log(m / zeros))
+        return round(raw)
+
+
+class DistinctCounter:
+    """不同值个数：先用集合精确计数，超过 limit 后改用 HyperLogLog"""
+
+    def __init__(self, limit=EXACT_DISTINCT_LIMIT):
+        self.limit = limit
+        self.values = set()
+        self.sketch = None
+
+    def add(self, value):
+        if self.sketch is not None:
+            self.sketch.add_hash(_hash64(value))
+            return
+        self.values.add(value)
+        if len(self.values) > self.limit:
+            self.sketch = HyperLogLog()
+            for v in self.values:
+                self.sketch.add_hash(_hash64(v))
+            self.values = None
+
+    @property
+    def exact(self):
+        return self.sketch is None
+
+    def count(self):
+        return len(self.values) if self.exact else self.sketch.estimate()
+
+
+class TopValues:
+    """常见值（Misra-Gries，批量淘汰）
+
+    候选值累积到 2*capacity 个时，所有计数减去第 capacity+1 大的计数并去掉归零的值，
+    每次淘汰的开销分摊到之后新增的 capacity 个候选值上。计数因此可能偏低，
+    偏低量不超过 行数/(capacity+1)；从未减过时计数是精确的。
+    """
+
+    def __init__(self, capacity=TOP_CAPACITY):
+        self.capacity = capacity
+        self.counts = {}
+        self.decremented = 0
+
+    def add(self, value):
+        counts = self.counts
+        if value in counts:
+            counts[value] += 1
+            return
+        counts[value] = 1
+        if len(counts) > 2 * self.capacity:
+            self._evict()
+
+    def _evict(self):
+        cut = heapq.nlargest(self.capacity + 1, self.counts.values())[-1]
+        self.decremented += cut
+        self.counts = {v: c - cut for v, c in self.counts.items() if c > cut}
+
+    @property
+    def exact(self):
+        return self.decremented == 0
+
+    def top(self, k):
+        return sorted(self.counts.items(), key=lambda item: (-item[1], str(item[0])))[:k]
+
+
+class Histogram:
+    """数值直方图：等宽分箱，分箱数超过上限时宽度加倍、相邻分箱合并"""
+
+    def __init__(self, max_bins=HISTOGRAM_BINS):
+        self.max_bins = max_bins
+        self.width = 1
+        self.bins = {}
+
+    def add(self, value):
+        index = math.floor(value / self.width)
+        self.bins[index] = self.bins.get(index, 0) + 1
+        while max(self.bins) - min(self.bins) + 1 > self.max_bins:
+            self.width *= 2
+            merged = {}
+            for i, count in self.bins.items():
+                merged[i // 2] = merged.get(i // 2, 0) + count
+            self.bins = merged
+
+    def to_list(self):
+        return [
+            {'low': i * self.width, 'high': (i + 1) * self.width, 'count': count}
+            for i, count in sorted(self.bins.items())
+        ]
+
+
+class ColumnStats:
+    """一列（或一列在某个年份内）的累计统计"""
+
+    def __init__(self, with_sketches=True):
+        self.rows = 0
+        self.nulls = 0
+        self.empties = 0
+        self.numeric = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+        self.distinct = DistinctCounter()
+        self.top = TopValues() if with_sketches else None
+        self.histogram = Histogram() if with_sketches else None
+
+    def add(self, value):
+        self.rows += 1
+        if value is None:
+            self.nulls += 1
+            return
+        if isinstance(value, str) and not value.strip():
+            self.empties += 1
+            return
+        if isinstance(value, Decimal):
+            value = float(value)
+        self.distinct.add(value)
+        if self.top is not None:
+            self.top.add(value)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            self.numeric += 1
+            self.total += value
+            if self.min is None or value < self.min:
+                self.min = value
+            if self.max is None or value > self.max:
+                self.max = value
+            if self.histogram is not None:
+                self.histogram.add(value)
+
+    def to_dict(self, top_k):
+        result = {
+            'rows': self.rows,
+            'nulls': self.nulls,
+            'empties': self.empties,
+            'null_rate': self.nulls / self.rows if self.rows else 0,
+            'empty_rate': self.empties / self.rows if self.rows else 0,
+            'distinct': self.distinct.count(),
+            'distinct_exact': self.distinct.exact,
+        }
+        if self.top is not None:
+            result['top'] = [[value, count] for value, count in self.top.top(top_k)]
+            result['top_exact'] = self.top.exact
+        if self.numeric:
+            result['min'] = self.min
+            result['max'] = self.max
+            result['mean'] = self.total / self.numeric
+            if self.histogram is not None:
+                result['histogram'] = self.histogram.to_list()
+        return result
+
+
+def profile_rows(columns, rows, year_column='year', top_k=DEFAULT_TOP):
+    """对行迭代器做一次扫描，返回 (总行数, {列名: 统计}, {年份: {'rows', 'columns'}})"""
+    indexes = [(i, col) for i, col in enumerate(columns) if col not in SKIP_COLUMNS]
+    year_index = columns.index(year_column) if year_column in columns else None
+    overall = {col: ColumnStats() for _, col in indexes}
+    by_year = {}
+    total = 0
+
+    for row in rows:
+        total += 1
+        year = row[year_index] if year_index is not None else None
+        year_stats = by_year.get(year)
+        if year_stats is None:
+            # 分年份只统计空值、不同值个数和数值范围
+            year_stats = by_year[year] = {col: ColumnStats(with_sketches=False) for _, col in indexes}
+        for i, col in indexes:
+            value = row[i]
+            overall[col].add(value)
+            year_stats[col].add(value)
+
+    return (
+        total,
+        {col: stats.to_dict(top_k) for col, stats in overall.items()},
+        {
+            year: {
+                'rows': next(iter(stats.values())).rows if stats else 0,
+                'columns': {col: s.to_dict(top_k) for col, s in stats.items()},
+            }
+            for year, stats in sorted(by_year.items(), key=lambda item: (item[0] is None, item[0]))
+        },
+    )
+
+
+def scan_profile(conn, top_k=DEFAULT_TOP, itersize=ITERSIZE):
+    """在一个可重复读的只读事务中读取数据版本并扫描全表，返回画像"""
+    conn.set_session(isolation_level='REPEATABLE READ', readonly=True)
+    try:
+        cursor = conn.cursor()
+        version = current_dataset_version(cursor)
+        cursor.execute(f"SELECT * FROM {PROFILE_TABLE} LIMIT 0")
+        columns = [d[0] for d in cursor.description if d[0] not in SKIP_COLUMNS]
+        cursor.close()
+
+        start = time.perf_counter()
+        scan = server_cursor(conn, name='data_profile_scan', itersize=itersize)
+        scan.execute(f"SELECT {', '.join(columns)} FROM {PROFILE_TABLE}")
+        total, column_profiles, year_profiles = profile_rows(columns, scan, top_k=top_k)
+        scan.close()
+        conn.rollback()
+    finally:
+        conn.set_session(isolation_level='DEFAULT', readonly=False)
+
+    return {
+        'table': PROFILE_TABLE,
+        'dataset_version': version,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'scan_seconds': round(time.perf_counter() - start, 3),
+        'rows': total,
+        'columns': column_profiles,
+        'years': year_profiles,
+    }
+
+
+def cache_path(database, version):
+    return os.path.join(PROFILE_CACHE_DIR, f'{database}_{PROFILE_TABLE}_v{version}.json')
+
+
+def load_cached_profile(database, version):
+    try:
+        with open(cache_path(database, version), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_profile(profile, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(profile, f, ensure_ascii=False, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+
+def get_profile(conn, database, refresh=False, top_k=DEFAULT_TOP):
+    """读取画像：当前数据版本有缓存时直接返回缓存，否则扫描并写入缓存
+
+    返回 (画像, 是否来自缓存)。还没有版本记录（版本0）时无法判断数据是否变化，总是重新扫描。
+    """
+    cursor = conn.cursor()
+    version = current_dataset_version(cursor)
+    cursor.close()
+    conn.rollback()
+
+    if version and not refresh:
+        cached = load_cached_profile(database, version)
+        if cached is not None and cached.get('top_k', 0) >= top_k:
+            return cached, True
+
+    profile = scan_profile(conn, top_k=top_k)
+    profile['top_k'] = top_k
+    if profile['dataset_version']:
+        save_profile(profile, cache_path(database, profile['dataset_version']))
+    return profile, False
+
+
+def _format_value(value, limit=30):
+    text = '' if value is None else str(value)
+    return text if len(text) <= limit else text[:limit - 1] + '…'
+
+
+def _format_number(value):
+    if isinstance(value, float) and not value.is_integer():
+        return f'{value:.2f}'
+    return str(int(value))
+
+
+def render_profile(profile, top_k=DEFAULT_TOP):
+    lines = [
+        f"=== {profile['table']} 数据画像（数据版本 v{profile['dataset_version']}，"
+        f"{profile['rows']:,} 行，扫描 {profile['scan_seconds']:.1f}s）===",
+    ]
+    for col, stats in profile['columns'].items():
+        approx = '' if stats['distinct_exact'] else '≈'
+        lines.append('')
+        lines.append(f"【{col}】空值 {stats['null_rate']:.1%}，空字符串 {stats['empty_rate']:.1%}，"
+                     f"不同值 {approx}{stats['distinct']:,}")
+        if 'min' in stats:
+            lines.append(f"  范围 {_format_number(stats['min'])} ~ {_format_number(stats['max'])}，"
+                         f"平均 {_format_number(stats['mean'])}")
+        if stats.get('top'):
+            mark = '' if stats['top_exact'] else '（计数为估计的下限）'
+            lines.append(f"  常见值{mark}:")
+            for value, count in stats['top'][:top_k]:
+                lines.append(f"    {_format_value(value):<32} {count:>8,}")
+        if stats.get('histogram'):
+            lines.append('  直方图:')
+            peak = max(b['count'] for b in stats['histogram'])
+            for b in stats['histogram']:
+                bar = '█' * max(1, round(b['count'] / peak * 30))
+                lines.append(f"    [{_format_number(b['low']):>9}, {_format_number(b['high']):>9}) "
+                             f"{b['count']:>8,} {bar}")
+
+    lines.append('')
+    lines.append('【按年份】')
+    for year, year_profile in profile['years'].items():
+        lines.append(f"  {year}年: {year_profile['rows']:,} 行")
+        for col, stats in year_profile['columns'].items():
+            if not (stats['nulls'] or stats['empties'] or 'min' in stats):
+                continue
+            parts = []
+            if stats['nulls'] or stats['empties']:
+                parts.append(f"空值 {stats['null_rate']:.1%}，空字符串 {stats['empty_rate']:.1%}")
+            if 'min' in stats:
+                parts.append(f"{_format_number(stats['min'])} ~ {_format_number(stats['max'])}，"
+                             f"平均 {_format_number(stats['mean'])}")
+            lines.append(f"    {col:<20} {'；'.join(parts)}")
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    if sys.platform == 'win32':
+        import io
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+        sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+    from db import DB_CONFIG, connect
+
+    parser = argparse.ArgumentParser(description='admission_data 数据画像（一次扫描）')
+    parser.add_argument('--refresh', action='store_true', help='忽略缓存，重新扫描')
+    parser.add_argument('--top', type=int, default=DEFAULT_TOP, help='每列显示的常见值个数')
+    parser.add_argument('--json', help='另存一份JSON画像')
+    args = parser.parse_args()
+
+    conn = connect()
+    profile, cached = get_profile(conn, DB_CONFIG['database'], refresh=args.refresh, top_k=args.top)
+    conn.close()
+
+    print(render_profile(profile, top_k=args.top))
+    if cached:
+        print(f"\n✅ 数据版本 v{profile['dataset_version']} 未变，使用缓存（{profile['created_at']} 生成）")
+    elif not profile['dataset_version']:
+        print("\n⚠️ 还没有数据版本记录，画像未缓存（重新导入数据后会开始记录版本）")
+    if args.json:
+        save_profile(profile, args.json)
+        print(f"📊 JSON画像已写入: {args.json}")
@@ -0,0 +1,67 @@
+"""
+admission_data 的数据版本
+每个改动 admission_data 的事务都调用 bump_dataset_version 记录一个新版本（与数据一同提交或回滚），
+数据画像等派生结果按版本号缓存，数据一变，版本号随之改变，旧结果不再使用。
+
+用法: python dataset_version.py    查看当前版本和最近的版本记录
+"""
+import sys
+
+VERSION_TABLE = 'dataset_versions'
+
+CREATE_VERSION_SQL = f"""
+CREATE TABLE IF NOT EXISTS {VERSION_TABLE} (
+    version SERIAL PRIMARY KEY,
+    source VARCHAR(100) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+
+def ensure_version_table(cursor):
+    cursor.execute(CREATE_VERSION_SQL)
+
+
+def bump_dataset_version(cursor, source):
+    """记录一个新的数据版本（不提交事务），返回版本号
+
+    source 说明是哪个操作改动了数据，如 'import-excel'、'shadow_reload'。
+    """
+    ensure_version_table(cursor)
+    cursor.execute(f"INSERT INTO {VERSION_TABLE} (source) VALUES (%s) RETURNING version",
+                   (source,))
+    return cursor.fetchone()[0]
+
+
+def current_dataset_version(cursor):
+    """当前数据版本号；还没有任何版本记录时为0（只读，不建表）"""
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (VERSION_TABLE,))
+    if not cursor.fetchone()[0]:
+        return 0
+    cursor.execute(f"SELECT COALESCE(MAX(version), 0) FROM {VERSION_TABLE}")
+    return cursor.fetchone()[0]
+
+
+if __name__ == '__main__':
+    if sys.platform == 'win32':
+        import io
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+        sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+    from db import connect
+    conn = connect()
+    cursor = conn.cursor()
+    version = current_dataset_version(cursor)
+    print(f"📊 当前数据版本: {version}")
+    if version:
+        cursor.execute(f"""
+            SELECT version, source, created_at
+            FROM {VERSION_TABLE}
+            ORDER BY version DESC
+            LIMIT 10
+        """)
+        print("\n【最近的版本】")
+        for version, source, created_at in cursor.fetchall():
+            print(f"  v{version}  {created_at:%Y-%m-%d %H:%M:%S}  {source}")
+    cursor.close()
+    conn.close()
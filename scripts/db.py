@@ -0,0 +1,194 @@
+"""
+脚本共用的数据库访问
+连接配置取自 backend/.env 中的 DATABASE_URL（与后端使用同一个数据库和账号），
+不再由各脚本各自写死；每个连接建立时即设置语句超时，大表扫描使用服务器端游标分批读取，
+内存占用与结果行数无关。
+
+环境变量：
+    DATABASE_URL           postgresql://用户:密码@主机:端口/数据库（backend/.env 中已有）
+    DB_STATEMENT_TIMEOUT   语句超时，如 30min、60s，0 表示不限制（默认 30min）
+    DB_ITERSIZE            服务器端游标每批读取的行数（默认 5000）
+    DB_POOL_SIZE           连接池最大连接数（默认 4）
+    DB_TRACE               开启语句计时，见 query_trace.py（默认关闭）
+
+用法: python db.py    显示当前使用的连接配置并测试连接
+"""
+import atexit
+import itertools
+import os
+import sys
+from contextlib import contextmanager
+from urllib.parse import unquote, urlparse
+
+import psycopg2
+from dotenv import load_dotenv
+from psycopg2.pool import ThreadedConnectionPool
+
+from query_trace import TracingConnection, trace_enabled
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 后端的环境变量文件（按脚本所在目录定位，不依赖当前工作目录）
+ENV_FILE = os.path.join(SCRIPTS_DIR, '..', 'backend', '.env')
+
+DEFAULT_STATEMENT_TIMEOUT = '30min'
+
+DEFAULT_ITERSIZE = 5000
+
+DEFAULT_POOL_SIZE = 4
+
+load_dotenv(ENV_FILE)
+
+STATEMENT_TIMEOUT = os.environ.get('DB_STATEMENT_TIMEOUT', DEFAULT_STATEMENT_TIMEOUT)
+ITERSIZE = int(os.environ.get('DB_ITERSIZE', DEFAULT_ITERSIZE))
+POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', DEFAULT_POOL_SIZE))
+
+# 未开启语句计时时连接不做任何包装
+TRACE = trace_enabled()
+
+
+def parse_database_url(url):
+    """把 DATABASE_URL 解析为 psycopg2 的连接参数（忽略 Prisma 的 ?schema= 等查询参数）"""
+    parsed = urlparse(url)
+    if parsed.scheme not in ('postgresql', 'postgres'):
+        raise ValueError(f"不支持的数据库URL: {parsed.scheme}://...")
+    return {
+        'host': parsed.hostname or 'localhost',
+        'port': parsed.port or 5432,
+        'database': unquote(parsed.path.lstrip('/')),
+        'user': unquote(parsed.username or ''),
+        'password': unquote(parsed.password or ''),
+    }
+
+
+def load_db_config():
+    """读取 DATABASE_URL；未配置时直接退出并提示，不使用写死的默认账号"""
+    url = os.environ.get('DATABASE_URL')
+    if not url:
+        raise SystemExit(
+            f"❌ 未配置 DATABASE_URL：请在 {os.path.normpath(ENV_FILE)} 中设置"
+            f"（参考 backend/.env.example），或设置同名环境变量"
+        )
+    return parse_database_url(url)
+
+
+# 各脚本共用的连接参数（host/port/database/user/password）
+DB_CONFIG = load_db_config()
+
+
+def _connect_kwargs(db_config, statement_timeout):
+    timeout = STATEMENT_TIMEOUT if statement_timeout is None else statement_timeout
+    kwargs = {
+        **(db_config or DB_CONFIG),
+        'application_name': os.path.basename(sys.argv[0] or 'python')[:63],
+        # 建立连接时即生效，无需额外的 SET 往返
+        'options': f'-c statement_timeout={timeout}',
+    }
+    if TRACE:
+        kwargs['connection_factory'] = TracingConnection
+    return kwargs
+
+
+def connect(db_config=None, statement_timeout=None):
+    """新建一个连接（默认使用 DB_CONFIG 和 DB_STATEMENT_TIMEOUT）"""
+    return psycopg2.connect(**_connect_kwargs(db_config, statement_timeout))
+
+
+def create_pool(maxconn=None, db_config=None, statement_timeout=None):
+    """新建一个线程安全的连接池，由调用方负责 closeall()"""
+    return ThreadedConnectionPool(1, maxconn or POOL_SIZE,
+                                  **_connect_kwargs(db_config, statement_timeout))
+
+
+_pool = None
+
+
+def get_pool():
+    """进程内共用的连接池（首次使用时创建，进程退出时关闭）"""
+    global _pool
+    if _pool is None:
+        _pool = create_pool()
+        atexit.register(close_pool)
+    return _pool
+
+
+def close_pool():
+    global _pool
+    if _pool is not None:
+        _pool.closeall()
+        _pool = None
+
+
+@contextmanager
+def pooled_connection():
+    """从共用连接池取出一个连接，用完后回滚未提交的事务并归还"""
+    pool = get_pool()
+    conn = pool.getconn()
+    try:
+        yield conn
+    finally:
+        if not conn.closed:
+            conn.rollback()
+        pool.putconn(conn)
+
+
+_cursor_names = itertools.count(1)
+
+
+def server_cursor(conn, name=None, itersize=None):
+    """服务器端（命名）游标：遍历时每次只从数据库取 itersize 行
+
+    需在事务中使用（连接不能是 autocommit），提交或回滚后游标失效。
+    """
+    cursor = conn.cursor(name=name or f'scan_{os.getpid()}_{next(_cursor_names)}')
+    cursor.itersize = itersize or ITERSIZE
+    return cursor
+
+
+def iter_rows(conn, sql, params=None, itersize=None):
+    """逐行遍历大查询的结果，内存中最多保留 itersize 行"""
+    cursor = server_cursor(conn, itersize=itersize)
+    try:
+        cursor.execute(sql, params)
+        yield from cursor
+    finally:
+        cursor.close()
+
+
+def iter_batches(conn, sql, params=None, itersize=None):
+    """按批遍历大查询的结果，每批最多 itersize 行
+
+    两批之间可以在同一连接上执行其他语句（如把处理结果COPY写回），逐行遍历时则不行。
+    """
+    size = itersize or ITERSIZE
+    cursor = server_cursor(conn, itersize=size)
+    try:
+        cursor.execute(sql, params)
+        while True:
+            batch = cursor.fetchmany(size)
+            if not batch:
+                break
+            yield batch
+    finally:
+        cursor.close()
+
+
+if __name__ == '__main__':
+    if sys.platform == 'win32':
+        import io
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+        sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+    print(f"配置来源: DATABASE_URL（{os.path.normpath(ENV_FILE)} 或环境变量）")
+    print(f"  {DB_CONFIG['user']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}")
+    print(f"  语句超时 {STATEMENT_TIMEOUT}，游标每批 {ITERSIZE} 行，连接池 {POOL_SIZE} 个连接")
+    try:
+        conn = connect()
+    except Exception as e:
+        print(f"❌ 数据库连接失败: {e}")
+        sys.exit(1)
+    cursor = conn.cursor()
+    cursor.execute("SHOW statement_timeout")
+    print(f"✅ 连接成功（statement_timeout = {cursor.fetchone()[0]}）")
+    cursor.close()
+    conn.close()
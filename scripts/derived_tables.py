@@ -0,0 +1,162 @@
+"""
+由 admission_data 派生的预计算表
+每个派生表记录它是按哪个数据版本（见 dataset_version.py）生成的：数据版本变化后重建，
+未变化时跳过。后端在读取派生表的同一个事务快照中比较两个版本号，派生表过期时改用原来的
+实时查询，因此导入数据与重建派生表之间的这段时间里结果仍然正确。
+
+改动数据的脚本在提交后调用 refresh_stale_tables()。
+
+用法: python derived_tables.py                      重建已过期的派生表
+      python derived_tables.py --force              全部重建
+      python derived_tables.py --table score_rank_table
+"""
+import argparse
+import sys
+import time
+
+from autocomplete_index import AUTOCOMPLETE_TABLE, refresh_autocomplete_index
+from dataset_version import current_dataset_version, ensure_version_table
+from db import connect
+from score_rank_table import SCORE_RANK_TABLE, refresh_score_rank_table
+from stats_tables import STATS_TABLES, refresh_stats_tables
+from university_summary import UNIVERSITY_SUMMARY_TABLE, refresh_university_summary
+
+DERIVED_VERSION_TABLE = 'derived_table_versions'
+
+CREATE_DERIVED_VERSION_SQL = f"""
+CREATE TABLE IF NOT EXISTS {DERIVED_VERSION_TABLE} (
+    name VARCHAR(100) PRIMARY KEY,
+    dataset_version INTEGER NOT NULL,
+    refreshed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+# (表名, 重建函数)；重建函数在调用方的事务中重建（或增量更新）整张表或一组表，返回写入行数
+DERIVED_TABLES = [
+    (SCORE_RANK_TABLE, refresh_score_rank_table),
+    (STATS_TABLES, refresh_stats_tables),
+    (UNIVERSITY_SUMMARY_TABLE, refresh_university_summary),
+    (AUTOCOMPLETE_TABLE, refresh_autocomplete_index),
+]
+
+# 同一时间只允许一个进程重建派生表
+REFRESH_LOCK_KEY = 0x64657269
+
+
+def derived_table_version(cursor, name):
+    """派生表对应的数据版本；从未生成过时为 None"""
+    cursor.execute(f"SELECT dataset_version FROM {DERIVED_VERSION_TABLE} WHERE name = %s",
+                   (name,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def mark_derived_table(cursor, name, version):
+    cursor.execute(f"""
+        INSERT INTO {DERIVED_VERSION_TABLE} (name, dataset_version, refreshed_at)
+        VALUES (%s, %s, CURRENT_TIMESTAMP)
+        ON CONFLICT (name) DO UPDATE
+        SET dataset_version = EXCLUDED.dataset_version, refreshed_at = EXCLUDED.refreshed_at
+    """, (name, version))
+
+
+def refresh_derived_tables(conn, names=None, force=False):
+    """重建数据版本已变化的派生表（force 时全部重建）
+
+    每个表在各自的可重复读事务中读取数据版本并重建，派生表与它记录的版本对应同一份数据。
+    某个表重建失败时回滚该表、打印错误并继续下一个表（失败的表仍为过期，后端使用实时查询）。
+    需在调用方提交对 admission_data 的改动之后调用。
+
+    返回 (已重建 {表名: 写入行数}, 失败 {表名: 异常})
+    """
+    wanted = set(names) if names else None
+    if wanted:
+        unknown = wanted - {name for name, _ in DERIVED_TABLES}
+        if unknown:
+            raise ValueError(f"未知的派生表: {', '.join(sorted(unknown))}")
+
+    refreshed = {}
+    failed = {}
+    conn.set_session(isolation_level='REPEATABLE READ')
+    try:
+        for name, refresh in DERIVED_TABLES:
+            if wanted and name not in wanted:
+                continue
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT pg_advisory_xact_lock(%s)", (REFRESH_LOCK_KEY,))
+                cursor.execute(CREATE_DERIVED_VERSION_SQL)
+                # 后端的版本检查需要两张版本表都存在
+                ensure_version_table(cursor)
+                version = current_dataset_version(cursor)
+                if not force and derived_table_version(cursor, name) == version:
+                    conn.rollback()
+                    print(f"✅ {name} 已是最新（数据版本 {version}）")
+                    continue
+
+                start = time.perf_counter()
+                rows = refresh(cursor)
+                mark_derived_table(cursor, name, version)
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                failed[name] = e
+                print(f"❌ {name} 重建失败: {e}")
+                continue
+            finally:
+                cursor.close()
+            refreshed[name] = rows
+            print(f"✅ {name} 已重建: {rows:,} 行（数据版本 {version}，"
+                  f"{time.perf_counter() - start:.1f}秒）")
+    finally:
+        conn.set_session(isolation_level='DEFAULT')
+    return refreshed, failed
+
+
+def refresh_stale_tables(db_config=None):
+    """数据改动提交后调用：新开一个连接重建已过期的派生表
+
+    重建失败只提示，不影响已提交的数据（后端在派生表过期时使用实时查询）。
+    返回值与 refresh_derived_tables 相同。
+    """
+    try:
+        conn = connect(db_config)
+    except Exception as e:
+        print(f"⚠️  派生表未重建（连接失败: {e}），可稍后运行 python derived_tables.py")
+        return {}, {name: e for name, _ in DERIVED_TABLES}
+    try:
+        refreshed, failed = refresh_derived_tables(conn)
+    except Exception as e:
+        print(f"⚠️  派生表重建失败: {e}，可稍后运行 python derived_tables.py")
+        return {}, {name: e for name, _ in DERIVED_TABLES}
+    finally:
+        conn.close()
+    if failed:
+        print(f"⚠️  {len(failed)} 个派生表未重建（{', '.join(failed)}），可稍后运行 python derived_tables.py")
+    return refreshed, failed
+
+
+if __name__ == '__main__':
+    if sys.platform == 'win32':
+        import io
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+        sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+    parser = argparse.ArgumentParser(description='重建由录取数据派生的预计算表')
+    parser.add_argument('--force', action='store_true', help='数据版本未变也重建')
+    parser.add_argument('--table', action='append', dest='tables',
+                        choices=[name for name, _ in DERIVED_TABLES],
+                        help='只重建指定的表（可重复）')
+    args = parser.parse_args()
+
+    conn = connect()
+    try:
+        _, failed = refresh_derived_tables(conn, names=args.tables, force=args.force)
+    except Exception as e:
+        print(f"❌ 重建派生表失败: {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
+    if failed:
+        print(f"❌ {len(failed)} 个派生表重建失败: {', '.join(failed)}")
+        sys.exit(1)
@@ -0,0 +1,294 @@
+"""
+数据检查汇总
+把 check_categories.py、check_major_notes.py、check_school_locations.py、check_all_years_renwen.py、
+test_major_search.py、test_university_exact.py 中的检查合并为一次运行：
+各项检查通过一个小连接池并发执行，计数合并为 GROUP BY 查询，随机示例用 TABLESAMPLE 抽样，
+最后输出一份汇总报告（文本 + JSON），包含每项检查的耗时。
+
+用法: python diagnostics.py                        运行全部检查
+      python diagnostics.py --check categories     只运行指定检查（可重复指定）
+      python diagnostics.py --json 报告.json       指定JSON报告路径
+"""
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from db import create_pool
+
+# 默认并发数（同时也是连接池大小）
+DEFAULT_WORKERS = 4
+
+# 单条检查语句的超时
+CHECK_STATEMENT_TIMEOUT = '2min'
+
+DEFAULT_JSON_REPORT = 'diagnostics_report.json'
+
+# 前端地区筛选中的选项
+FRONTEND_LOCATIONS = ['北京', '上海', '浙江', '江苏', '广东']
+
+# 随机示例的抽样比例（%）：从小到大尝试，直到取够示例行数
+SAMPLE_PERCENTS = [1, 10, 100]
+
+
+def _section(cursor, title, sql, params=None):
+    """执行一条查询，结果作为报告中的一节"""
+    cursor.execute(sql, params)
+    return {
+        'title': title,
+        'columns': [d[0] for d in cursor.description],
+        'rows': [list(row) for row in cursor.fetchall()],
+    }
+
+
+def sample_section(cursor, title, columns, where, limit):
+    """用 TABLESAMPLE 随机抽取满足条件的示例行（不对全表排序）"""
+    for percent in SAMPLE_PERCENTS:
+        section = _section(cursor, title, f"""
+            SELECT {columns}
+            FROM admission_data TABLESAMPLE SYSTEM (%s)
+            WHERE {where}
+            LIMIT %s
+        """, (percent, limit))
+        if len(section['rows']) >= limit:
+            break
+    return section
+
+
+def check_categories(cursor):
+    return [_section(cursor, '科类字段取值', """
+        SELECT category, COUNT(*) AS count
+        FROM admission_data
+        GROUP BY category
+        ORDER BY category
+    """)]
+
+
+def check_major_notes(cursor):
+    return [
+        _section(cursor, '专业备注统计', """
+            SELECT CASE WHEN major_note IS NULL OR major_note = '' THEN '无备注'
+                        ELSE '有备注' END AS note_status,
+                   COUNT(*) AS count
+            FROM admission_data
+            GROUP BY note_status
+        """),
+        _section(cursor, '有专业备注的示例（前20条）', """
+            SELECT university_name, major, major_note
+            FROM admission_data
+            WHERE major_note IS NOT NULL AND major_note != ''
+            LIMIT 20
+        """),
+        _section(cursor, '无专业备注的示例（前10条）', """
+            SELECT university_name, major, major_note
+            FROM admission_data
+            WHERE major_note IS NULL OR major_note = ''
+            LIMIT 10
+        """),
+        _section(cursor, '字段信息', """
+            SELECT column_name, data_type, character_maximum_length
+            FROM information_schema.columns
+            WHERE table_name = 'admission_data'
+              AND column_name = 'major_note'
+        """),
+    ]
+
+
+def check_school_locations(cursor):
+    locations = _section(cursor, '各地区数据量', """
+        SELECT school_location, COUNT(*) AS count
+        FROM admission_data
+        WHERE school_location IS NOT NULL AND school_location != ''
+        GROUP BY school_location
+        ORDER BY count DESC, school_location
+    """)
+    # 前端筛选选项的数量直接取自上面的分组结果
+    counts = dict(locations['rows'])
+    targets = {
+        'title': '前端筛选选项',
+        'columns': ['school_location', 'count'],
+        'rows': [[location, counts.get(location, 0)] for location in FRONTEND_LOCATIONS],
+    }
+    return [locations, targets]
+
+
+def check_zju_renwen(cursor):
+    return [
+        _section(cursor, '浙江大学人文科学试验班（各年份）', """
+            SELECT year, major, major_note, min_score
+            FROM admission_data
+            WHERE university_name = '浙江大学'
+              AND major ILIKE '%人文科学试验班%'
+            ORDER BY year
+        """),
+        _section(cursor, '浙江大学2025年专业备注统计', """
+            SELECT CASE WHEN major_note IS NULL THEN '无备注'
+                        WHEN major_note = '' THEN '空字符串'
+                        ELSE '有备注' END AS note_status,
+                   COUNT(*) AS count
+            FROM admission_data
+            WHERE university_name = '浙江大学'
+              AND year = 2025
+            GROUP BY note_status
+        """),
+        sample_section(cursor, '有专业备注的随机示例', 'university_name, major, major_note',
+                        "major_note IS NOT NULL AND major_note != ''", 5),
+    ]
+
+
+def check_major_search(cursor):
+    return [
+        _section(cursor, "包含'计算机'的专业", """
+            SELECT major, university_name
+            FROM admission_data
+            WHERE major ILIKE '%计算机%'
+            LIMIT 5
+        """),
+        _section(cursor, '专业字段示例', """
+            SELECT major
+            FROM admission_data
+            LIMIT 10
+        """),
+    ]
+
+
+def check_university_exact(cursor):
+    # 名称和总数一次分组得到
+    section = _section(cursor, "包含'清华'的院校名称", """
+        SELECT university_name, COUNT(*) AS count
+        FROM admission_data
+        WHERE university_name ILIKE '%清华%'
+        GROUP BY university_name
+        ORDER BY count DESC
+    """)
+    total = sum(count for _, count in section['rows'])
+    return [section, {
+        'title': "ILIKE '%清华%' 匹配的记录数",
+        'columns': ['count'],
+        'rows': [[total]],
+    }]
+
+
+# (检查名, 标题, 函数)
+CHECKS = [
+    ('categories', '科类字段', check_categories),
+    ('major_notes', '专业备注字段', check_major_notes),
+    ('school_locations', '院校地区字段', check_school_locations),
+    ('zju_renwen', '浙江大学人文科学试验班', check_zju_renwen),
+    ('major_search', '专业名称搜索', check_major_search),
+    ('university_exact', '院校名称匹配', check_university_exact),
+]
+
+
+def run_check(pool, name, title, func):
+    """从连接池取一个连接执行一项检查（只读），返回该项的结果和耗时"""
+    conn = pool.getconn()
+    start = time.perf_counter()
+    result = {'name': name, 'title': title}
+    try:
+        conn.readonly = True
+        cursor = conn.cursor()
+        result['sections'] = func(cursor)
+        result['status'] = 'ok'
+        cursor.close()
+    except Exception as e:
+        result['status'] = 'error'
+        result['error'] = str(e)
+    finally:
+        conn.rollback()
+        pool.putconn(conn)
+    result['elapsed_s'] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def run_diagnostics(db_config, workers=DEFAULT_WORKERS, names=None):
+    """并发运行检查，返回汇总报告（按 CHECKS 中的顺序排列）"""
+    checks = [c for c in CHECKS if names is None or c[0] in names]
+    workers = max(1, min(workers, len(checks)))
+    pool = create_pool(workers, db_config, statement_timeout=CHECK_STATEMENT_TIMEOUT)
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(run_check, pool, *check) for check in checks]
+            results = [future.result() for future in futures]
+    finally:
+        pool.closeall()
+    return {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'database': db_config.get('database'),
+        'workers': workers,
+        'elapsed_s': round(time.perf_counter() - start, 3),
+        'checks': results,
+    }
+
+
+def render_text(report):
+    """汇总报告的文本形式"""
+    lines = [f"=== 数据检查报告（{report['created_at']}，{report['workers']} 个连接并发）===", '']
+    for check in report['checks']:
+        mark = '✅' if check['status'] == 'ok' else '❌'
+        lines.append(f"{mark} {check['title']}（{check['name']}，{check['elapsed_s']:.3f}s）")
+        if check['status'] != 'ok':
+            lines.append(f"  错误: {check['error']}")
+            lines.append('')
+            continue
+        for section in check['sections']:
+            lines.append(f"【{section['title']}】")
+            if not section['rows']:
+                lines.append('  （无记录）')
+            for row in section['rows']:
+                lines.append('  ' + ' | '.join('' if v is None else str(v) for v in row))
+        lines.append('')
+
+    lines.append('【各项耗时】')
+    for check in sorted(report['checks'], key=lambda c: c['elapsed_s'], reverse=True):
+        lines.append(f"  {check['name']:<18} {check['elapsed_s']:>8.3f}s")
+    lines.append(f"  {'合计（并发）':<14} {report['elapsed_s']:>8.3f}s")
+    return '\n'.join(lines)
+
+
+def report_to_json(report):
+    """JSON报告中每节的行转换为 {列名: 值}"""
+    checks = []
+    for check in report['checks']:
+        check = dict(check)
+        if 'sections' in check:
+            check['sections'] = [
+                {'title': s['title'], 'rows': [dict(zip(s['columns'], row)) for row in s['rows']]}
+                for s in check['sections']
+            ]
+        checks.append(check)
+    return {**report, 'checks': checks}
+
+
+if __name__ == '__main__':
+    if sys.platform == 'win32':
+        import io
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+        sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+    from db import DB_CONFIG
+
+    parser = argparse.ArgumentParser(description='并发运行全部数据检查，输出汇总报告')
+    parser.add_argument('--check', action='append', choices=[c[0] for c in CHECKS],
+                        help='只运行指定检查（可重复指定）')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='并发连接数')
+    parser.add_argument('--json', default=DEFAULT_JSON_REPORT, help='JSON报告路径')
+    parser.add_argument('--text', help='同时把文本报告写入该文件')
+    args = parser.parse_args()
+
+    report = run_diagnostics(DB_CONFIG, args.workers, args.check)
+    text = render_text(report)
+    print(text)
+
+    with open(args.json, 'w', encoding='utf-8') as f:
+        json.dump(report_to_json(report), f, ensure_ascii=False, indent=2, default=str)
+    if args.text:
+        with open(args.text, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    print(f"\n📊 JSON报告已写入: {args.json}")
+
+    if any(check['status'] != 'ok' for check in report['checks']):
+        sys.exit(1)
@@ -0,0 +1,207 @@
+"""
+教育部12个学科门类的专业分类
+专业代码前两位即学科门类，代码有效时直接查表；代码缺失或不规范时按专业名称中的关键词判断。
+关键词表编译为多模式匹配自动机，一次扫描名称即可得到结果。
+"""
+import re
+
+# 教育部本科专业代码前两位对应的学科门类（11 军事学不在12个门类中）
+CODE_PREFIX_DISCIPLINES = {
+    '01': '哲学',
+    '02': '经济学',
+    '03': '法学',
+    '04': '教育学',
+    '05': '文学',
+    '06': '历史学',
+    '07': '理学',
+    '08': '工学',
+    '09': '农学',
+    '10': '医学',
+    '12': '管理学',
+    '13': '艺术学',
+}
+
+# 本科专业代码：4位（专业类）或6位数字，可带 K、T 等后缀，第一组为门类代码
+MAJOR_CODE_PATTERN = r'^(\d{2})\d{2}(?:\d{2})?[A-Z]{0,2}$'
+_CODE_RE = re.compile(MAJOR_CODE_PATTERN)
+
+# 12个学科门类关键词定义
+DISCIPLINE_KEYWORDS = {
+    '哲学': [
+        '哲学', '马克思主义哲学', '中国哲学', '外国哲学', '逻辑学', '伦理学',
+        '美学', '宗教学', '科学技术哲学'
+    ],
+
+    '经济学': [
+        '经济', '金融', '金融学', '国际经济', '贸易', '经济学', '财政', '税务',
+        '保险', '投资', '金融工程', '金融数学', '经济与金融', '信用管理'
+    ],
+
+    '法学': [
+        '法学', '法律', '知识产权', '监狱学', '司法', '侦查', '治安',
+        '公安', '消防', '政治', '社会学', '社会工作', '国际政治'
+    ],
+
+    '教育学': [
+        '教育', '学前教育', '小学教育', '特殊教育', '体育教育', '运动训练',
+        '社会体育', '运动康复', '运动人体科学', '休闲体育', '武术',
+    ],
+
+    '文学': [
+        '文学', '汉语言', '汉语', '英语', '日语', '俄语', '德语', '法语',
+        '西班牙语', '阿拉伯语', '朝鲜语', '葡萄牙语', '意大利语',
+        '翻译', '商务英语', '新闻', '传播', '广告学', '编辑出版',
+        '网络与新媒体', '数字出版', '汉语国际教育', '外国语言'
+    ],
+
+    '历史学': [
+        '历史', '世界史', '考古', '文物', '博物馆', '文物保护',
+        '文化遗产', '古生物学', '历史学'
+    ],
+
+    '理学': [
+        '数学', '物理', '化学', '生物', '地理', '天文', '大气',
+        '海洋', '地球', '地质', '力学', '统计学', '应用统计',
+        '应用化学', '应用物理', '应用数学', '化学生物', '分子科学',
+        '心理学', '信息与计算', '数理', '生态', '环境科学'
+    ],
+
+    '工学': [
+        '计算机', '软件', '电子', '通信', '电气', '自动化', '机械',
+        '仪器', '材料', '冶金', '能源', '动力', '水利', '测绘',
+        '化工', '轻工', '纺织', '食品', '建筑', '土木', '城规',
+        '园林', '环境', '交通', '运输', '海洋', '航空航天', '兵器',
+        '核工程', '地质', '矿业', '石油', '力学', '工程', '技术',
+        '安全', '包装', '印刷', '船舶', '汽车', '铁路', '公路',
+        '民航', '飞行', '制药', '生物工程', '生物医学',
+        '信息', '网络', '物联网', '数据', '智能', '机器人', '集成电路',
+        '微电子', '光电', '测控', '电气工程', '控制', '系统'
+    ],
+
+    '农学': [
+        '农学', '园艺', '植物', '动物', '动物医学', '动物科学', '水产',
+        '海洋渔业', '林业', '园林', '草业', '农业', '农村', '兽',
+        '林学', '园艺', '植物保护', '植保', '农业资源', '农业工程'
+    ],
+
+    '医学': [
+        '临床', '口腔', '中医', '中西医', '药学', '医学', '护理',
+        '预防', '公共卫生', '医学技术', '康复', '针推', '针灸',
+        '推拿', '影像', '检验', '眼视光', '精神', '麻醉', '儿科学',
+        '妇产', '肿瘤', '心血管', '呼吸', '消化', '内分泌', '神经',
+        '皮肤', '性病', '传染', '结核', '血液', '肾脏', '泌尿',
+        '耳鼻', '喉', '口腔', '病理', '法医', '护理', '助产'
+    ],
+
+    '管理学': [
+        '管理', '会计', '财务', '工商', '公共', '行政', '人力资源',
+        '市场营销', '旅游', '酒店', '物流', '供应链', '电子商务',
+        '信息管理', '信息系统', '工程管理', '项目管理', '房地产',
+        '土地资源', '农林经济', '农村区域', '图书馆', '档案', '保密',
+        '行政管理', '公共事业', '劳动', '社保', '城市管理', '海关'
+    ],
+
+    '艺术学': [
+        '艺术', '音乐', '美术', '设计', '视觉传达', '环境', '产品设计',
+        '服装', '动画', '绘画', '雕塑', '书法', '舞蹈', '表演', '播音',
+        '主持', '广播电视', '编导', '戏剧', '电影', '影视', '摄影',
+        '录音', '公共艺术', '工艺美术', '数字媒体', '艺术史', '艺术理论',
+        '戏曲', '曲艺', '珠宝', '首饰', '陶瓷', '漆艺', '时装'
+    ]
+}
+
+
+class DisciplineMatcher:
+    """把学科门类关键词表编译为一个多模式匹配自动机（Aho-Corasick）
+
+    一次扫描专业名称即可找到全部命中的关键词。判定规则与逐个关键词比对相同：
+    按门类在关键词表中的顺序，返回第一个有关键词出现在名称中的门类，都不命中时返回空字符串。
+    每个状态记录可到达的命中中门类序号最小的一个，扫描时取最小值即可。
+    同一名称的结果会被缓存。
+    """
+
+    def __init__(self, keywords_by_discipline):
+        self.disciplines = list(keywords_by_discipline)
+        self._cache = {}
+
+        # 前缀树：goto[状态][字符] -> 状态；best[状态] 为在该状态结束的关键词中最靠前的门类序号
+        goto = [{}]
+        best = [None]
+        for priority, keywords in enumerate(keywords_by_discipline.values()):
+            for keyword in keywords:
+                state = 0
+                for ch in keyword:
+                    if ch not in goto[state]:
+                        goto.append({})
+                        best.append(None)
+                        goto[state][ch] = len(goto) - 1
+                    state = goto[state][ch]
+                if best[state] is None or priority < best[state]:
+                    best[state] = priority
+
+        # 按广度优先计算失败指针，并把转移补全为确定自动机，扫描时每个字符只查一次表
+        fail = [0] * len(goto)
+        delta = [dict(goto[0])] + [None] * (len(goto) - 1)
+        queue = list(goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            inherited = best[fail[state]]
+            if inherited is not None and (best[state] is None or inherited < best[state]):
+                best[state] = inherited
+            delta[state] = dict(delta[fail[state]])
+            for ch, child in goto[state].items():
+                fail[child] = delta[fail[state]].get(ch, 0)
+                delta[state][ch] = child
+                queue.append(child)
+
+        self._delta = delta
+        self._best = best
+
+    def match(self, name):
+        """名称命中的最靠前的门类序号，没有命中时返回None"""
+        delta = self._delta
+        best = self._best
+        state = 0
+        found = None
+        for ch in name:
+            state = delta[state].get(ch, 0)
+            priority = best[state]
+            if priority is not None and (found is None or priority < found):
+                found = priority
+                if found == 0:
+                    break
+        return found
+
+    def classify(self, major_name):
+        """根据专业名称判断学科门类"""
+        cached = self._cache.get(major_name)
+        if cached is not None:
+            return cached
+        priority = self.match(major_name.strip())
+        discipline = '' if priority is None else self.disciplines[priority]
+        self._cache[major_name] = discipline
+        return discipline
+
+
+_matcher = DisciplineMatcher(DISCIPLINE_KEYWORDS)
+
+
+def discipline_from_code(major_code):
+    """按专业代码前两位判断学科门类，代码缺失或不规范时返回空字符串"""
+    if not major_code:
+        return ''
+    match = _CODE_RE.match(str(major_code).strip().upper())
+    return CODE_PREFIX_DISCIPLINES.get(match.group(1), '') if match else ''
+
+
+def classify_by_discipline(major_name, major_code=None):
+    """判断学科门类：专业代码有效时按代码前两位查表，代码缺失或不规范时按专业名称中的关键词"""
+    return discipline_from_code(major_code) or _matcher.classify(major_name)
+
+
+def disciplines_from_codes(codes):
+    """整列按专业代码判断学科门类，无法判断的为NaN"""
+    prefixes = codes.astype('string').str.strip().str.upper().str.extract(MAJOR_CODE_PATTERN, expand=False)
+    return prefixes.map(CODE_PREFIX_DISCIPLINES).astype(object)
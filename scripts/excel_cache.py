@@ -0,0 +1,190 @@
+"""
+录取数据源文件的列式缓存
+首次读取时把Excel转换为Parquet文件，之后各脚本直接读取缓存，可只读取需要的列和年份。
+缓存按源文件的大小、修改时间和SHA-256失效。
+
+用法: python excel_cache.py [--refresh]
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 默认数据源
+SOURCE_FILE = os.path.join(SCRIPTS_DIR, '..', '22-25scoredata.xlsx')
+
+# 缓存目录
+CACHE_DIR = os.path.join(SCRIPTS_DIR, '.cache')
+
+# 年份列，用于按年份过滤
+YEAR_COLUMN = '年份'
+
+# 每个Parquet行组的行数（数据按年份排序，行组统计信息可用于跳过不需要的年份）
+ROW_GROUP_SIZE = 20000
+
+
+def _cache_paths(path):
+    name = os.path.splitext(os.path.basename(path))[0]
+    return (
+        os.path.join(CACHE_DIR, f'{name}.parquet'),
+        os.path.join(CACHE_DIR, f'{name}.meta.json'),
+    )
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_fingerprint(path, with_hash=True):
+    """源文件指纹：大小、修改时间，以及可选的SHA-256"""
+    stat = os.stat(path)
+    fingerprint = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if with_hash:
+        fingerprint['sha256'] = _file_sha256(path)
+    return fingerprint
+
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(meta_path, meta):
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+
+def _normalize_types(df):
+    """把Excel读出的混合类型列统一为字符串，使其可以按列式类型存储
+
+    纯数值列保持原类型；同时包含数字和文本的列（如专业代码）中，
+    整数值的浮点数写成不带小数点的形式。
+    """
+    for col in df.columns:
+        if df[col].dtype != object:
+            continue
+        values = df[col]
+        mask = values.notna()
+        types = set(values[mask].map(type))
+        if types <= {str}:
+            continue
+
+        def to_text(value):
+            if isinstance(value, float) and value.is_integer():
+                return str(int(value))
+            return str(value)
+
+        df[col] = values.where(~mask, values[mask].map(to_text))
+    return df
+
+
+def cache_is_fresh(path=SOURCE_FILE):
+    """缓存是否与源文件一致（大小和修改时间不变则不再计算哈希）"""
+    parquet_path, meta_path = _cache_paths(path)
+    meta = _read_meta(meta_path)
+    if meta is None or not os.path.exists(parquet_path):
+        return False
+
+    current = source_fingerprint(path, with_hash=False)
+    if current['size'] == meta['size'] and current['mtime_ns'] == meta['mtime_ns']:
+        return True
+
+    # 文件被touch或复制过但内容没变：只更新元数据
+    if current['size'] == meta['size'] and _file_sha256(path) == meta['sha256']:
+        meta['mtime_ns'] = current['mtime_ns']
+        _write_meta(meta_path, meta)
+        return True
+
+    return False
+
+
+def build_cache(path=SOURCE_FILE):
+    """读取Excel并写入Parquet缓存，返回缓存文件路径"""
+    parquet_path, meta_path = _cache_paths(path)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+
+    fingerprint = source_fingerprint(path)
+    df = _normalize_types(pd.read_excel(path))
+    if YEAR_COLUMN in df.columns:
+        df = df.sort_values(YEAR_COLUMN, kind='stable').reset_index(drop=True)
+
+    tmp_path = parquet_path + '.tmp'
+    df.to_parquet(tmp_path, index=False, row_group_size=ROW_GROUP_SIZE)
+    os.replace(tmp_path, parquet_path)
+
+    fingerprint['rows'] = len(df)
+    fingerprint['columns'] = df.columns.tolist()
+    _write_meta(meta_path, fingerprint)
+    return parquet_path
+
+
+def source_version(path=SOURCE_FILE):
+    """源文件内容的SHA-256（缓存有效时直接取自元数据）"""
+    if HAS_PYARROW and cache_is_fresh(path):
+        return _read_meta(_cache_paths(path)[1])['sha256']
+    return _file_sha256(path)
+
+
+def load_source(path=SOURCE_FILE, columns=None, years=None, refresh=False):
+    """读取录取数据源，返回DataFrame
+
+    - columns: 只读取这些列（中文列名），默认全部
+    - years: 只读取这些年份的行，默认全部
+    - refresh: 强制重建缓存
+    未安装pyarrow时退回直接读取Excel。
+    """
+    if not HAS_PYARROW:
+        df = pd.read_excel(path, usecols=columns)
+        if years is not None:
+            df = df[df[YEAR_COLUMN].isin(list(years))].reset_index(drop=True)
+        return df
+
+    parquet_path, _ = _cache_paths(path)
+    if refresh or not cache_is_fresh(path):
+        build_cache(path)
+
+    filters = None
+    if years is not None:
+        filters = [(YEAR_COLUMN, 'in', [int(y) for y in years])]
+    return pd.read_parquet(parquet_path, columns=columns, filters=filters)
+
+
+if __name__ == '__main__':
+    if sys.platform == 'win32':
+        import io
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+        sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+    parser = argparse.ArgumentParser(description='构建录取数据源的Parquet缓存')
+    parser.add_argument('--source', default=SOURCE_FILE, help='Excel源文件路径')
+    parser.add_argument('--refresh', action='store_true', help='忽略现有缓存，强制重建')
+    args = parser.parse_args()
+
+    if not HAS_PYARROW:
+        print("❌ 未安装pyarrow，无法构建缓存（pip install pyarrow）")
+        sys.exit(1)
+
+    if not args.refresh and cache_is_fresh(args.source):
+        print("✅ 缓存已是最新")
+    else:
+        print(f"正在读取Excel并构建缓存: {args.source}")
+        cache_path = build_cache(args.source)
+        print(f"✅ 缓存已写入: {cache_path}")
@@ -0,0 +1,69 @@
+"""
+Excel工作表流式分块读取
+使用openpyxl只读模式逐行解析，内存中只保留当前数据块，而不是整张表
+"""
+import openpyxl
+import pandas as pd
+
+# 默认每块行数
+DEFAULT_CHUNK_ROWS = 5000
+
+# 最小/最大块行数，防止内存估算异常时块过小或过大
+MIN_CHUNK_ROWS = 200
+MAX_CHUNK_ROWS = 50000
+
+# 首块之前使用的单行内存估算（17列，含中文字符串的DataFrame行）
+ESTIMATED_ROW_BYTES = 2048
+
+
+def chunk_rows_for_memory(max_memory_mb, chunks_in_flight, row_bytes=ESTIMATED_ROW_BYTES):
+    """根据内存上限计算每块行数
+
+    流水线中同时存在的数据块数为 chunks_in_flight（正在解析 + 队列中 + 正在写入），
+    所有块加起来不超过 max_memory_mb。
+    """
+    budget = max_memory_mb * 1024 * 1024 / max(chunks_in_flight, 1)
+    rows = int(budget / max(row_bytes, 1))
+    return max(MIN_CHUNK_ROWS, min(MAX_CHUNK_ROWS, rows))
+
+
+def iter_excel_chunks(path, chunk_rows=DEFAULT_CHUNK_ROWS, sheet_name=None,
+                      max_chunk_bytes=None):
+    """按块读取Excel，每次产出一个DataFrame
+
+    - 第一行作为列名，整行为空的记录会被跳过
+    - 指定 max_chunk_bytes 时，根据已产出块的实际内存占用自动调整后续块的行数
+    """
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = workbook[sheet_name] if sheet_name else workbook.worksheets[0]
+        rows = sheet.iter_rows(values_only=True)
+
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(c).strip() if c is not None else '' for c in header]
+        width = len(columns)
+
+        buffer = []
+        for row in rows:
+            if all(v is None for v in row):
+                continue
+            # 行宽与表头不一致时补齐/截断
+            if len(row) != width:
+                row = (tuple(row) + (None,) * width)[:width]
+            buffer.append(row)
+
+            if len(buffer) >= chunk_rows:
+                chunk = pd.DataFrame(buffer, columns=columns)
+                buffer = []
+                if max_chunk_bytes:
+                    row_bytes = chunk.memory_usage(deep=True).sum() / len(chunk)
+                    chunk_rows = max(MIN_CHUNK_ROWS,
+                                     min(MAX_CHUNK_ROWS, int(max_chunk_bytes / row_bytes)))
+                yield chunk
+
+        if buffer:
+            yield pd.DataFrame(buffer, columns=columns)
+    finally:
+        workbook.close()
@@ -1,15 +1,23 @@
 """
 修复2025年490分预估数据
 用2024年实际录取分数替换2025年490分的预估数据
+
+匹配规则：有专业代码时取2024年同专业代码中最高的分数，没有专业代码时取2024年同院校同专业的分数。
+先用一条语句算出全部待修复行的修复方案，再用一条关联UPDATE写入，语句数与待修复行数无关。
+
+用法: python fix_2025_scores.py                     执行修复
+      python fix_2025_scores.py --dry-run           只生成修复前后对比文件，不修改数据
+      python fix_2025_scores.py --diff 对比.csv     指定对比文件路径
 """
 
-import pandas as pd
-import psycopg2
-from psycopg2.extras import execute_batch
-from dotenv import load_dotenv
+import argparse
+import csv
 import os
 import sys
-import numpy as np
+
+from dataset_version import bump_dataset_version
+from derived_tables import refresh_stale_tables
+from db import connect
 
 # 设置UTF-8输出编码
 if sys.platform == 'win32':
@@ -17,129 +25,167 @@ if sys.platform == 'win32':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
-# 加载环境变量
-load_dotenv('../backend/.env')
-
-# 数据库连接配置
-DB_CONFIG = {
-    'host': 'localhost',
-    'port': 5432,
-    'database': 'admission_query',
-    'user': 'postgres',
-    'password': 'rainworm'
-}
+# 待修复的年份、预估分数，以及取实际分数的年份
+TARGET_YEAR = 2025
+PLACEHOLDER_SCORE = 490
+SOURCE_YEAR = 2024
+
+DEFAULT_DIFF_FILE = f'fix_{TARGET_YEAR}_scores_diff.csv'
+
+# 每个待修复行的修复方案（new_score 为空表示未找到2024年数据）
+# 专业代码有值时只按代码匹配，否则按院校名称+专业名称匹配
+PLAN_SQL = """
+CREATE TEMP TABLE score_fix_plan ON COMMIT DROP AS
+WITH by_code AS (
+    SELECT DISTINCT ON (major_code) major_code, min_score, min_rank
+    FROM admission_data
+    WHERE year = %(source_year)s
+      AND min_score IS NOT NULL
+      AND min_score <> %(placeholder)s
+      AND major_code <> ''
+    ORDER BY major_code, min_score DESC, min_rank NULLS LAST, id
+),
+by_name AS (
+    SELECT DISTINCT ON (university_name, major) university_name, major, min_score, min_rank
+    FROM admission_data
+    WHERE year = %(source_year)s
+      AND min_score IS NOT NULL
+      AND min_score <> %(placeholder)s
+    ORDER BY university_name, major, id
+),
+targets AS (
+    SELECT id, year, university_name, major, NULLIF(trim(major_code), '') AS major_code,
+           min_score, min_rank
+    FROM admission_data
+    WHERE year = %(target_year)s AND min_score = %(placeholder)s
+)
+SELECT t.id, t.year, t.university_name, t.major, t.major_code,
+       CASE WHEN t.major_code IS NOT NULL THEN 'major_code' ELSE 'name' END AS matched_by,
+       t.min_score AS old_score, t.min_rank AS old_rank,
+       COALESCE(c.min_score, n.min_score) AS new_score,
+       CASE WHEN c.min_score IS NOT NULL THEN c.min_rank ELSE n.min_rank END AS new_rank
+FROM targets t
+LEFT JOIN by_code c ON c.major_code = t.major_code
+LEFT JOIN by_name n ON t.major_code IS NULL
+                   AND n.university_name = t.university_name
+                   AND n.major = t.major
+"""
 
+APPLY_SQL = """
+UPDATE admission_data a
+SET min_score = p.new_score,
+    min_rank = p.new_rank
+FROM score_fix_plan p
+WHERE a.id = p.id
+  AND a.year = p.year
+  AND p.new_score IS NOT NULL
+"""
 
-def fix_2025_scores():
+DIFF_COLUMNS = [
+    'id', 'university_name', 'major', 'major_code', 'matched_by',
+    'old_score', 'new_score', 'old_rank', 'new_rank'
+]
+
+
+def write_diff(cursor, path):
+    """把修复方案写为CSV（修复前后的分数和位次），返回 (可修复行数, 未找到行数)"""
+    cursor.execute(f"""
+        SELECT {', '.join(DIFF_COLUMNS)}
+        FROM score_fix_plan
+        ORDER BY new_score IS NULL, university_name, major, id
+    """)
+    found = not_found = 0
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(DIFF_COLUMNS)
+        for row in cursor:
+            writer.writerow(['' if v is None else v for v in row])
+            if row[DIFF_COLUMNS.index('new_score')] is None:
+                not_found += 1
+            else:
+                found += 1
+    return found, not_found
+
+
+def print_plan_examples(cursor, limit=10):
+    cursor.execute("""
+        SELECT university_name, major, new_score
+        FROM score_fix_plan
+        ORDER BY new_score IS NULL, university_name, major, id
+    """)
+    shown_found = shown_missing = 0
+    for university_name, major, new_score in cursor.fetchall():
+        if new_score is not None and shown_found < limit:
+            print(f"  ✓ {university_name} - {major}: {PLACEHOLDER_SCORE}分 → {new_score}分")
+            shown_found += 1
+        elif new_score is None and shown_missing < limit:
+            print(f"  ✗ {university_name} - {major}: 未找到{SOURCE_YEAR}年数据")
+            shown_missing += 1
+
+
+def fix_2025_scores(dry_run=False, diff_path=None):
     """修复2025年490分数据"""
 
-    print("=== 开始修复2025年490分预估数据 ===\n")
+    print(f"=== 开始修复{TARGET_YEAR}年{PLACEHOLDER_SCORE}分预估数据 ===\n")
+    if dry_run:
+        print("（演练模式：只生成对比文件，不修改数据）\n")
 
     # 连接数据库
-    conn = psycopg2.connect(**DB_CONFIG)
+    conn = connect()
     cursor = conn.cursor()
 
     try:
-        # 1. 查询2025年490分的专业
-        print("步骤1: 查询2025年490分的专业...")
-        cursor.execute("""
-            SELECT university_name, major, university_code, major_code,
-                   category, batch, subject_requirement, school_location,
-                   school_nature, is_985, is_211
-            FROM admission_data
-            WHERE year = 2025 AND min_score = 490
-        """)
-
-        score_490_records = cursor.fetchall()
-        print(f"  找到 {len(score_490_records)} 个490分专业\n")
-
-        if len(score_490_records) == 0:
+        # 1. 一次性计算全部待修复行的修复方案
+        print(f"步骤1: 匹配{SOURCE_YEAR}年对应专业的实际录取分数...")
+        cursor.execute(PLAN_SQL, {
+            'target_year': TARGET_YEAR,
+            'source_year': SOURCE_YEAR,
+            'placeholder': PLACEHOLDER_SCORE,
+        })
+        cursor.execute("SELECT COUNT(*), COUNT(new_score) FROM score_fix_plan")
+        total, found = cursor.fetchone()
+        print(f"  找到 {total} 个{PLACEHOLDER_SCORE}分专业，其中 {found} 个匹配到{SOURCE_YEAR}年数据\n")
+
+        if total == 0:
             print("没有需要修复的数据！")
+            conn.rollback()
             return
 
-        # 2. 查询2024年对应专业的实际录取分数
-        print("步骤2: 查询2024年对应专业的实际录取分数...")
-
-        updated_count = 0
-        not_found_count = 0
-
-        for record in score_490_records:
-            (university_name, major, univ_code, major_code, category, batch,
-             subject_req, location, nature, is_985, is_211) = record
-
-            # 构建查询条件：优先用专业代码匹配，其次用专业名称+院校名称匹配
-            if major_code and pd.notna(major_code) and str(major_code).strip():
-                # 使用专业代码匹配
-                cursor.execute("""
-                    SELECT min_score, min_rank
-                    FROM admission_data
-                    WHERE year = 2024
-                      AND major_code = %s
-                      AND min_score IS NOT NULL
-                      AND min_score != 490
-                    ORDER BY min_score DESC
-                    LIMIT 1
-                """, (str(major_code).strip(),))
-            else:
-                # 使用专业名称+院校名称匹配
-                cursor.execute("""
-                    SELECT min_score, min_rank
-                    FROM admission_data
-                    WHERE year = 2024
-                      AND university_name = %s
-                      AND major = %s
-                      AND min_score IS NOT NULL
-                      AND min_score != 490
-                    LIMIT 1
-                """, (university_name, major))
-
-            result = cursor.fetchone()
-
-            if result:
-                score_2024, rank_2024 = result
-
-                # 更新2025年的分数和位次
-                cursor.execute("""
-                    UPDATE admission_data
-                    SET min_score = %s,
-                        min_rank = %s
-                    WHERE year = 2025
-                      AND university_name = %s
-                      AND major = %s
-                      AND min_score = 490
-                """, (score_2024,
-                       str(int(rank_2024)) if pd.notna(rank_2024) else None,
-                       university_name,
-                       major))
-
-                updated_count += 1
-
-                if updated_count <= 10:
-                    print(f"  ✓ {university_name} - {major}: 490分 → {score_2024}分")
-            else:
-                not_found_count += 1
-                if not_found_count <= 10:
-                    print(f"  ✗ {university_name} - {major}: 未找到2024年数据")
+        print_plan_examples(cursor)
+
+        diff_path = diff_path or (DEFAULT_DIFF_FILE if dry_run else None)
+        if diff_path:
+            write_diff(cursor, diff_path)
+            print(f"\n📊 修复前后对比已写入: {os.path.abspath(diff_path)}")
+
+        if dry_run:
+            conn.rollback()
+            print("\n✅ 演练完成，未修改数据")
+            return
 
-        # 提交事务
+        # 2. 一条关联UPDATE写入全部修复
+        print("\n步骤2: 写入修复结果...")
+        cursor.execute(APPLY_SQL)
+        updated_count = cursor.rowcount
+        bump_dataset_version(cursor, 'fix_2025_scores')
         conn.commit()
 
         print(f"\n步骤3: 更新完成！")
         print(f"  成功更新: {updated_count} 个专业")
-        print(f"  未找到2024年数据: {not_found_count} 个专业")
+        print(f"  未找到{SOURCE_YEAR}年数据: {total - found} 个专业")
 
         # 4. 验证修复结果
         print("\n步骤4: 验证修复结果...")
         cursor.execute("""
             SELECT min_score, COUNT(*) as count
             FROM admission_data
-            WHERE year = 2025 AND min_score IS NOT NULL
+            WHERE year = %s AND min_score IS NOT NULL
             GROUP BY min_score
             ORDER BY count DESC
             LIMIT 10
-        """)
+        """, (TARGET_YEAR,))
 
-        print("\n2025年修复后的分数分布（Top 10）:")
+        print(f"\n{TARGET_YEAR}年修复后的分数分布（Top 10）:")
         for row in cursor.fetchall():
             score, count = row
             print(f"  {score}分: {count}个专业")
@@ -155,4 +201,10 @@ def fix_2025_scores():
 
 
 if __name__ == '__main__':
-    fix_2025_scores()
+    parser = argparse.ArgumentParser(description=f'用{SOURCE_YEAR}年实际分数修复{TARGET_YEAR}年{PLACEHOLDER_SCORE}分预估数据')
+    parser.add_argument('--dry-run', action='store_true', help='只生成修复前后对比文件，不修改数据')
+    parser.add_argument('--diff', help=f'对比文件路径（演练模式默认 {DEFAULT_DIFF_FILE}）')
+    args = parser.parse_args()
+    fix_2025_scores(dry_run=args.dry_run, diff_path=args.diff)
+    if not args.dry_run:
+        refresh_stale_tables()
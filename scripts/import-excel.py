@@ -5,13 +5,27 @@ Excel数据导入脚本
 将 22-25年全国高校在浙江的专业录取分数.xlsx 导入到PostgreSQL数据库
 """
 
-import pandas as pd
-import psycopg2
-from psycopg2.extras import execute_batch
-from dotenv import load_dotenv
-import os
 import sys
-import numpy as np
+import argparse
+import queue
+import threading
+
+from db import DB_CONFIG, connect
+from excel_stream import iter_excel_chunks, chunk_rows_for_memory, DEFAULT_CHUNK_ROWS
+from bulk_loader import copy_dataframe
+from cleaning import clean_admission_data
+from excel_cache import load_source
+from parallel_import import parallel_import
+from shadow_reload import shadow_reload, OLD_TABLE
+from index_manager import create_indexes, drop_indexes, analyze, table_is_empty
+from partitioning import ensure_year_partitions
+from major_discipline_map import DisciplineMap, ensure_discipline_map
+from dataset_version import bump_dataset_version
+from derived_tables import refresh_stale_tables
+from incremental_import import (
+    HASHED_COLUMNS, add_row_hashes, ensure_row_hash_column,
+    incremental_import, print_incremental_summary
+)
 
 # 设置UTF-8输出编码（解决Windows GBK编码问题）
 if sys.platform == 'win32':
@@ -19,44 +33,112 @@ if sys.platform == 'win32':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
-# 加载环境变量
-load_dotenv('../backend/.env')
-
-# 数据库连接配置
-DB_CONFIG = {
-    'host': 'localhost',
-    'port': 5432,
-    'database': 'admission_query',
-    'user': 'rainworm',
-    'password': 'Admission2024!'
-}
-
 # Excel文件路径
 EXCEL_FILE = '../22-25scoredata.xlsx'
 
 
-def clean_value(value):
-    """清理数据值"""
-    if pd.isna(value):
-        return None
-    if isinstance(value, float):
-        # 检查是否为NaN或无穷大
-        if not np.isfinite(value):
-            return None
-        # 转换为int
-        return int(value)
-    if isinstance(value, (int, float)):
-        return int(value)
-    return value
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS admission_data (
+    id SERIAL,
+    year INTEGER NOT NULL,
+    university_name VARCHAR(200),
+    university_code VARCHAR(20),
+    category VARCHAR(50),
+    batch VARCHAR(50),
+    subject_requirement VARCHAR(100),
+    major VARCHAR(200),
+    major_code VARCHAR(50),
+    major_group VARCHAR(100),
+    major_note TEXT,
+    admission_count INTEGER,
+    min_score INTEGER,
+    min_rank INTEGER,
+    school_location VARCHAR(100),
+    school_nature VARCHAR(50),
+    is_985 BOOLEAN DEFAULT FALSE,
+    is_211 BOOLEAN DEFAULT FALSE,
+    subject_category VARCHAR(50),
+    source_category VARCHAR(50),
+    row_hash CHAR(32),
+    PRIMARY KEY (id, year)
+) PARTITION BY LIST (year);
+"""
+
+
+def connect_db():
+    """连接数据库"""
+    print("\n正在连接数据库...")
+    try:
+        conn = connect()
+        print("✅ 数据库连接成功")
+        return conn
+    except Exception as e:
+        print(f"❌ 数据库连接失败: {e}")
+        print("\n请确保:")
+        print("1. PostgreSQL已安装并运行")
+        print("2. 数据库已创建")
+        sys.exit(1)
+
+
+def create_table(conn):
+    """创建表（如果不存在）
+
+    新建的表按年份分区；已有的普通表保持不变，可用 partitioning.py --convert 转换。
+    """
+    print("\n正在创建表...")
+    cursor = conn.cursor()
+    try:
+        cursor.execute(CREATE_TABLE_SQL)
+        # 旧版本建的表没有 row_hash、source_category、subject_category 列
+        ensure_row_hash_column(cursor)
+        ensure_discipline_map(cursor)
+        conn.commit()
+        print("✅ 表创建成功")
+    except Exception as e:
+        print(f"❌ 表创建失败: {e}")
+        conn.close()
+        sys.exit(1)
+    finally:
+        cursor.close()
+
+
+def confirm_clear_old_data(conn):
+    """询问是否清空旧数据（可选）"""
+    cursor = conn.cursor()
+    print("\n是否清空旧数据？(y/n): ", end='')
+    try:
+        choice = input().lower()
+        if choice == 'y':
+            cursor.execute("DELETE FROM admission_data")
+            bump_dataset_version(cursor, 'import-excel --clear')
+            conn.commit()
+            print("✅ 旧数据已清空")
+    except:
+        print("\n将直接追加数据...")
+    finally:
+        cursor.close()
+
+
+def prepare_bulk_load(cursor):
+    """空表批量写入前删除二级索引，写入后统一重建，避免每行维护索引"""
+    if table_is_empty(cursor):
+        drop_indexes(cursor)
+        print("  已删除二级索引，写入完成后重建")
 
 
-def clean_boolean(value):
-    """清理布尔值"""
-    if pd.isna(value):
-        return False
-    if isinstance(value, str):
-        return value.strip() == '是'
-    return bool(value)
+def finish_bulk_load(cursor):
+    """重建索引并更新统计信息"""
+    print("\n正在建立索引并更新统计信息...")
+    create_indexes(cursor)
+    analyze(cursor)
+    print("✅ 索引已建立")
+
+
+def report_row_count(cursor):
+    """验证数据"""
+    cursor.execute("SELECT COUNT(*) FROM admission_data")
+    count = cursor.fetchone()[0]
+    print(f"\n📊 数据库中现有 {count} 条记录")
 
 
 def import_excel_to_db():
@@ -64,7 +146,7 @@ def import_excel_to_db():
 
     print(f"正在读取Excel文件: {EXCEL_FILE}")
     try:
-        df = pd.read_excel(EXCEL_FILE)
+        df = load_source(EXCEL_FILE)
         print(f"✅ 成功读取 {len(df)} 行数据")
     except Exception as e:
         print(f"❌ 读取Excel文件失败: {e}")
@@ -76,173 +158,233 @@ def import_excel_to_db():
 
     # 数据清洗
     print("\n正在清洗数据...")
-
-    # 重命名列（中文转英文下划线）
-    column_mapping = {
-        '年份': 'year',
-        '院校名称': 'university_name',
-        '院校代码': 'university_code',
-        '科类': 'category',
-        '批次': 'batch',
-        '选科要求': 'subject_requirement',
-        '专业': 'major',
-        '专业代码': 'major_code',
-        '所属专业组': 'major_group',
-        '专业备注': 'major_note',
-        '录取人数': 'admission_count',
-        '最低分数': 'min_score',
-        '最低位次': 'min_rank',
-        '学校所在': 'school_location',
-        '学校性质': 'school_nature',
-        '是否985': 'is_985',
-        '是否211': 'is_211'
-    }
-
-    df = df.rename(columns=column_mapping)
-
-    # 清洗数据
-    df['year'] = df['year'].astype(int)
-    df['university_name'] = df['university_name'].fillna('').astype(str)
-    df['university_code'] = df['university_code'].fillna('').astype(str)
-    df['category'] = df['category'].fillna('').astype(str)
-    df['batch'] = df['batch'].fillna('').astype(str)
-    df['subject_requirement'] = df['subject_requirement'].fillna('').astype(str)
-    df['major'] = df['major'].fillna('').astype(str)
-    df['major_code'] = df['major_code'].fillna('').astype(str)
-    df['school_location'] = df['school_location'].fillna('').astype(str)
-    df['school_nature'] = df['school_nature'].fillna('').astype(str)
-    df['is_985'] = df['is_985'].apply(clean_boolean)
-    df['is_211'] = df['is_211'].apply(clean_boolean)
-
-    # 处理可为空的字段
-    for col in ['major_group', 'major_note', 'admission_count', 'min_score', 'min_rank']:
-        if col in df.columns:
-            if col in ['admission_count', 'min_rank']:
-                # 转换为字符串
-                df[col] = df[col].apply(lambda x: str(int(x)) if pd.notna(x) and isinstance(x, (int, float)) and np.isfinite(x) else None)
-            else:
-                df[col] = df[col].apply(clean_value)
-
+    df = clean_admission_data(df)
     print(f"✅ 数据清洗完成，有效数据 {len(df)} 行")
 
     # 连接数据库
-    print("\n正在连接数据库...")
+    conn = connect_db()
+    cursor = conn.cursor()
+
+    create_table(conn)
+    confirm_clear_old_data(conn)
+
+    # 插入数据
+    print(f"\n正在插入数据（共 {len(df)} 行）...")
+
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        cursor = conn.cursor()
-        print("✅ 数据库连接成功")
+        prepare_bulk_load(cursor)
+        discipline_map = DisciplineMap.load(cursor)
+        df = discipline_map.apply(df)
+        discipline_map.save(cursor)
+        print(f"  {discipline_map.summary()}")
+        ensure_year_partitions(cursor, df['year'].unique())
+        copy_dataframe(cursor, add_row_hashes(df), columns=HASHED_COLUMNS)
+        print("✅ 数据插入成功")
+        finish_bulk_load(cursor)
+        bump_dataset_version(cursor, 'import-excel')
+        conn.commit()
+
+        report_row_count(cursor)
+
     except Exception as e:
-        print(f"❌ 数据库连接失败: {e}")
-        print("\n请确保:")
-        print("1. PostgreSQL已安装并运行")
-        print("2. 数据库已创建")
+        print(f"❌ 数据插入失败: {e}")
+        conn.rollback()
+        conn.close()
         sys.exit(1)
 
-    # 创建表（如果不存在）
-    print("\n正在创建表...")
-    create_table_sql = """
-    CREATE TABLE IF NOT EXISTS admission_data (
-        id SERIAL PRIMARY KEY,
-        year INTEGER NOT NULL,
-        university_name VARCHAR(200),
-        university_code VARCHAR(20),
-        category VARCHAR(50),
-        batch VARCHAR(50),
-        subject_requirement VARCHAR(100),
-        major VARCHAR(200),
-        major_code VARCHAR(50),
-        major_group VARCHAR(100),
-        major_note TEXT,
-        admission_count INTEGER,
-        min_score INTEGER,
-        min_rank INTEGER,
-        school_location VARCHAR(100),
-        school_nature VARCHAR(50),
-        is_985 BOOLEAN DEFAULT FALSE,
-        is_211 BOOLEAN DEFAULT FALSE
-    );
-
-    -- 创建索引
-    DROP INDEX IF EXISTS idx_year;
-    DROP INDEX IF EXISTS idx_major;
-    DROP INDEX IF EXISTS idx_school_location;
-    DROP INDEX IF EXISTS idx_min_score;
-    DROP INDEX IF EXISTS idx_min_rank;
-    DROP INDEX IF EXISTS idx_university_name;
-
-    CREATE INDEX idx_year ON admission_data(year);
-    CREATE INDEX idx_major ON admission_data(major);
-    CREATE INDEX idx_school_location ON admission_data(school_location);
-    CREATE INDEX idx_min_score ON admission_data(min_score);
-    CREATE INDEX idx_min_rank ON admission_data(min_rank);
-    CREATE INDEX idx_university_name ON admission_data(university_name);
-    """
+    # 关闭连接
+    cursor.close()
+    conn.close()
+
+    print("\n✅ 数据导入完成！")
+
+
+def import_excel_incremental():
+    """增量导入：只写入与库中内容不同的行，无需清空旧数据"""
+
+    print(f"正在读取Excel文件: {EXCEL_FILE}")
+    try:
+        df = load_source(EXCEL_FILE)
+        print(f"✅ 成功读取 {len(df)} 行数据")
+    except Exception as e:
+        print(f"❌ 读取Excel文件失败: {e}")
+        sys.exit(1)
+
+    print("\n正在清洗数据...")
+    df = clean_admission_data(df)
+    print(f"✅ 数据清洗完成，有效数据 {len(df)} 行")
+
+    conn = connect_db()
+    cursor = conn.cursor()
 
+    create_table(conn)
+
+    print("\n正在比对并同步变化的数据...")
     try:
-        cursor.execute(create_table_sql)
+        summary = incremental_import(conn, df)
+        print("✅ 增量同步成功")
+        print_incremental_summary(summary)
+        finish_bulk_load(cursor)
         conn.commit()
-        print("✅ 表创建成功")
+
+        report_row_count(cursor)
+
     except Exception as e:
-        print(f"❌ 表创建失败: {e}")
+        print(f"❌ 增量同步失败: {e}")
+        conn.rollback()
         conn.close()
         sys.exit(1)
 
-    # 清空旧数据（可选）
-    print("\n是否清空旧数据？(y/n): ", end='')
+    cursor.close()
+    conn.close()
+
+    print("\n✅ 数据导入完成！")
+
+
+def import_excel_shadow():
+    """影子表重载：在 admission_data_new 中建好数据和索引后原子交换，读请求不受影响"""
+
+    print(f"正在读取Excel文件: {EXCEL_FILE}")
     try:
-        choice = input().lower()
-        if choice == 'y':
-            cursor.execute("DELETE FROM admission_data")
-            conn.commit()
-            print("✅ 旧数据已清空")
-    except:
-        print("\n将直接追加数据...")
+        df = load_source(EXCEL_FILE)
+        print(f"✅ 成功读取 {len(df)} 行数据")
+    except Exception as e:
+        print(f"❌ 读取Excel文件失败: {e}")
+        sys.exit(1)
 
-    # 插入数据
-    print(f"\n正在插入数据（共 {len(df)} 行）...")
+    print("\n正在清洗数据...")
+    df = clean_admission_data(df)
+    print(f"✅ 数据清洗完成，有效数据 {len(df)} 行")
 
-    insert_sql = """
-    INSERT INTO admission_data (
-        year, university_name, university_code, category, batch,
-        subject_requirement, major, major_code, major_group, major_note,
-        admission_count, min_score, min_rank, school_location,
-        school_nature, is_985, is_211
-    ) VALUES (
-        %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-    )
-    """
+    conn = connect_db()
 
-    data_to_insert = []
-    for _, row in df.iterrows():
-        data_to_insert.append((
-            row['year'],
-            row['university_name'],
-            row['university_code'],
-            row['category'],
-            row['batch'],
-            row['subject_requirement'],
-            row['major'],
-            row['major_code'],
-            row['major_group'],
-            row['major_note'],
-            row['admission_count'],
-            row['min_score'],
-            row['min_rank'],
-            row['school_location'],
-            row['school_nature'],
-            row['is_985'],
-            row['is_211']
-        ))
+    create_table(conn)
 
+    print("\n正在构建影子表并交换...")
     try:
-        execute_batch(cursor, insert_sql, data_to_insert, page_size=1000)
-        conn.commit()
+        new_rows, old_rows = shadow_reload(conn, df)
+        print(f"✅ 交换完成：{old_rows} 行 → {new_rows} 行")
+        print(f"  旧数据保留在 {OLD_TABLE}，如需回滚: python shadow_reload.py --rollback")
+    except Exception as e:
+        print(f"❌ 影子表重载失败（正式表未改动）: {e}")
+        conn.close()
+        sys.exit(1)
+
+    conn.close()
+
+    print("\n✅ 数据导入完成！")
+
+
+def import_excel_parallel(workers=None):
+    """按年份并行导入：各年份在独立进程中清洗并写入暂存表，最后在一个事务中整体替换"""
+
+    print(f"正在按年份并行导入: {EXCEL_FILE}")
+
+    conn = connect_db()
+    cursor = conn.cursor()
+
+    create_table(conn)
+
+    try:
+        loaded = parallel_import(conn, DB_CONFIG, EXCEL_FILE, workers=workers)
+        print("✅ 各年份数据已替换")
+        for year, rows in sorted(loaded.items()):
+            print(f"  {year}年: {rows} 行")
+
+        report_row_count(cursor)
+
+    except Exception as e:
+        print(f"❌ 并行导入失败: {e}")
+        conn.close()
+        sys.exit(1)
+
+    cursor.close()
+    conn.close()
+
+    print("\n✅ 数据导入完成！")
+
+
+# 流式导入时，队列中最多缓存的已清洗数据块数
+STREAM_QUEUE_DEPTH = 2
+
+# 队列结束标记
+_END_OF_STREAM = object()
+
+
+def _produce_chunks(chunk_queue, chunk_rows, max_chunk_bytes, errors):
+    """后台线程：逐块读取并清洗Excel，放入有界队列"""
+    try:
+        for chunk in iter_excel_chunks(EXCEL_FILE, chunk_rows=chunk_rows,
+                                       max_chunk_bytes=max_chunk_bytes):
+            chunk_queue.put(clean_admission_data(chunk))
+    except Exception as e:
+        errors.append(e)
+    finally:
+        chunk_queue.put(_END_OF_STREAM)
+
+
+def import_excel_streaming(chunk_rows=None, max_memory_mb=None):
+    """流式导入Excel数据到数据库
+
+    读取线程按块解析、清洗，主线程在下一块解析的同时把当前块写入数据库。
+    队列有界，同时在内存中的数据块数固定，峰值内存不随表的行数增长。
+    所有块在同一个事务中提交，失败时整体回滚。
+    """
+    # 正在解析的块 + 队列中的块 + 正在写入的块
+    chunks_in_flight = STREAM_QUEUE_DEPTH + 2
+    max_chunk_bytes = None
+    if max_memory_mb:
+        max_chunk_bytes = max_memory_mb * 1024 * 1024 / chunks_in_flight
+        if chunk_rows is None:
+            chunk_rows = chunk_rows_for_memory(max_memory_mb, chunks_in_flight)
+    if chunk_rows is None:
+        chunk_rows = DEFAULT_CHUNK_ROWS
+
+    print(f"正在流式读取Excel文件: {EXCEL_FILE}")
+    print(f"  每块 {chunk_rows} 行" + (f"，内存上限 {max_memory_mb} MB" if max_memory_mb else ""))
+
+    conn = connect_db()
+    cursor = conn.cursor()
+
+    create_table(conn)
+    confirm_clear_old_data(conn)
+
+    chunk_queue = queue.Queue(maxsize=STREAM_QUEUE_DEPTH)
+    errors = []
+    producer = threading.Thread(
+        target=_produce_chunks,
+        args=(chunk_queue, chunk_rows, max_chunk_bytes, errors),
+        daemon=True
+    )
+    producer.start()
+
+    print("\n正在插入数据...")
+    inserted = 0
+    chunk_count = 0
+    try:
+        prepare_bulk_load(cursor)
+        discipline_map = DisciplineMap.load(cursor)
+        while True:
+            chunk = chunk_queue.get()
+            if chunk is _END_OF_STREAM:
+                break
+            chunk = discipline_map.apply(chunk)
+            discipline_map.save(cursor)
+            ensure_year_partitions(cursor, chunk['year'].unique())
+            inserted += copy_dataframe(cursor, add_row_hashes(chunk), columns=HASHED_COLUMNS)
+            chunk_count += 1
+            print(f"  已写入 {chunk_count} 块，共 {inserted} 行")
+
+        if errors:
+            raise errors[0]
+
+        print(f"  {discipline_map.summary()}")
         print("✅ 数据插入成功")
+        finish_bulk_load(cursor)
+        bump_dataset_version(cursor, 'import-excel --stream')
+        conn.commit()
 
-        # 验证数据
-        cursor.execute("SELECT COUNT(*) FROM admission_data")
-        count = cursor.fetchone()[0]
-        print(f"\n📊 数据库中现有 {count} 条记录")
+        report_row_count(cursor)
 
     except Exception as e:
         print(f"❌ 数据插入失败: {e}")
@@ -250,12 +392,39 @@ def import_excel_to_db():
         conn.close()
         sys.exit(1)
 
-    # 关闭连接
     cursor.close()
     conn.close()
 
     print("\n✅ 数据导入完成！")
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description='导入Excel录取数据到PostgreSQL')
+    parser.add_argument('--incremental', action='store_true',
+                        help='增量导入：按自然键比对行哈希，只同步变化的行')
+    parser.add_argument('--shadow', action='store_true',
+                        help='影子表重载：建好新表后原子交换，导入期间查询不受影响')
+    parser.add_argument('--parallel', type=int, nargs='?', const=0, default=None, metavar='N',
+                        help='按年份并行导入，N为进程数（默认CPU核数）')
+    parser.add_argument('--stream', action='store_true',
+                        help='流式分块导入，峰值内存与总行数无关')
+    parser.add_argument('--chunk-rows', type=int, default=None,
+                        help=f'流式导入时每块的行数（默认 {DEFAULT_CHUNK_ROWS}）')
+    parser.add_argument('--max-memory-mb', type=int, default=None,
+                        help='流式导入时数据块占用的内存上限（MB），据此自动确定块大小')
+    return parser.parse_args()
+
+
 if __name__ == '__main__':
-    import_excel_to_db()
+    args = parse_args()
+    if args.incremental:
+        import_excel_incremental()
+    elif args.shadow:
+        import_excel_shadow()
+    elif args.parallel is not None:
+        import_excel_parallel(workers=args.parallel or None)
+    elif args.stream or args.chunk_rows or args.max_memory_mb:
+        import_excel_streaming(chunk_rows=args.chunk_rows, max_memory_mb=args.max_memory_mb)
+    else:
+        import_excel_to_db()
+    refresh_stale_tables()
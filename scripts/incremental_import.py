@@ -0,0 +1,176 @@
+"""
+增量导入：按自然键比对行内容哈希，只执行变化的插入/更新/删除
+自然键为 (year, university_code, major_code, major_group, major, source_category, batch)
+
+category 导入后会被 update_category_to_discipline.py 改写为学科门类，不能作为键；
+source_category 保存文件中的原始科类，导入后不再修改。
+"""
+import hashlib
+
+from bulk_loader import ADMISSION_COLUMNS, copy_dataframe, format_csv_line
+from dataset_version import bump_dataset_version
+from major_discipline_map import apply_discipline_map, ensure_discipline_map
+from partitioning import ensure_year_partitions
+
+# 自然键（除 year 外都可为空，按 NULL 相等比较）
+NATURAL_KEY = ['year', 'university_code', 'major_code', 'major_group', 'major',
+               'source_category', 'batch']
+
+# 写入列：源数据列 + 学科门类 + 原始科类 + 行哈希（哈希只覆盖源数据列）
+HASHED_COLUMNS = ADMISSION_COLUMNS + ['subject_category', 'source_category', 'row_hash']
+
+STAGE_TABLE = 'admission_stage'
+
+ENSURE_ROW_HASH_SQL = """
+ALTER TABLE admission_data ADD COLUMN IF NOT EXISTS row_hash CHAR(32);
+ALTER TABLE admission_data ADD COLUMN IF NOT EXISTS source_category VARCHAR(50);
+"""
+
+# 旧版本导入的行没有原始科类，以当前科类补上（已改写为学科门类的行在下次增量导入时重新写入一次）
+BACKFILL_SOURCE_CATEGORY_SQL = """
+UPDATE admission_data SET source_category = category
+WHERE source_category IS NULL AND category IS NOT NULL
+"""
+
+
+def ensure_row_hash_column(cursor):
+    """确保 admission_data 有 row_hash、source_category 列"""
+    cursor.execute(ENSURE_ROW_HASH_SQL)
+
+
+def add_row_hashes(df):
+    """为每行计算内容哈希（基于COPY编码后的整行，保证与写入库中的值一致）"""
+    df = df.copy()
+    df['source_category'] = df['category']
+    df['row_hash'] = [
+        hashlib.md5(format_csv_line(row).encode('utf-8')).hexdigest()
+        for row in df[ADMISSION_COLUMNS].itertuples(index=False, name=None)
+    ]
+    return df
+
+
+def _key_join(left, right):
+    """两表之间的自然键条件，可为空的列按 NULL 相等比较
+
+    IS NOT DISTINCT FROM 不能用于哈希连接，另加一个 COALESCE 等值条件供规划器做哈希连接，
+    再由 IS NOT DISTINCT FROM 区分 NULL 与空字符串。
+    """
+    conditions = []
+    for col in NATURAL_KEY:
+        if col == 'year':
+            conditions.append(f"{left}.{col} = {right}.{col}")
+        else:
+            conditions.append(f"COALESCE({left}.{col}, '') = COALESCE({right}.{col}, '')")
+            conditions.append(f"{left}.{col} IS NOT DISTINCT FROM {right}.{col}")
+    return ' AND '.join(conditions)
+
+
+def incremental_import(conn, df):
+    """把清洗后的数据增量同步到 admission_data
+
+    只处理 df 中出现的年份：库中存在而文件中已不存在的行会被删除，
+    内容哈希不同的行被更新，新出现的自然键被插入，其余行不做任何改动。
+    返回各类变更的行数。调用方负责提交事务。
+    """
+    cursor = conn.cursor()
+    ensure_row_hash_column(cursor)
+    cursor.execute(BACKFILL_SOURCE_CATEGORY_SQL)
+    ensure_discipline_map(cursor)
+
+    # 同一自然键在文件中重复时，以最后一行为准
+    before = len(df)
+    df = df.drop_duplicates(subset=NATURAL_KEY, keep='last')
+    duplicates = before - len(df)
+
+    df = add_row_hashes(apply_discipline_map(cursor, df))
+    years = sorted(int(y) for y in df['year'].unique())
+    ensure_year_partitions(cursor, years)
+
+    cursor.execute(f"""
+        CREATE TEMP TABLE {STAGE_TABLE} ON COMMIT DROP AS
+        SELECT {', '.join(HASHED_COLUMNS)} FROM admission_data WITH NO DATA
+    """)
+    copy_dataframe(cursor, df, table=STAGE_TABLE, columns=HASHED_COLUMNS)
+    cursor.execute(f"ANALYZE {STAGE_TABLE}")
+
+    # 库中同一自然键的重复行只保留id最小的一条
+    cursor.execute(f"""
+        DELETE FROM admission_data a
+        USING admission_data b
+        WHERE a.year = ANY(%s)
+          AND {_key_join('a', 'b')}
+          AND a.id > b.id
+    """, (years,))
+    deduplicated = cursor.rowcount
+
+    # 文件中已不存在的行
+    cursor.execute(f"""
+        DELETE FROM admission_data a
+        WHERE a.year = ANY(%s)
+          AND NOT EXISTS (
+              SELECT 1 FROM {STAGE_TABLE} s WHERE {_key_join('a', 's')}
+          )
+    """, (years,))
+    deleted = cursor.rowcount
+
+    # 内容变化的行
+    assignments = ', '.join(
+        f"{col} = s.{col}" for col in HASHED_COLUMNS if col not in NATURAL_KEY
+    )
+    cursor.execute(f"""
+        UPDATE admission_data a
+        SET {assignments}
+        FROM {STAGE_TABLE} s
+        WHERE {_key_join('a', 's')}
+          AND a.row_hash IS DISTINCT FROM s.row_hash
+    """)
+    updated = cursor.rowcount
+
+    # 内容未变、只是对照表调整后学科门类不同的行：只改学科门类，
+    # 保留导入后对 category 等列的修改（如 update_category_to_discipline.py）
+    cursor.execute(f"""
+        UPDATE admission_data a
+        SET subject_category = s.subject_category
+        FROM {STAGE_TABLE} s
+        WHERE {_key_join('a', 's')}
+          AND a.row_hash = s.row_hash
+          AND a.subject_category IS DISTINCT FROM s.subject_category
+    """)
+    updated += cursor.rowcount
+
+    # 新增的行
+    cursor.execute(f"""
+        INSERT INTO admission_data ({', '.join(HASHED_COLUMNS)})
+        SELECT {', '.join('s.' + col for col in HASHED_COLUMNS)}
+        FROM {STAGE_TABLE} s
+        WHERE NOT EXISTS (
+            SELECT 1 FROM admission_data a WHERE {_key_join('a', 's')}
+        )
+    """)
+    inserted = cursor.rowcount
+
+    if deduplicated or deleted or updated or inserted:
+        bump_dataset_version(cursor, 'incremental_import')
+    cursor.close()
+
+    return {
+        'years': years,
+        'source_rows': len(df),
+        'source_duplicates': duplicates,
+        'deduplicated': deduplicated,
+        'inserted': inserted,
+        'updated': updated,
+        'deleted': deleted,
+        'unchanged': len(df) - inserted - updated,
+    }
+
+
+def print_incremental_summary(summary):
+    print(f"  涉及年份: {', '.join(str(y) for y in summary['years'])}")
+    print(f"  文件行数: {summary['source_rows']}（文件内重复键 {summary['source_duplicates']} 行已合并）")
+    if summary['deduplicated']:
+        print(f"  清理库中重复键: {summary['deduplicated']} 行")
+    print(f"  新增: {summary['inserted']} 行")
+    print(f"  更新: {summary['updated']} 行")
+    print(f"  删除: {summary['deleted']} 行")
+    print(f"  未变化: {summary['unchanged']} 行")
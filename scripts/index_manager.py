@@ -0,0 +1,102 @@
+"""
+admission_data 索引管理
+索引集合按后端服务的实际查询条件定义；批量写入前删除、写入后统一重建，最后ANALYZE。
+
+对应的查询：
+- searchService.searchAdmission: year IN / category / school_location 过滤，按 min_score 排序分页
+- recommendService.getRecommend: year + category + min_score 范围，按 min_score 排序
+- universityService.getUniversityByName: university_name，按 year、min_score 取数据
+- scoreRankService.getScoreRankMapping: year 下的 (min_score, min_rank) 对
+- statsService.getStats: year / school_location 分组统计
+- searchService / compareService / statsService / universityService 的模糊搜索：
+  major、university_name 的 ILIKE '%关键词%'（pg_trgm 三元组索引，见 trigram_search.py）
+
+用法: python index_manager.py    按声明补建缺失的索引并ANALYZE
+"""
+import sys
+
+# (索引名, 列定义)；INCLUDE 中的列使对应查询可以只读索引
+ADMISSION_INDEXES = [
+    # 单列索引（与旧版导入脚本同名）
+    ('idx_year', '(year)'),
+    ('idx_major', '(major)'),
+    ('idx_school_location', '(school_location)'),
+    ('idx_min_score', '(min_score)'),
+    ('idx_min_rank', '(min_rank)'),
+    ('idx_university_name', '(university_name)'),
+    ('idx_subject_category', '(subject_category)'),
+    # 增量导入的自然键（与 incremental_import.NATURAL_KEY 一致）
+    ('idx_natural_key',
+     '(year, university_code, major_code, major_group, major, source_category, batch)'),
+    # 推荐、按年份+科类的查询：等值列在前，分数范围在后
+    ('admission_data_year_category_min_score_idx', '(year, category, min_score)'),
+    # 分数位次映射、按年份的分数范围与排序
+    ('admission_data_year_min_score_idx', '(year, min_score) INCLUDE (min_rank)'),
+    # 按年份+地区的搜索和统计
+    ('admission_data_year_school_location_min_score_idx', '(year, school_location, min_score)'),
+    # 院校详情页：院校下按年份、分数取专业
+    ('admission_data_university_name_year_min_score_idx',
+     '(university_name, year, min_score) INCLUDE (major, major_code, min_rank, category, batch)'),
+    # 模糊搜索：三元组GIN索引，数据库未启用 pg_trgm 扩展时跳过
+    ('idx_major_trgm', 'USING gin (major gin_trgm_ops)'),
+    ('idx_university_name_trgm', 'USING gin (university_name gin_trgm_ops)'),
+    ('idx_major_note_trgm', 'USING gin (major_note gin_trgm_ops)'),
+]
+
+
+def is_trigram_index(columns):
+    return 'gin_trgm_ops' in columns
+
+
+def trigram_available(cursor):
+    """数据库是否已启用 pg_trgm 扩展"""
+    cursor.execute("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')")
+    return cursor.fetchone()[0]
+
+
+def index_names():
+    return [name for name, _ in ADMISSION_INDEXES]
+
+
+def drop_indexes(cursor, suffix=''):
+    """删除声明的索引（批量写入前调用）；索引按名称删除，suffix 与 create_indexes 的一致"""
+    for name, _ in ADMISSION_INDEXES:
+        cursor.execute(f"DROP INDEX IF EXISTS {name}{suffix}")
+
+
+def create_indexes(cursor, table='admission_data', suffix=''):
+    """创建声明的索引中缺失的部分；suffix 用于在影子表等临时表上建索引时避免重名"""
+    trigram = trigram_available(cursor)
+    for name, columns in ADMISSION_INDEXES:
+        if is_trigram_index(columns) and not trigram:
+            continue
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name}{suffix} ON {table} {columns}")
+
+
+def analyze(cursor, table='admission_data'):
+    cursor.execute(f"ANALYZE {table}")
+
+
+def table_is_empty(cursor, table='admission_data'):
+    cursor.execute(f"SELECT NOT EXISTS (SELECT 1 FROM {table})")
+    return cursor.fetchone()[0]
+
+
+if __name__ == '__main__':
+    if sys.platform == 'win32':
+        import io
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+        sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+    from db import connect
+    conn = connect()
+    cursor = conn.cursor()
+    print("正在补建索引...")
+    create_indexes(cursor)
+    analyze(cursor)
+    conn.commit()
+    for name in index_names():
+        print(f"  ✓ {name}")
+    cursor.close()
+    conn.close()
+    print("✅ 索引已就绪")
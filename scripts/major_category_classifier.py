@@ -1,8 +1,7 @@
 """
 基于专业名称判断科类分类
 """
-import psycopg2
-from dotenv import load_dotenv
+from db import connect, iter_rows
 import sys
 import re
 
@@ -12,16 +11,6 @@ if sys.platform == 'win32':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
-load_dotenv('../backend/.env')
-
-DB_CONFIG = {
-    'host': 'localhost',
-    'port': 5432,
-    'database': 'admission_query',
-    'user': 'postgres',
-    'password': 'rainworm'
-}
-
 # 定义专业关键词分类规则
 ART_KEYWORDS = [
     '音乐', '美术', '艺术设计', '视觉传达', '环境设计', '产品设计',
@@ -90,7 +79,7 @@ def classify_major(major_name):
     return '综合'
 
 # 连接数据库
-conn = psycopg2.connect(**DB_CONFIG)
+conn = connect()
 cursor = conn.cursor()
 
 print("=== 测试分类规则 ===\n")
@@ -123,14 +112,14 @@ for major, category, count in cursor.fetchall():
 
 # 统计"综合"类别中可以重新分类的专业
 print("\n=== 统计可重新分类的综合类专业 ===\n")
-cursor.execute("""
+# 服务器端游标逐批读取，不把全部专业一次读入内存
+综合_majors = iter_rows(conn, """
     SELECT DISTINCT major, COUNT(*)
     FROM admission_data
     WHERE category = '综合'
     GROUP BY major
     ORDER BY COUNT(*) DESC
 """)
-综合_majors = cursor.fetchall()
 
 physics_count = 0
 history_count = 0
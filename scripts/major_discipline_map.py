@@ -0,0 +1,231 @@
+"""
+专业名称 -> 学科门类对照表（major_discipline_map）
+导入时先按专业代码前两位查门类表；代码缺失或不规范的行再按专业名称查对照表（整张读入内存），
+只有表中没有的名称才调用关键词分类器，结果写回对照表，之后的导入不再重复分类。
+无法判断门类的名称也会记录（门类为空字符串），subject_category 写为NULL。
+
+用法: python major_discipline_map.py                 补全对照表，并回填 admission_data.subject_category
+      python major_discipline_map.py --rebuild       关键词调整后，清空对照表重新分类全部名称
+      python major_discipline_map.py --keyword-only  不使用专业代码，全部按名称分类
+"""
+import argparse
+import sys
+
+import pandas as pd
+
+from bulk_loader import copy_rows
+from dataset_version import bump_dataset_version
+from db import iter_batches
+from discipline_classifier import (
+    CODE_PREFIX_DISCIPLINES, MAJOR_CODE_PATTERN, classify_by_discipline, disciplines_from_codes
+)
+
+MAP_TABLE = 'major_discipline_map'
+
+CREATE_MAP_SQL = f"""
+CREATE TABLE IF NOT EXISTS {MAP_TABLE} (
+    major TEXT PRIMARY KEY,
+    discipline VARCHAR(50) NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+ENSURE_SUBJECT_CATEGORY_SQL = """
+ALTER TABLE admission_data ADD COLUMN IF NOT EXISTS subject_category VARCHAR(50);
+"""
+
+
+def ensure_discipline_map(cursor):
+    """确保对照表存在，且 admission_data 有 subject_category 列"""
+    cursor.execute(CREATE_MAP_SQL)
+    cursor.execute(ENSURE_SUBJECT_CATEGORY_SQL)
+
+
+class DisciplineMap:
+    """内存中的专业->学科门类对照
+
+    apply 为数据补上 subject_category 列：use_code 时专业代码有效的行直接按代码前两位取门类，
+    其余行按名称查对照表，未见过的名称用关键词分类并记下，save 时一次写回数据库。
+    流式导入可以在多个数据块之间复用同一个对象，各路径的行数累计在 by_code / by_name 中。
+    """
+
+    def __init__(self, entries=(), use_code=True):
+        self.mapping = dict(entries)
+        self.use_code = use_code
+        self.new_entries = {}
+        self.by_code = 0
+        self.by_name = 0
+        self.classified = 0
+
+    @classmethod
+    def load(cls, cursor, use_code=True):
+        cursor.execute(f"SELECT major, discipline FROM {MAP_TABLE}")
+        return cls(cursor.fetchall(), use_code=use_code)
+
+    def apply(self, df):
+        """返回带 subject_category 列的副本（无法判断门类的为NULL）"""
+        df = df.copy()
+        if self.use_code and 'major_code' in df.columns:
+            disciplines = disciplines_from_codes(df['major_code'])
+        else:
+            disciplines = pd.Series(None, index=df.index, dtype=object)
+        by_name = disciplines.isna()
+
+        majors = df.loc[by_name, 'major']
+        for major in majors.unique():
+            if major not in self.mapping:
+                discipline = classify_by_discipline(major)
+                self.mapping[major] = discipline
+                self.new_entries[major] = discipline
+                self.classified += 1
+        disciplines[by_name] = majors.map(self.mapping)
+
+        self.by_name += int(by_name.sum())
+        self.by_code += len(df) - int(by_name.sum())
+        df['subject_category'] = disciplines.where(disciplines != '', None)
+        return df
+
+    def save(self, cursor):
+        """把新分类的名称写入对照表（不提交事务），返回写入条数"""
+        if not self.new_entries:
+            return 0
+        cursor.execute(f"""
+            CREATE TEMP TABLE IF NOT EXISTS {MAP_TABLE}_stage (
+                major TEXT,
+                discipline VARCHAR(50)
+            ) ON COMMIT DROP
+        """)
+        copy_rows(cursor, sorted(self.new_entries.items()),
+                  table=f'{MAP_TABLE}_stage', columns=['major', 'discipline'])
+        # 按名称顺序插入，多个进程同时写入相同名称时不会互相死锁
+        cursor.execute(f"""
+            INSERT INTO {MAP_TABLE} (major, discipline)
+            SELECT major, discipline FROM {MAP_TABLE}_stage ORDER BY major
+            ON CONFLICT (major) DO NOTHING
+        """)
+        saved = cursor.rowcount
+        cursor.execute(f"DROP TABLE {MAP_TABLE}_stage")
+        self.new_entries = {}
+        return saved
+
+    def summary(self):
+        return (f"学科门类: {self.by_code} 行按专业代码，{self.by_name} 行按专业名称"
+                f"（其中 {self.classified} 个新名称经关键词分类）")
+
+
+def apply_discipline_map(cursor, df):
+    """读取对照表、为 df 补上 subject_category、写回新分类的名称，返回新的 df
+
+    不修改 admission_data 的表结构（不持有其表锁），subject_category 列应已由 ensure_discipline_map 建好。
+    """
+    cursor.execute(CREATE_MAP_SQL)
+    discipline_map = DisciplineMap.load(cursor)
+    df = discipline_map.apply(df)
+    discipline_map.save(cursor)
+    return df
+
+
+def _code_prefix_values():
+    """门类代码表的 VALUES 子句和参数"""
+    values = ', '.join(['(%s, %s)'] * len(CODE_PREFIX_DISCIPLINES))
+    params = [v for item in CODE_PREFIX_DISCIPLINES.items() for v in item]
+    return f"(VALUES {values}) AS p(prefix, discipline)", params
+
+
+def _resolved_disciplines_sql(use_code):
+    """每行应有的学科门类：专业代码有效时取代码门类，否则取对照表（与 DisciplineMap.apply 一致）"""
+    if not use_code:
+        return f"""
+            SELECT a.id, a.year, NULLIF(m.discipline, '') AS discipline, 'name' AS path
+            FROM admission_data a
+            LEFT JOIN {MAP_TABLE} m ON m.major = a.major
+        """, []
+    prefixes, params = _code_prefix_values()
+    return f"""
+        SELECT a.id, a.year,
+               COALESCE(p.discipline, NULLIF(m.discipline, '')) AS discipline,
+               CASE WHEN p.discipline IS NOT NULL THEN 'code' ELSE 'name' END AS path
+        FROM admission_data a
+        LEFT JOIN {prefixes}
+          ON p.prefix = substring(upper(trim(a.major_code)) FROM '{MAJOR_CODE_PATTERN}')
+        LEFT JOIN {MAP_TABLE} m ON m.major = a.major AND p.discipline IS NULL
+    """, params
+
+
+def backfill_subject_category(cursor, use_code=True):
+    """为库中尚未分类的专业名称补全对照表，再更新 subject_category
+
+    返回 (更新行数, {'code': 按代码的行数, 'name': 按名称的行数})。
+    """
+    ensure_discipline_map(cursor)
+    discipline_map = DisciplineMap()
+    # 逐批读取未分类的名称，每批分类后即写回对照表
+    for batch in iter_batches(cursor.connection, f"""
+        SELECT DISTINCT a.major
+        FROM admission_data a
+        WHERE a.major IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM {MAP_TABLE} m WHERE m.major = a.major)
+    """):
+        for (major,) in batch:
+            discipline_map.new_entries[major] = classify_by_discipline(major)
+        discipline_map.save(cursor)
+
+    resolved, params = _resolved_disciplines_sql(use_code)
+    cursor.execute(f"""
+        CREATE TEMP TABLE resolved_disciplines ON COMMIT DROP AS {resolved}
+    """, params)
+    cursor.execute("SELECT path, COUNT(*) FROM resolved_disciplines GROUP BY path")
+    paths = {'code': 0, 'name': 0}
+    paths.update(dict(cursor.fetchall()))
+
+    cursor.execute("""
+        UPDATE admission_data a
+        SET subject_category = r.discipline
+        FROM resolved_disciplines r
+        WHERE a.id = r.id AND a.year = r.year
+          AND a.subject_category IS DISTINCT FROM r.discipline
+    """)
+    updated = cursor.rowcount
+    cursor.execute("DROP TABLE resolved_disciplines")
+    if updated:
+        bump_dataset_version(cursor, 'major_discipline_map')
+    return updated, paths
+
+
+if __name__ == '__main__':
+    if sys.platform == 'win32':
+        import io
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+        sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+    from db import connect
+
+    parser = argparse.ArgumentParser(description='专业名称->学科门类对照表')
+    parser.add_argument('--rebuild', action='store_true', help='清空对照表，重新分类全部名称')
+    parser.add_argument('--keyword-only', action='store_true', help='不使用专业代码，全部按名称分类')
+    args = parser.parse_args()
+
+    conn = connect()
+    cursor = conn.cursor()
+    try:
+        ensure_discipline_map(cursor)
+        if args.rebuild:
+            cursor.execute(f"TRUNCATE {MAP_TABLE}")
+            print("已清空对照表，重新分类...")
+        updated, paths = backfill_subject_category(cursor, use_code=not args.keyword_only)
+        conn.commit()
+    except Exception as e:
+        print(f"❌ 更新失败: {e}")
+        conn.rollback()
+        sys.exit(1)
+
+    cursor.execute(f"SELECT COUNT(*), COUNT(*) FILTER (WHERE discipline = '') FROM {MAP_TABLE}")
+    total, unmatched = cursor.fetchone()
+    print(f"📊 对照表共 {total:,} 个专业名称，其中 {unmatched:,} 个无法判断门类")
+    print(f"📊 按专业代码判断 {paths['code']:,} 行，按专业名称判断 {paths['name']:,} 行")
+    print(f"✅ 已更新 {updated:,} 条记录的 subject_category")
+    cursor.close()
+    conn.close()
+    if updated:
+        from derived_tables import refresh_stale_tables
+        refresh_stale_tables()
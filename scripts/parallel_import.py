@@ -0,0 +1,159 @@
+"""
+按年份并行导入
+每个年份在独立的进程中读取、清洗，并用COPY写入各自的暂存表；
+全部年份完成后，在一个事务中用暂存表整体替换 admission_data 中对应年份的数据。
+admission_data 是分区表时，暂存表直接作为新分区挂载，替换旧分区。
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from bulk_loader import copy_dataframe
+from cleaning import clean_admission_data, clean_text
+from dataset_version import bump_dataset_version
+from db import connect
+from excel_cache import YEAR_COLUMN, load_source
+from incremental_import import HASHED_COLUMNS, add_row_hashes
+from index_manager import analyze, create_indexes, drop_indexes
+from major_discipline_map import DisciplineMap
+from partitioning import (
+    build_year_table_indexes, create_year_table, is_partitioned, swap_year_partitions
+)
+
+
+def stage_table_name(year):
+    return f'admission_stage_{int(year)}'
+
+
+def _load_year(task):
+    """工作进程：读取并清洗一个年份，写入该年份的暂存表，返回 (年份, 行数)"""
+    year, source_path, db_config, partitioned = task
+    df = load_source(source_path, years=[year])
+    df = clean_admission_data(df)
+
+    stage = stage_table_name(year)
+    conn = connect(db_config)
+    try:
+        cursor = conn.cursor()
+        # 对照表已由主进程补全，这里只查表
+        df = add_row_hashes(DisciplineMap.load(cursor).apply(df))
+        if partitioned:
+            # 之后直接作为分区挂载，结构需与父表一致
+            create_year_table(cursor, stage, year)
+        else:
+            cursor.execute(f"DROP TABLE IF EXISTS {stage}")
+            # 暂存表不写WAL，只用于本次导入
+            cursor.execute(f"""
+                CREATE UNLOGGED TABLE {stage} AS
+                SELECT {', '.join(HASHED_COLUMNS)} FROM admission_data WITH NO DATA
+            """)
+        rows = copy_dataframe(cursor, df, table=stage, columns=HASHED_COLUMNS)
+        if partitioned:
+            # 各进程并行建好自己年份的索引，挂载时直接复用
+            build_year_table_indexes(cursor, stage)
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+    return year, rows
+
+
+def source_years(source_path):
+    """数据源中出现的所有年份"""
+    years = load_source(source_path, columns=[YEAR_COLUMN])[YEAR_COLUMN].dropna().unique()
+    return sorted(int(y) for y in years)
+
+
+def prime_discipline_map(conn, source_path):
+    """在主进程中为数据源的全部专业名称补全学科门类对照表，工作进程只需查表"""
+    majors = clean_text(load_source(source_path, columns=['专业'])['专业'])
+    cursor = conn.cursor()
+    discipline_map = DisciplineMap.load(cursor)
+    discipline_map.apply(majors.drop_duplicates().to_frame('major'))
+    discipline_map.save(cursor)
+    conn.commit()
+    cursor.close()
+
+
+def drop_stage_tables(conn, years):
+    cursor = conn.cursor()
+    for year in years:
+        cursor.execute(f"DROP TABLE IF EXISTS {stage_table_name(year)}")
+    conn.commit()
+    cursor.close()
+
+
+def swap_in_years(conn, years):
+    """在一个事务中用各年份的暂存表替换 admission_data 中的数据，返回写入行数
+
+    替换的是表中全部年份时，先删除二级索引、写入后统一重建。
+    """
+    cursor = conn.cursor()
+    columns = ', '.join(HASHED_COLUMNS)
+    cursor.execute("SELECT NOT EXISTS (SELECT 1 FROM admission_data WHERE NOT (year = ANY(%s)))",
+                   (list(years),))
+    if cursor.fetchone()[0]:
+        drop_indexes(cursor)
+    cursor.execute("DELETE FROM admission_data WHERE year = ANY(%s)", (list(years),))
+    inserted = 0
+    for year in years:
+        cursor.execute(f"""
+            INSERT INTO admission_data ({columns})
+            SELECT {columns} FROM {stage_table_name(year)}
+        """)
+        inserted += cursor.rowcount
+        cursor.execute(f"DROP TABLE {stage_table_name(year)}")
+    create_indexes(cursor)
+    analyze(cursor)
+    bump_dataset_version(cursor, 'parallel_import')
+    conn.commit()
+    cursor.close()
+    return inserted
+
+
+def attach_years(conn, years):
+    """在一个事务中把各年份的暂存表作为分区挂载，替换原有分区"""
+    cursor = conn.cursor()
+    swap_year_partitions(cursor, {year: stage_table_name(year) for year in years})
+    create_indexes(cursor)
+    bump_dataset_version(cursor, 'parallel_import')
+    conn.commit()
+    # 暂存表各自ANALYZE过，父表的统计信息（跨分区的查询规划使用）需单独收集，放在交换事务之外
+    analyze(cursor)
+    conn.commit()
+    cursor.close()
+
+
+def parallel_import(conn, db_config, source_path, workers=None, years=None):
+    """并行导入各年份数据，返回 {年份: 行数}
+
+    workers 默认取CPU核数（不超过年份数）。任一年份失败时不会改动 admission_data。
+    """
+    # 在主进程中先建好缓存，避免多个工作进程同时转换Excel
+    all_years = source_years(source_path)
+    if years is not None:
+        all_years = [y for y in all_years if y in set(int(y) for y in years)]
+    if not all_years:
+        return {}
+
+    cursor = conn.cursor()
+    partitioned = is_partitioned(cursor)
+    cursor.close()
+    conn.commit()
+    prime_discipline_map(conn, source_path)
+
+    workers = min(workers or os.cpu_count() or 1, len(all_years))
+    tasks = [(year, source_path, db_config, partitioned) for year in all_years]
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            loaded = dict(executor.map(_load_year, tasks))
+        if partitioned:
+            attach_years(conn, all_years)
+        else:
+            swap_in_years(conn, all_years)
+    except Exception:
+        conn.rollback()
+        drop_stage_tables(conn, all_years)
+        raise
+
+    return loaded
@@ -0,0 +1,227 @@
+"""
+admission_data 按年份分区（PARTITION BY LIST (year)）
+每个年份一个分区 admission_data_y<年份>；数据源出现新年份时自动建分区，
+单个年份可以整分区清空或用新表整体替换，带年份条件的查询只扫描对应分区。
+
+用法: python partitioning.py --convert    把现有的普通表转换为分区表
+      python partitioning.py              查看各分区行数
+"""
+import argparse
+import sys
+
+from index_manager import (
+    ADMISSION_INDEXES, analyze, create_indexes, drop_indexes, is_trigram_index, trigram_available,
+)
+
+PARENT_TABLE = 'admission_data'
+
+
+def partition_name(year):
+    return f'{PARENT_TABLE}_y{int(year)}'
+
+
+def is_partitioned(cursor, table=PARENT_TABLE):
+    cursor.execute("""
+        SELECT c.relkind = 'p'
+        FROM pg_class c
+        WHERE c.oid = to_regclass(%s)
+    """, (table,))
+    row = cursor.fetchone()
+    return bool(row and row[0])
+
+
+def list_partitions(cursor):
+    """[(年份, 分区表名)]，按年份排序"""
+    cursor.execute("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = %s::regclass
+        ORDER BY c.relname
+    """, (PARENT_TABLE,))
+    prefix = f'{PARENT_TABLE}_y'
+    return [
+        (int(name[len(prefix):]), name)
+        for (name,) in cursor.fetchall()
+        if name.startswith(prefix) and name[len(prefix):].isdigit()
+    ]
+
+
+def ensure_year_partitions(cursor, years):
+    """为尚无分区的年份建分区；表不是分区表时不做任何事。返回新建的年份"""
+    if not is_partitioned(cursor):
+        return []
+    existing = {year for year, _ in list_partitions(cursor)}
+    created = []
+    for year in sorted({int(y) for y in years} - existing):
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {partition_name(year)}
+            PARTITION OF {PARENT_TABLE} FOR VALUES IN ({int(year)})
+        """)
+        created.append(year)
+    return created
+
+
+def truncate_year(cursor, year):
+    """清空一个年份（分区表直接TRUNCATE分区，否则DELETE）"""
+    if is_partitioned(cursor):
+        cursor.execute(f"TRUNCATE {partition_name(year)}")
+    else:
+        cursor.execute(f"DELETE FROM {PARENT_TABLE} WHERE year = %s", (int(year),))
+
+
+def create_year_table(cursor, table, year):
+    """建一张可以作为某年份分区挂载的独立表
+
+    列与默认值与父表一致；CHECK约束使挂载时无需再扫描全表校验分区范围。
+    """
+    cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    cursor.execute(f"""
+        CREATE TABLE {table}
+        (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+    """)
+    cursor.execute(f"""
+        ALTER TABLE {table} ADD CONSTRAINT {table}_year_check CHECK (year = {int(year)})
+    """)
+
+
+def build_year_table_indexes(cursor, table):
+    """在待挂载的表上预先建好与父表一致的主键和索引，然后ANALYZE
+
+    挂载时直接复用这些索引，交换事务中不再建索引。二级索引不指定名称，由数据库生成不重复的名字。
+    """
+    cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, year)")
+    trigram = trigram_available(cursor)
+    for _, columns in ADMISSION_INDEXES:
+        if is_trigram_index(columns) and not trigram:
+            continue
+        cursor.execute(f"CREATE INDEX ON {table} {columns}")
+    cursor.execute(f"ANALYZE {table}")
+
+
+def rename_year_table(cursor, table, new_name):
+    """改表名，主键约束随之改为 <新表名>_pkey"""
+    cursor.execute(f"ALTER TABLE {table} RENAME TO {new_name}")
+    cursor.execute("""
+        SELECT conname FROM pg_constraint
+        WHERE conrelid = %s::regclass AND contype = 'p'
+    """, (new_name,))
+    row = cursor.fetchone()
+    if row and row[0] != f'{new_name}_pkey':
+        cursor.execute(f"ALTER TABLE {new_name} RENAME CONSTRAINT {row[0]} TO {new_name}_pkey")
+
+
+def swap_year_partitions(cursor, tables_by_year, keep_old=False):
+    """用独立表整体替换对应年份的分区（在调用方的事务中执行）
+
+    旧分区被卸下后删除；keep_old=True 时改名为 admission_data_y<年份>_old 保留，用于回滚。
+    新表应先用 build_year_table_indexes 建好索引，否则挂载时会在事务中建索引。
+    """
+    existing = dict(list_partitions(cursor))
+    for year, table in sorted(tables_by_year.items()):
+        target = partition_name(year)
+        old = f'{target}_old'
+        if year in existing:
+            cursor.execute(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {target}")
+            cursor.execute(f"DROP TABLE IF EXISTS {old}")
+            if keep_old:
+                rename_year_table(cursor, target, old)
+            else:
+                cursor.execute(f"DROP TABLE {target}")
+        if table != target:
+            rename_year_table(cursor, table, target)
+        cursor.execute(f"""
+            ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {target} FOR VALUES IN ({int(year)})
+        """)
+        cursor.execute(f"ALTER TABLE {target} DROP CONSTRAINT IF EXISTS {table}_year_check")
+
+
+def drop_year_partitions(cursor, years, keep_old=False):
+    """卸下并删除（或保留为 _old）指定年份的分区"""
+    existing = dict(list_partitions(cursor))
+    for year in years:
+        if year not in existing:
+            continue
+        target = existing[year]
+        cursor.execute(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {target}")
+        cursor.execute(f"DROP TABLE IF EXISTS {target}_old")
+        if keep_old:
+            rename_year_table(cursor, target, f'{target}_old')
+        else:
+            cursor.execute(f"DROP TABLE {target}")
+
+
+def convert_to_partitioned(conn):
+    """把普通表 admission_data 转换为按年份分区的表（一个事务内完成，保留原有id）"""
+    cursor = conn.cursor()
+    if is_partitioned(cursor):
+        cursor.close()
+        return False
+
+    heap = f'{PARENT_TABLE}_heap'
+    cursor.execute(f"LOCK TABLE {PARENT_TABLE} IN ACCESS EXCLUSIVE MODE")
+    cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", (PARENT_TABLE,))
+    sequence = cursor.fetchone()[0]
+
+    # 索引和主键名要留给新的父表
+    drop_indexes(cursor)
+    cursor.execute(f"ALTER TABLE {PARENT_TABLE} RENAME TO {heap}")
+    cursor.execute(f"ALTER TABLE {heap} RENAME CONSTRAINT {PARENT_TABLE}_pkey TO {heap}_pkey")
+
+    # 分区表的主键必须包含分区键
+    cursor.execute(f"""
+        CREATE TABLE {PARENT_TABLE}
+        (LIKE {heap} INCLUDING DEFAULTS, PRIMARY KEY (id, year))
+        PARTITION BY LIST (year)
+    """)
+    cursor.execute(f"SELECT DISTINCT year FROM {heap}")
+    ensure_year_partitions(cursor, [row[0] for row in cursor.fetchall()])
+    cursor.execute(f"INSERT INTO {PARENT_TABLE} SELECT * FROM {heap}")
+    if sequence:
+        cursor.execute(f"ALTER SEQUENCE {sequence} OWNED BY {PARENT_TABLE}.id")
+    cursor.execute(f"DROP TABLE {heap}")
+
+    create_indexes(cursor)
+    analyze(cursor)
+    conn.commit()
+    cursor.close()
+    return True
+
+
+if __name__ == '__main__':
+    if sys.platform == 'win32':
+        import io
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+        sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+    from db import connect
+
+    parser = argparse.ArgumentParser(description='admission_data 按年份分区管理')
+    parser.add_argument('--convert', action='store_true', help='把普通表转换为分区表')
+    args = parser.parse_args()
+
+    conn = connect()
+    cursor = conn.cursor()
+
+    if args.convert:
+        print("正在转换为按年份分区的表...")
+        try:
+            if convert_to_partitioned(conn):
+                print("✅ 转换完成")
+            else:
+                print("✅ 已经是分区表，无需转换")
+        except Exception as e:
+            print(f"❌ 转换失败: {e}")
+            conn.rollback()
+            sys.exit(1)
+
+    if not is_partitioned(cursor):
+        print("admission_data 不是分区表（python partitioning.py --convert 进行转换）")
+    else:
+        print("\n【各年份分区】")
+        for year, table in list_partitions(cursor):
+            cursor.execute(f"SELECT COUNT(*) FROM {table}")
+            print(f"  {year}: {table}，{cursor.fetchone()[0]:,} 条")
+
+    cursor.close()
+    conn.close()
@@ -0,0 +1,421 @@
+"""
+脚本数据库访问的语句级计时
+设置环境变量 DB_TRACE 后，db.py 建立的连接会记录每条语句的耗时、返回/影响行数和传输字节数，
+按语句指纹（去掉字面量后的SQL）汇总；超过阈值的语句还可采样一次 EXPLAIN (ANALYZE, BUFFERS)。
+进程退出时写出JSON报告，以及可直接交给 flamegraph.pl / speedscope 的折叠栈文件（.folded）。
+未设置 DB_TRACE 时连接不做任何包装，没有额外开销。
+
+环境变量：
+    DB_TRACE               1 表示开启（报告写入 scripts/.trace/），或直接指定报告路径 xxx.json
+    DB_TRACE_EXPLAIN_MS    耗时超过该毫秒数的查询语句采样一次执行计划（默认不采样）
+    DB_TRACE_EXPLAIN_WRITES  1 表示写语句（INSERT/UPDATE/DELETE）也采样：在保存点中再执行一次后回滚，
+                           语句因此执行两次，消耗的序列值不会退回（默认只采样查询语句）
+
+用法: DB_TRACE=1 python update_category_to_discipline.py
+      DB_TRACE=1 DB_TRACE_EXPLAIN_MS=200 python import-excel.py --incremental
+      python query_trace.py .trace/trace-xxx.json     查看报告摘要
+"""
+import atexit
+import hashlib
+import json
+import multiprocessing
+import multiprocessing.util
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+
+from psycopg2.extensions import connection as _connection
+from psycopg2.extensions import cursor as _cursor
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+TRACE_DIR = os.path.join(SCRIPTS_DIR, '.trace')
+
+# 可以用 EXPLAIN ANALYZE 重新执行的语句：查询语句默认采样，写语句需 DB_TRACE_EXPLAIN_WRITES=1
+QUERY_KEYWORDS = ('select', 'with')
+WRITE_KEYWORDS = ('insert', 'update', 'delete')
+
+# WITH 语句中带有写操作（数据修改CTE）时按写语句处理
+_WRITE_CTE = re.compile(r'\b(insert|update|delete)\b', re.IGNORECASE)
+
+# 报告中每个指纹保留的SQL示例长度
+SAMPLE_SQL_LENGTH = 500
+
+# 摘要中显示的语句数
+SUMMARY_TOP = 15
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%(?:\(\w+\))?s')
+_VALUE_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+# 计时时跳过的调用层（本模块、db.py、批量写入封装），折叠栈从调用它们的脚本函数开始
+_INTERNAL_FILES = {'query_trace.py', 'db.py', 'bulk_loader.py'}
+
+
+def _trace_setting():
+    return os.environ.get('DB_TRACE', '').strip()
+
+
+def trace_enabled():
+    return _trace_setting().lower() not in ('', '0', 'false', 'off', 'no')
+
+
+def normalize_sql(sql):
+    """去掉字面量、参数占位符和多余空白，同一类语句得到相同的文本"""
+    if isinstance(sql, bytes):
+        sql = sql.decode('utf-8', 'replace')
+    sql = _STRING_LITERAL.sub('?', str(sql))
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _VALUE_LIST.sub('(?)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def fingerprint(normalized):
+    return hashlib.md5(normalized.encode('utf-8')).hexdigest()[:12]
+
+
+def _value_size(value):
+    if value is None:
+        return 0
+    if isinstance(value, (str, bytes, bytearray, memoryview)):
+        return len(value)
+    return 8
+
+
+def _rows_size(rows):
+    return sum(_value_size(v) for row in rows for v in row)
+
+
+def _call_site():
+    """发起查询的脚本函数（跳过内部封装层）"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = os.path.basename(frame.f_code.co_filename)
+        if filename not in _INTERNAL_FILES and 'psycopg2' not in frame.f_code.co_filename:
+            return f"{os.path.splitext(filename)[0]}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return '?'
+
+
+class QueryRecorder:
+    """按 (调用位置, 语句指纹) 累计耗时、行数和字节数"""
+
+    def __init__(self, explain_ms=None, explain_writes=False):
+        self.explain_ms = explain_ms
+        self.explain_writes = explain_writes
+        self.started = time.perf_counter()
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self.stats = {}
+        self.plans = {}
+        self.lock = threading.Lock()
+
+    def record(self, site, normalized, wall_s, rows=0, bytes_sent=0, bytes_received=0):
+        key = (site, fingerprint(normalized))
+        with self.lock:
+            entry = self.stats.get(key)
+            if entry is None:
+                entry = self.stats[key] = {
+                    'fingerprint': key[1],
+                    'call_site': site,
+                    'sql': normalized[:SAMPLE_SQL_LENGTH],
+                    'calls': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'rows': 0,
+                    'bytes_sent': 0,
+                    'bytes_received': 0,
+                }
+            ms = wall_s * 1000
+            entry['calls'] += 1
+            entry['total_ms'] += ms
+            entry['max_ms'] = max(entry['max_ms'], ms)
+            entry['rows'] += max(rows, 0)
+            entry['bytes_sent'] += bytes_sent
+            entry['bytes_received'] += bytes_received
+        return key
+
+    def add_fetch(self, key, wall_s, rows, bytes_received):
+        """取数的耗时、行数和字节数计入产生结果的语句"""
+        with self.lock:
+            entry = self.stats[key]
+            entry['total_ms'] += wall_s * 1000
+            entry['rows'] += rows
+            entry['bytes_received'] += bytes_received
+
+    def wants_plan(self, key, wall_s):
+        if self.explain_ms is None or wall_s * 1000 < self.explain_ms:
+            return False
+        with self.lock:
+            if key[1] in self.plans:
+                return False
+            # 先占位，同一指纹只采样一次
+            self.plans[key[1]] = None
+            return True
+
+    def report(self):
+        statements = sorted(self.stats.values(), key=lambda e: e['total_ms'], reverse=True)
+        for entry in statements:
+            entry['total_ms'] = round(entry['total_ms'], 3)
+            entry['max_ms'] = round(entry['max_ms'], 3)
+            entry['mean_ms'] = round(entry['total_ms'] / entry['calls'], 3)
+            plan = self.plans.get(entry['fingerprint'])
+            if plan is not None:
+                entry['explain'] = plan
+        return {
+            'script': os.path.basename(sys.argv[0] or 'python'),
+            'argv': sys.argv[1:],
+            'pid': os.getpid(),
+            'started_at': self.started_at,
+            'elapsed_ms': round((time.perf_counter() - self.started) * 1000, 3),
+            'explain_threshold_ms': self.explain_ms,
+            'statements': statements,
+            'totals': {
+                'statements': sum(e['calls'] for e in statements),
+                'db_ms': round(sum(e['total_ms'] for e in statements), 3),
+                'rows': sum(e['rows'] for e in statements),
+                'bytes_sent': sum(e['bytes_sent'] for e in statements),
+                'bytes_received': sum(e['bytes_received'] for e in statements),
+            },
+        }
+
+    def folded(self, report):
+        """折叠栈格式：脚本;调用函数;语句 微秒数"""
+        script = os.path.splitext(report['script'])[0]
+        lines = []
+        for entry in report['statements']:
+            label = entry['sql'][:80].replace(';', ',')
+            lines.append(f"{script};{entry['call_site']};{label} {round(entry['total_ms'] * 1000)}")
+        return '\n'.join(lines) + '\n'
+
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+
+def get_recorder():
+    """当前进程的记录器（首次使用时创建，并在进程退出时写出报告）"""
+    global _recorder
+    with _recorder_lock:
+        if _recorder is None:
+            explain_ms = os.environ.get('DB_TRACE_EXPLAIN_MS')
+            explain_writes = os.environ.get('DB_TRACE_EXPLAIN_WRITES', '').strip() == '1'
+            _recorder = QueryRecorder(float(explain_ms) if explain_ms else None, explain_writes)
+            atexit.register(write_report)
+            if multiprocessing.parent_process() is not None:
+                # multiprocessing 的子进程退出时不执行 atexit，由其退出清理写出报告
+                multiprocessing.util.Finalize(None, write_report, exitpriority=0)
+        return _recorder
+
+
+def report_path():
+    setting = _trace_setting()
+    if setting.lower().endswith('.json'):
+        # 多进程（如并行导入）时子进程各写一份，文件名加进程号
+        if multiprocessing.parent_process() is not None:
+            root, ext = os.path.splitext(setting)
+            return f'{root}.{os.getpid()}{ext}'
+        return setting
+    script = os.path.splitext(os.path.basename(sys.argv[0] or 'python'))[0]
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    return os.path.join(TRACE_DIR, f'trace-{script}-{stamp}-{os.getpid()}.json')
+
+
+def write_report():
+    global _recorder
+    if _recorder is None or not _recorder.stats:
+        return None
+    report = _recorder.report()
+    recorder, _recorder = _recorder, None
+    path = report_path()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+    with open(os.path.splitext(path)[0] + '.folded', 'w', encoding='utf-8') as f:
+        f.write(recorder.folded(report))
+    print(f"📊 语句计时报告已写入: {path}", file=sys.stderr)
+    return path
+
+
+class _CountingReader:
+    """COPY FROM 的数据源包装，统计发送的字节数"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.bytes = 0
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        self.bytes += len(data.encode('utf-8') if isinstance(data, str) else data)
+        return data
+
+    def readline(self, size=-1):
+        data = self.stream.readline(size)
+        self.bytes += len(data.encode('utf-8') if isinstance(data, str) else data)
+        return data
+
+
+class TracingCursor(_cursor):
+    """记录每条语句的耗时、行数和字节数"""
+
+    _trace_key = None
+
+    def execute(self, query, vars=None):
+        recorder = get_recorder()
+        site = _call_site()
+        start = time.perf_counter()
+        try:
+            result = super().execute(query, vars)
+        except Exception:
+            self._trace_key = recorder.record(site, normalize_sql(query), time.perf_counter() - start)
+            raise
+        wall = time.perf_counter() - start
+        # 服务器端游标的行数在取数时累计
+        rows = self.rowcount if self.name is None else 0
+        self._trace_key = recorder.record(site, normalize_sql(query), wall, rows=rows,
+                                          bytes_sent=len(self.query or b''))
+        if self.name is None and recorder.wants_plan(self._trace_key, wall):
+            _capture_plan(self.connection, recorder, self._trace_key[1], query, vars)
+        return result
+
+    def executemany(self, query, vars_list):
+        recorder = get_recorder()
+        site = _call_site()
+        start = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            self._trace_key = recorder.record(site, normalize_sql(query),
+                                              time.perf_counter() - start, rows=self.rowcount)
+
+    def copy_expert(self, sql, file, size=8192):
+        recorder = get_recorder()
+        site = _call_site()
+        reader = _CountingReader(file) if hasattr(file, 'read') else file
+        start = time.perf_counter()
+        try:
+            return super().copy_expert(sql, reader, size)
+        finally:
+            sent = reader.bytes if isinstance(reader, _CountingReader) else 0
+            self._trace_key = recorder.record(site, normalize_sql(sql), time.perf_counter() - start,
+                                              rows=self.rowcount, bytes_sent=sent)
+
+    def _fetched(self, start, rows):
+        if self._trace_key is None:
+            return
+        if self.name is None:
+            # 普通游标的结果在执行时已全部到达客户端，耗时和行数已计入，这里只补字节数
+            get_recorder().add_fetch(self._trace_key, 0, 0, _rows_size(rows))
+        else:
+            get_recorder().add_fetch(self._trace_key, time.perf_counter() - start,
+                                     len(rows), _rows_size(rows))
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(start, [row] if row is not None else [])
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(size) if size is not None else super().fetchmany()
+        self._fetched(start, rows)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(start, rows)
+        return rows
+
+    def __iter__(self):
+        # 普通游标一次取出，服务器端游标每次取 itersize 行
+        size = self.itersize if self.name is not None else None
+        while True:
+            rows = self.fetchmany(size) if size else self.fetchall()
+            if not rows:
+                return
+            yield from rows
+            if not size:
+                return
+
+
+def _capture_plan(conn, recorder, key, query, vars):
+    """对慢语句采样一次 EXPLAIN (ANALYZE, BUFFERS)
+
+    默认只采样查询语句。开启 DB_TRACE_EXPLAIN_WRITES 后写语句也在保存点中重新执行一次再回滚，
+    不影响事务中的数据；autocommit 连接没有保存点，始终只采样查询语句。
+    """
+    normalized = normalize_sql(query)
+    keyword = normalized.split(' ', 1)[0].lower()
+    if keyword == 'with' and _WRITE_CTE.search(normalized):
+        keyword = 'insert'
+    if keyword in WRITE_KEYWORDS:
+        if not recorder.explain_writes or conn.autocommit:
+            return
+    elif keyword not in QUERY_KEYWORDS:
+        return
+    cursor = _cursor(conn)
+    try:
+        if not conn.autocommit:
+            cursor.execute("SAVEPOINT query_trace_explain")
+        cursor.execute(b"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + cursor.mogrify(query, vars))
+        plan = cursor.fetchone()[0]
+        if not conn.autocommit:
+            cursor.execute("ROLLBACK TO SAVEPOINT query_trace_explain")
+            cursor.execute("RELEASE SAVEPOINT query_trace_explain")
+    except Exception as e:
+        plan = {'error': str(e)}
+        if not conn.autocommit:
+            try:
+                cursor.execute("ROLLBACK TO SAVEPOINT query_trace_explain")
+            except Exception:
+                pass
+    finally:
+        cursor.close()
+    with recorder.lock:
+        recorder.plans[key] = plan
+
+
+class TracingConnection(_connection):
+    """默认创建 TracingCursor 的连接"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cursor_factory = TracingCursor
+
+
+def print_summary(report, top=SUMMARY_TOP):
+    totals = report['totals']
+    print(f"=== {report['script']} {' '.join(report['argv'])}（{report['started_at']}）===")
+    print(f"  总耗时 {report['elapsed_ms'] / 1000:.2f}s，其中数据库 {totals['db_ms'] / 1000:.2f}s，"
+          f"{totals['statements']:,} 条语句，{totals['rows']:,} 行，"
+          f"发送 {totals['bytes_sent'] / 1024:,.0f} KB，接收 {totals['bytes_received'] / 1024:,.0f} KB")
+    print(f"\n【耗时最多的语句（前{top}条）】")
+    for entry in report['statements'][:top]:
+        plan = '，有执行计划' if 'explain' in entry else ''
+        print(f"  {entry['total_ms']:>10.1f}ms  {entry['calls']:>6}次  {entry['rows']:>9,}行  "
+              f"{entry['call_site']}{plan}")
+        print(f"      {entry['sql'][:120]}")
+
+
+if __name__ == '__main__':
+    if sys.platform == 'win32':
+        import io
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+        sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+    import argparse
+
+    parser = argparse.ArgumentParser(description='查看语句计时报告摘要')
+    parser.add_argument('report', help='DB_TRACE 生成的JSON报告')
+    parser.add_argument('--top', type=int, default=SUMMARY_TOP, help='显示的语句数')
+    args = parser.parse_args()
+
+    with open(args.report, encoding='utf-8') as f:
+        print_summary(json.load(f), args.top)
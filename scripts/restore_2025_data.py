@@ -2,13 +2,23 @@
 恢复2025年490分数据到修改前的状态
 """
 
-import pandas as pd
-import psycopg2
-from psycopg2.extras import execute_batch
-from dotenv import load_dotenv
-import os
 import sys
-import numpy as np
+import argparse
+
+from bulk_loader import copy_dataframe
+from cleaning import clean_admission_data
+from excel_cache import load_source
+from dataset_version import bump_dataset_version
+from derived_tables import refresh_stale_tables
+from db import connect
+from shadow_reload import shadow_reload, OLD_TABLE
+from index_manager import analyze
+from partitioning import ensure_year_partitions, truncate_year
+from major_discipline_map import apply_discipline_map, ensure_discipline_map
+from incremental_import import (
+    HASHED_COLUMNS, add_row_hashes, ensure_row_hash_column,
+    incremental_import, print_incremental_summary
+)
 
 # 设置UTF-8输出编码
 if sys.platform == 'win32':
@@ -16,144 +26,68 @@ if sys.platform == 'win32':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
-# 加载环境变量
-load_dotenv('../backend/.env')
 
-# 数据库连接配置
-DB_CONFIG = {
-    'host': 'localhost',
-    'port': 5432,
-    'database': 'admission_query',
-    'user': 'postgres',
-    'password': 'rainworm'
-}
+def restore_2025_data(incremental=False, shadow=False):
+    """从Excel文件重新导入2025年数据
 
-# Excel文件路径
-EXCEL_FILE = '../22-25年全国高校在浙江的专业录取分数.xlsx'
-
-
-def restore_2025_data():
-    """从Excel文件重新导入2025年数据"""
+    incremental=True 时按自然键比对行哈希，只同步有变化的行，而不是删除后整体重插；
+    shadow=True 时在影子表中重建后原子交换，恢复期间查询看不到中间状态
+    """
 
     print("=== 开始恢复2025年数据 ===\n")
 
     # 读取Excel文件
     print("步骤1: 读取Excel文件...")
-    df = pd.read_excel(EXCEL_FILE)
-    df_2025 = df[df['年份'] == 2025].copy()
+    df_2025 = load_source(years=[2025])
     print(f"✅ 找到 {len(df_2025)} 行2025年数据\n")
 
     # 数据清洗
     print("步骤2: 清洗数据...")
 
-    # 重命名列
-    column_mapping = {
-        '年份': 'year',
-        '院校名称': 'university_name',
-        '院校代码': 'university_code',
-        '科类': 'category',
-        '批次': 'batch',
-        '选科要求': 'subject_requirement',
-        '专业': 'major',
-        '专业代码': 'major_code',
-        '所属专业组': 'major_group',
-        '专业备注': 'major_note',
-        '录取人数': 'admission_count',
-        '最低分数': 'min_score',
-        '最低位次': 'min_rank',
-        '学校所在': 'school_location',
-        '学校性质': 'school_nature',
-        '是否985': 'is_985',
-        '是否211': 'is_211'
-    }
-
-    df_2025 = df_2025.rename(columns=column_mapping)
-
-    # 清洗数据
-    df_2025['year'] = df_2025['year'].astype(int)
-    df_2025['university_name'] = df_2025['university_name'].fillna('').astype(str)
-    df_2025['university_code'] = df_2025['university_code'].fillna('').astype(str)
-    df_2025['category'] = df_2025['category'].fillna('').astype(str)
-    df_2025['batch'] = df_2025['batch'].fillna('').astype(str)
-    df_2025['subject_requirement'] = df_2025['subject_requirement'].fillna('').astype(str)
-    df_2025['major'] = df_2025['major'].fillna('').astype(str)
-    df_2025['major_code'] = df_2025['major_code'].fillna('').astype(str)
-    df_2025['school_location'] = df_2025['school_location'].fillna('').astype(str)
-    df_2025['school_nature'] = df_2025['school_nature'].fillna('').astype(str)
-
-    def clean_boolean(value):
-        if pd.isna(value):
-            return False
-        if isinstance(value, str):
-            return value.strip() == '是'
-        return bool(value)
-
-    df_2025['is_985'] = df_2025['is_985'].apply(clean_boolean)
-    df_2025['is_211'] = df_2025['is_211'].apply(clean_boolean)
-
-    # 处理可为空的字段
-    for col in ['major_group', 'major_note', 'admission_count', 'min_score', 'min_rank']:
-        if col in df_2025.columns:
-            if col in ['admission_count', 'min_rank']:
-                # 转换为字符串
-                df_2025[col] = df_2025[col].apply(lambda x: str(int(x)) if pd.notna(x) and isinstance(x, (int, float)) and np.isfinite(x) else None)
-            else:
-                df_2025[col] = df_2025[col].apply(lambda x: int(x) if pd.notna(x) and isinstance(x, (int, float)) and np.isfinite(x) else None)
+    df_2025 = clean_admission_data(df_2025)
 
     print(f"✅ 数据清洗完成，有效数据 {len(df_2025)} 行\n")
 
     # 连接数据库
     print("步骤3: 连接数据库并恢复数据...")
-    conn = psycopg2.connect(**DB_CONFIG)
+    conn = connect()
     cursor = conn.cursor()
 
     try:
-        # 先删除2025年的所有数据
-        print("  删除2025年的旧数据...")
-        cursor.execute("DELETE FROM admission_data WHERE year = 2025")
-        deleted_count = cursor.rowcount
-        print(f"  ✅ 删除了 {deleted_count} 条记录\n")
-
-        # 插入2025年数据
-        print("  重新插入2025年数据...")
-
-        insert_sql = """
-            INSERT INTO admission_data (
-                year, university_name, university_code, category, batch,
-                subject_requirement, major, major_code, major_group, major_note,
-                admission_count, min_score, min_rank, school_location,
-                school_nature, is_985, is_211
-            ) VALUES (
-                %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-            )
-        """
-
-        data_to_insert = []
-        for _, row in df_2025.iterrows():
-            data_to_insert.append((
-                row['year'],
-                row['university_name'],
-                row['university_code'],
-                row['category'],
-                row['batch'],
-                row['subject_requirement'],
-                row['major'],
-                row['major_code'],
-                row['major_group'],
-                row['major_note'],
-                row['admission_count'],
-                row['min_score'],
-                row['min_rank'],
-                row['school_location'],
-                row['school_nature'],
-                row['is_985'],
-                row['is_211']
-            ))
-
-        execute_batch(cursor, insert_sql, data_to_insert, page_size=1000)
+        ensure_row_hash_column(cursor)
+        ensure_discipline_map(cursor)
+        # 立即提交，不在后续的长时间写入中持有表结构锁
         conn.commit()
 
-        print(f"  ✅ 成功插入 {len(data_to_insert)} 条记录")
+        if shadow:
+            print("  在影子表中重建并交换...")
+            new_rows, old_rows = shadow_reload(conn, df_2025, replace_years=[2025])
+            print(f"  ✅ 交换完成：{old_rows} 行 → {new_rows} 行（旧表保留为 {OLD_TABLE}）")
+        elif incremental:
+            print("  增量同步2025年数据...")
+            summary = incremental_import(conn, df_2025)
+            analyze(cursor)
+            conn.commit()
+            print_incremental_summary(summary)
+        else:
+            # 先删除2025年的所有数据（分区表直接清空2025年分区）
+            print("  删除2025年的旧数据...")
+            cursor.execute("SELECT COUNT(*) FROM admission_data WHERE year = 2025")
+            deleted_count = cursor.fetchone()[0]
+            ensure_year_partitions(cursor, [2025])
+            truncate_year(cursor, 2025)
+            print(f"  ✅ 删除了 {deleted_count} 条记录\n")
+
+            # 插入2025年数据
+            print("  重新插入2025年数据...")
+
+            df_2025 = apply_discipline_map(cursor, df_2025)
+            inserted_count = copy_dataframe(cursor, add_row_hashes(df_2025), columns=HASHED_COLUMNS)
+            analyze(cursor)
+            bump_dataset_version(cursor, 'restore_2025_data')
+            conn.commit()
+
+            print(f"  ✅ 成功插入 {inserted_count} 条记录")
 
         # 验证恢复结果
         cursor.execute("SELECT COUNT(*) FROM admission_data WHERE year = 2025")
@@ -176,4 +110,11 @@ def restore_2025_data():
 
 
 if __name__ == '__main__':
-    restore_2025_data()
+    parser = argparse.ArgumentParser(description='从Excel恢复2025年数据')
+    parser.add_argument('--incremental', action='store_true',
+                        help='增量同步：只写入与库中内容不同的行')
+    parser.add_argument('--shadow', action='store_true',
+                        help='影子表重建后原子交换，恢复期间查询不受影响')
+    args = parser.parse_args()
+    restore_2025_data(incremental=args.incremental, shadow=args.shadow)
+    refresh_stale_tables()
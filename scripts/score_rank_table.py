@@ -0,0 +1,149 @@
+"""
+一分一段表（score_rank_table）
+按年份和科类，从录取数据中各专业的 (最低分, 最低位次) 估计每个分数对应的位次：
+同一分数取位次的中位数，再用保序回归保证"分数越高位次越靠前"，
+相邻观测分数之间按位次线性插值，得到每个整数分数一行的紧凑对照表。
+后端 /api/score-rank-mapping 在该表上按主键做范围查找，不再扫描当年全部录取数据。
+
+用法: python score_rank_table.py                 重建对照表
+      python score_rank_table.py --show 2025     查看某一年的对照表（全部科类）
+"""
+import argparse
+import sys
+
+from bulk_loader import copy_rows
+
+SCORE_RANK_TABLE = 'score_rank_table'
+
+# 不分科类的汇总行使用的科类名
+ALL_CATEGORIES = '全部'
+
+CREATE_SCORE_RANK_SQL = f"""
+CREATE TABLE IF NOT EXISTS {SCORE_RANK_TABLE} (
+    year INTEGER NOT NULL,
+    category VARCHAR(50) NOT NULL,
+    score INTEGER NOT NULL,
+    rank INTEGER NOT NULL,
+    observed BOOLEAN NOT NULL,
+    PRIMARY KEY (year, category, score)
+);
+CREATE INDEX IF NOT EXISTS idx_score_rank_rank ON {SCORE_RANK_TABLE} (year, category, rank);
+"""
+
+SCORE_RANK_COLUMNS = ['year', 'category', 'score', 'rank', 'observed']
+
+# 每个 (年份, 科类, 分数) 的位次中位数和样本数；GROUPING SETS 同时算出不分科类的汇总
+OBSERVED_POINTS_SQL = f"""
+    SELECT year,
+           CASE WHEN GROUPING(category) = 1 THEN '{ALL_CATEGORIES}' ELSE category END AS category,
+           min_score,
+           percentile_cont(0.5) WITHIN GROUP (ORDER BY min_rank) AS rank,
+           COUNT(*) AS samples,
+           GROUPING(category) AS is_total
+    FROM admission_data
+    WHERE min_score > 0 AND min_rank > 0
+    GROUP BY GROUPING SETS ((year, category, min_score), (year, min_score))
+    ORDER BY year, is_total, category, min_score DESC
+"""
+
+
+def monotone_ranks(points):
+    """保序回归（PAVA）：points 为按分数从高到低排列的 [(分数, 位次, 样本数)]，
+    返回 [(分数, 位次)]，位次随分数降低单调不减
+    """
+    # 每个块：[位次加权和, 权重, 块内分数列表]
+    blocks = []
+    for score, rank, weight in points:
+        blocks.append([rank * weight, weight, [score]])
+        while len(blocks) > 1 and blocks[-2][0] / blocks[-2][1] > blocks[-1][0] / blocks[-1][1]:
+            total, w, scores = blocks.pop()
+            blocks[-1][0] += total
+            blocks[-1][1] += w
+            blocks[-1][2].extend(scores)
+    return [(score, total / w) for total, w, scores in blocks for score in scores]
+
+
+def interpolate_ranks(fitted):
+    """在相邻观测分数之间按位次线性插值，返回 [(分数, 位次, 是否观测值)]，每个整数分数一行"""
+    rows = []
+    for (high, high_rank), (low, low_rank) in zip(fitted, fitted[1:]):
+        rows.append((high, round(high_rank), True))
+        for score in range(high - 1, low, -1):
+            ratio = (high - score) / (high - low)
+            rows.append((score, round(high_rank + (low_rank - high_rank) * ratio), False))
+    if fitted:
+        score, rank = fitted[-1]
+        rows.append((score, round(rank), True))
+    return rows
+
+
+def build_score_rank_rows(observed):
+    """observed 为按 (年份, 科类) 分组、组内分数从高到低排列的观测点，生成对照表的行"""
+    group = None
+    points = []
+    for year, category, score, rank, samples, _ in observed:
+        if category is None:
+            # 科类为空的行只计入不分科类的汇总
+            continue
+        if (year, category) != group:
+            if points:
+                yield from _group_rows(group, points)
+            group, points = (year, category), []
+        points.append((int(score), float(rank), int(samples)))
+    if points:
+        yield from _group_rows(group, points)
+
+
+def _group_rows(group, points):
+    year, category = group
+    for score, rank, observed in interpolate_ranks(monotone_ranks(points)):
+        yield (year, category, score, rank, observed)
+
+
+def refresh_score_rank_table(cursor):
+    """重建一分一段表（在调用方的事务中），返回写入行数"""
+    cursor.execute(CREATE_SCORE_RANK_SQL)
+    cursor.execute(OBSERVED_POINTS_SQL)
+    rows = list(build_score_rank_rows(cursor.fetchall()))
+    cursor.execute(f"DELETE FROM {SCORE_RANK_TABLE}")
+    copy_rows(cursor, rows, table=SCORE_RANK_TABLE, columns=SCORE_RANK_COLUMNS)
+    cursor.execute(f"ANALYZE {SCORE_RANK_TABLE}")
+    return len(rows)
+
+
+if __name__ == '__main__':
+    if sys.platform == 'win32':
+        import io
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+        sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+    from db import connect
+    from derived_tables import refresh_derived_tables
+
+    parser = argparse.ArgumentParser(description='一分一段表（分数<->位次）')
+    parser.add_argument('--show', type=int, metavar='YEAR', help='查看某一年的对照表')
+    args = parser.parse_args()
+
+    failed = {}
+    conn = connect()
+    if args.show:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT score, rank, observed
+            FROM {SCORE_RANK_TABLE}
+            WHERE year = %s AND category = %s
+            ORDER BY score DESC
+        """, (args.show, ALL_CATEGORIES))
+        rows = cursor.fetchall()
+        if not rows:
+            print(f"❌ 没有{args.show}年的对照表")
+            sys.exit(1)
+        print(f"【{args.show}年一分一段（{ALL_CATEGORIES}，* 为插值）】")
+        for score, rank, observed in rows:
+            print(f"  {score:>4}分  {rank:>8,}{'' if observed else ' *'}")
+        cursor.close()
+    else:
+        _, failed = refresh_derived_tables(conn, names=[SCORE_RANK_TABLE], force=True)
+    conn.close()
+    if failed:
+        sys.exit(1)
@@ -0,0 +1,401 @@
+"""
+影子表重载：不停服替换 admission_data
+在 admission_data_new 中完成写入、建索引和ANALYZE，校验行数后在一个短事务中改名交换；
+旧表保留为 admission_data_old，可随时回滚。
+admission_data 是按年份分区的表时，改为逐年份建新分区表，在一个短事务中替换分区，
+旧分区保留为 admission_data_y<年份>_old，本次重载新增的年份分区加注释标记，回滚时一并卸下。
+
+用法: python shadow_reload.py --rollback    回滚到上一次交换前的数据
+      python shadow_reload.py --drop-old    确认无误后删除旧表
+"""
+import argparse
+import sys
+import time
+
+import psycopg2
+
+from bulk_loader import copy_dataframe
+from dataset_version import bump_dataset_version
+from derived_tables import refresh_stale_tables
+from db import connect
+from incremental_import import HASHED_COLUMNS, add_row_hashes
+from index_manager import analyze, create_indexes, index_names
+from major_discipline_map import apply_discipline_map
+from partitioning import (
+    PARENT_TABLE, build_year_table_indexes, create_year_table, drop_year_partitions,
+    is_partitioned, list_partitions, partition_name, rename_year_table, swap_year_partitions
+)
+
+LIVE_TABLE = 'admission_data'
+SHADOW_TABLE = 'admission_data_new'
+OLD_TABLE = 'admission_data_old'
+
+# 交换时等待表锁的上限，超时后重试，避免排在长查询后面阻塞所有读请求
+SWAP_LOCK_TIMEOUT = '3s'
+SWAP_RETRIES = 5
+
+# 新表行数低于当前表的该比例时拒绝交换（防止源文件被截断）
+MIN_ROW_RATIO = 0.5
+
+# 分区表重载时新增的年份分区上的注释，回滚时据此卸下这些分区
+ADDED_PARTITION_COMMENT = 'shadow_reload: added'
+
+
+def _table_exists(cursor, table):
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (table,))
+    return cursor.fetchone()[0]
+
+
+def _table_indexes(cursor, table):
+    """表上的索引：[(索引名, 定义, 所属约束名或None)]"""
+    cursor.execute("""
+        SELECT i.relname, pg_get_indexdef(i.oid), c.conname
+        FROM pg_index x
+        JOIN pg_class i ON i.oid = x.indexrelid
+        LEFT JOIN pg_constraint c ON c.conindid = x.indexrelid AND c.conrelid = x.indrelid
+        WHERE x.indrelid = %s::regclass
+        ORDER BY i.relname
+    """, (table,))
+    return cursor.fetchall()
+
+
+def _rename_indexes(cursor, table, rename):
+    """按 rename(旧名) -> 新名 重命名表上的索引和约束"""
+    for index_name, _, constraint_name in _table_indexes(cursor, table):
+        if constraint_name:
+            new_name = rename(constraint_name)
+            if new_name != constraint_name:
+                cursor.execute(f"ALTER TABLE {table} RENAME CONSTRAINT {constraint_name} TO {new_name}")
+        else:
+            new_name = rename(index_name)
+            if new_name != index_name:
+                cursor.execute(f"ALTER INDEX {index_name} RENAME TO {new_name}")
+
+
+def _strip_suffix(suffix):
+    return lambda name: name[:-len(suffix)] if name.endswith(suffix) else name
+
+
+def _add_suffix(suffix):
+    return lambda name: name + suffix
+
+
+def create_shadow_table(cursor, replace_years=None):
+    """创建空的影子表；replace_years 不为空时，先把其余年份的数据原样复制过去"""
+    cursor.execute(f"DROP TABLE IF EXISTS {SHADOW_TABLE}")
+    # 不复制索引，写完数据后再建
+    cursor.execute(f"""
+        CREATE TABLE {SHADOW_TABLE}
+        (LIKE {LIVE_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+    """)
+    kept = 0
+    if replace_years:
+        cursor.execute(f"""
+            INSERT INTO {SHADOW_TABLE}
+            SELECT * FROM {LIVE_TABLE} WHERE NOT (year = ANY(%s))
+        """, (list(replace_years),))
+        kept = cursor.rowcount
+    return kept
+
+
+def build_shadow_indexes(cursor):
+    """在影子表上建索引（名称加 _new 后缀），然后ANALYZE
+
+    先建 index_manager 中声明的索引，再补上当前表上其他手工添加的索引和约束。
+    """
+    create_indexes(cursor, SHADOW_TABLE, suffix='_new')
+    declared = set(index_names())
+    for index_name, definition, constraint_name in _table_indexes(cursor, LIVE_TABLE):
+        if index_name in declared:
+            continue
+        if constraint_name:
+            cursor.execute(f"""
+                SELECT pg_get_constraintdef(oid) FROM pg_constraint
+                WHERE conrelid = %s::regclass AND conname = %s
+            """, (LIVE_TABLE, constraint_name))
+            constraint_def = cursor.fetchone()[0]
+            cursor.execute(
+                f"ALTER TABLE {SHADOW_TABLE} ADD CONSTRAINT {constraint_name}_new {constraint_def}"
+            )
+        else:
+            definition = definition.replace(
+                f"INDEX {index_name} ON", f"INDEX {index_name}_new ON", 1
+            ).replace(f" ON public.{LIVE_TABLE} ", f" ON public.{SHADOW_TABLE} ", 1)
+            cursor.execute(definition)
+    cursor.execute(f"ANALYZE {SHADOW_TABLE}")
+
+
+def validate_shadow(cursor, expected_rows, min_row_ratio=MIN_ROW_RATIO):
+    """校验影子表行数：与写入行数一致，且不少于当前表的 min_row_ratio"""
+    cursor.execute(f"SELECT COUNT(*) FROM {SHADOW_TABLE}")
+    shadow_rows = cursor.fetchone()[0]
+    if shadow_rows != expected_rows:
+        raise RuntimeError(f"影子表行数 {shadow_rows} 与预期 {expected_rows} 不一致")
+
+    cursor.execute(f"SELECT COUNT(*) FROM {LIVE_TABLE}")
+    live_rows = cursor.fetchone()[0]
+    if live_rows and shadow_rows < live_rows * min_row_ratio:
+        raise RuntimeError(
+            f"影子表只有 {shadow_rows} 行，不足当前表 {live_rows} 行的 {min_row_ratio:.0%}"
+        )
+    return shadow_rows, live_rows
+
+
+def _swap_once(conn):
+    cursor = conn.cursor()
+    cursor.execute(f"SET LOCAL lock_timeout = '{SWAP_LOCK_TIMEOUT}'")
+    cursor.execute(f"LOCK TABLE {LIVE_TABLE} IN ACCESS EXCLUSIVE MODE")
+
+    cursor.execute(f"DROP TABLE IF EXISTS {OLD_TABLE}")
+    cursor.execute(f"ALTER TABLE {LIVE_TABLE} RENAME TO {OLD_TABLE}")
+    _rename_indexes(cursor, OLD_TABLE, _add_suffix('_old'))
+    cursor.execute(f"ALTER TABLE {SHADOW_TABLE} RENAME TO {LIVE_TABLE}")
+    _rename_indexes(cursor, LIVE_TABLE, _strip_suffix('_new'))
+
+    # 自增序列归属新表，之后删除旧表时不会连带删除序列
+    cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", (OLD_TABLE,))
+    sequence = cursor.fetchone()[0]
+    if sequence:
+        cursor.execute(f"ALTER SEQUENCE {sequence} OWNED BY {LIVE_TABLE}.id")
+        cursor.execute(
+            f"SELECT setval(%s, GREATEST((SELECT MAX(id) FROM {LIVE_TABLE}), 1))", (sequence,)
+        )
+    bump_dataset_version(cursor, 'shadow_reload')
+    conn.commit()
+    cursor.close()
+
+
+def swap_shadow(conn, retries=SWAP_RETRIES):
+    """把影子表换为正式表，旧表改名为 admission_data_old"""
+    for attempt in range(1, retries + 1):
+        try:
+            _swap_once(conn)
+            return
+        except psycopg2.errors.LockNotAvailable:
+            conn.rollback()
+            if attempt == retries:
+                raise
+            print(f"  ⚠️ 等待表锁超时，{attempt}/{retries} 次重试...")
+            time.sleep(attempt)
+
+
+def _old_partition_tables(cursor):
+    """保留的旧分区表：{年份: 表名}"""
+    cursor.execute("""
+        SELECT relname FROM pg_class
+        WHERE relkind = 'r' AND relname ~ %s
+    """, (f'^{PARENT_TABLE}_y[0-9]+_old$',))
+    prefix = f'{PARENT_TABLE}_y'
+    return {int(name[len(prefix):-len('_old')]): name for (name,) in cursor.fetchall()}
+
+
+def _added_partitions(cursor):
+    """上一次重载新增的年份分区：{年份: 表名}"""
+    partitions = dict(list_partitions(cursor))
+    cursor.execute("""
+        SELECT relname FROM pg_class
+        WHERE relname = ANY(%s) AND obj_description(oid, 'pg_class') = %s
+    """, (list(partitions.values()), ADDED_PARTITION_COMMENT))
+    added = {name for (name,) in cursor.fetchall()}
+    return {year: table for year, table in partitions.items() if table in added}
+
+
+def _clear_reload_backups(cursor):
+    """删除更早一次重载保留的旧分区并清除新增标记，回滚只撤销最近一次重载"""
+    for table in _old_partition_tables(cursor).values():
+        cursor.execute(f"DROP TABLE {table}")
+    for table in _added_partitions(cursor).values():
+        cursor.execute(f"COMMENT ON TABLE {table} IS NULL")
+
+
+def _rollback_partitions(conn, cursor):
+    old_tables = _old_partition_tables(cursor)
+    added = _added_partitions(cursor)
+    if not old_tables and not added:
+        raise RuntimeError("没有保留的旧分区，无法回滚")
+
+    # 旧分区挂回前先加上年份CHECK约束（与 create_year_table 一致），挂载时无需在表锁内扫描校验；
+    # 加约束要扫描旧表，放在交换之前的单独事务中，此时旧表对读请求不可见
+    for year, old in old_tables.items():
+        check = f'{partition_name(year)}_restore_year_check'
+        cursor.execute(f"ALTER TABLE {old} DROP CONSTRAINT IF EXISTS {check}")
+        cursor.execute(f"ALTER TABLE {old} ADD CONSTRAINT {check} CHECK (year = {int(year)})")
+    conn.commit()
+
+    cursor.execute(f"SET LOCAL lock_timeout = '{SWAP_LOCK_TIMEOUT}'")
+    # 当前分区换下后改名为 _new，旧分区挂回；重载新增的年份只换下，不再挂回
+    for year, old in old_tables.items():
+        current = partition_name(year)
+        rename_year_table(cursor, old, f'{current}_restore')
+    years = sorted(set(old_tables) | set(added))
+    drop_year_partitions(cursor, years, keep_old=True)
+    for year in years:
+        current = partition_name(year)
+        cursor.execute(f"DROP TABLE IF EXISTS {current}_new")
+        if _table_exists(cursor, f'{current}_old'):
+            rename_year_table(cursor, f'{current}_old', f'{current}_new')
+            cursor.execute(f"COMMENT ON TABLE {current}_new IS NULL")
+    swap_year_partitions(cursor, {year: f'{partition_name(year)}_restore' for year in old_tables})
+    bump_dataset_version(cursor, 'shadow_reload --rollback')
+    conn.commit()
+
+
+def rollback_swap(conn):
+    """回滚：把 admission_data_old 换回正式表，当前表改名为 admission_data_new"""
+    cursor = conn.cursor()
+    if is_partitioned(cursor):
+        _rollback_partitions(conn, cursor)
+        cursor.close()
+        return
+    if not _table_exists(cursor, OLD_TABLE):
+        raise RuntimeError(f"{OLD_TABLE} 不存在，无法回滚")
+    cursor.execute(f"SET LOCAL lock_timeout = '{SWAP_LOCK_TIMEOUT}'")
+    cursor.execute(f"DROP TABLE IF EXISTS {SHADOW_TABLE}")
+    cursor.execute(f"ALTER TABLE {LIVE_TABLE} RENAME TO {SHADOW_TABLE}")
+    _rename_indexes(cursor, SHADOW_TABLE, _add_suffix('_new'))
+    cursor.execute(f"ALTER TABLE {OLD_TABLE} RENAME TO {LIVE_TABLE}")
+    _rename_indexes(cursor, LIVE_TABLE, _strip_suffix('_old'))
+    cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", (SHADOW_TABLE,))
+    sequence = cursor.fetchone()[0]
+    if sequence:
+        cursor.execute(f"ALTER SEQUENCE {sequence} OWNED BY {LIVE_TABLE}.id")
+    bump_dataset_version(cursor, 'shadow_reload --rollback')
+    conn.commit()
+    cursor.close()
+
+
+def drop_old_table(conn):
+    cursor = conn.cursor()
+    cursor.execute(f"DROP TABLE IF EXISTS {OLD_TABLE}")
+    if is_partitioned(cursor):
+        _clear_reload_backups(cursor)
+    conn.commit()
+    cursor.close()
+
+
+def _shadow_reload_partitioned(conn, df, replace_years=None):
+    """分区表的影子重载：每个年份建一张新表并建好索引，在一个短事务中替换分区"""
+    cursor = conn.cursor()
+    df = add_row_hashes(df)
+    years = sorted(int(y) for y in df['year'].unique())
+    tables = {year: f'{partition_name(year)}_new' for year in years}
+    try:
+        loaded = 0
+        for year, table in tables.items():
+            create_year_table(cursor, table, year)
+            rows = copy_dataframe(cursor, df[df['year'] == year], table=table,
+                                  columns=HASHED_COLUMNS)
+            build_year_table_indexes(cursor, table)
+            cursor.execute(f"SELECT COUNT(*) FROM {table}")
+            if cursor.fetchone()[0] != rows:
+                raise RuntimeError(f"{table} 行数与写入行数 {rows} 不一致")
+            loaded += rows
+
+        cursor.execute(f"SELECT COUNT(*) FROM {PARENT_TABLE}")
+        live_rows = cursor.fetchone()[0]
+        existing_years = {y for y, _ in list_partitions(cursor)}
+        dropped_years = []
+        if replace_years is None:
+            # 整表重载：源数据中已不存在的年份一并换下
+            dropped_years = [y for y in sorted(existing_years) if y not in tables]
+            new_rows = loaded
+        else:
+            cursor.execute(f"SELECT COUNT(*) FROM {PARENT_TABLE} WHERE NOT (year = ANY(%s))",
+                           (years,))
+            new_rows = loaded + cursor.fetchone()[0]
+        if live_rows and new_rows < live_rows * MIN_ROW_RATIO:
+            raise RuntimeError(
+                f"重载后只有 {new_rows} 行，不足当前表 {live_rows} 行的 {MIN_ROW_RATIO:.0%}"
+            )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        for table in tables.values():
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.commit()
+        cursor.close()
+        raise
+
+    for attempt in range(1, SWAP_RETRIES + 1):
+        try:
+            cursor.execute(f"SET LOCAL lock_timeout = '{SWAP_LOCK_TIMEOUT}'")
+            _clear_reload_backups(cursor)
+            swap_year_partitions(cursor, tables, keep_old=True)
+            drop_year_partitions(cursor, dropped_years, keep_old=True)
+            for year in sorted(set(tables) - existing_years):
+                cursor.execute(f"COMMENT ON TABLE {partition_name(year)} IS %s",
+                               (ADDED_PARTITION_COMMENT,))
+            bump_dataset_version(cursor, 'shadow_reload')
+            conn.commit()
+            break
+        except psycopg2.errors.LockNotAvailable:
+            conn.rollback()
+            if attempt == SWAP_RETRIES:
+                raise
+            print(f"  ⚠️ 等待表锁超时，{attempt}/{SWAP_RETRIES} 次重试...")
+            time.sleep(attempt)
+    # 新分区各自ANALYZE过，父表的统计信息需单独收集
+    analyze(cursor)
+    conn.commit()
+    cursor.close()
+    return new_rows, live_rows
+
+
+def shadow_reload(conn, df, replace_years=None):
+    """用清洗后的数据在影子表中重建 admission_data 并原子交换
+
+    replace_years 为空时整表替换为 df；否则只替换这些年份，其余年份从当前表复制。
+    返回 (新表行数, 交换前行数)。
+    """
+    cursor = conn.cursor()
+    df = apply_discipline_map(cursor, df)
+    if is_partitioned(cursor):
+        cursor.close()
+        return _shadow_reload_partitioned(conn, df, replace_years)
+    try:
+        kept = create_shadow_table(cursor, replace_years)
+        loaded = copy_dataframe(cursor, add_row_hashes(df), table=SHADOW_TABLE,
+                                columns=HASHED_COLUMNS)
+        build_shadow_indexes(cursor)
+        counts = validate_shadow(cursor, kept + loaded)
+        # 影子表对读请求不可见，先提交构建结果，交换单独一个短事务
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        cursor.execute(f"DROP TABLE IF EXISTS {SHADOW_TABLE}")
+        conn.commit()
+        raise
+    finally:
+        cursor.close()
+
+    swap_shadow(conn)
+    return counts
+
+
+if __name__ == '__main__':
+    if sys.platform == 'win32':
+        import io
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+        sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+    parser = argparse.ArgumentParser(description='影子表重载的回滚与清理')
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--rollback', action='store_true', help='换回上一次重载前的表')
+    group.add_argument('--drop-old', action='store_true', help='删除保留的旧表')
+    args = parser.parse_args()
+
+    conn = connect()
+    try:
+        if args.rollback:
+            rollback_swap(conn)
+            print(f"✅ 已回滚，{LIVE_TABLE} 恢复为重载前的数据")
+            refresh_stale_tables()
+        else:
+            drop_old_table(conn)
+            print(f"✅ 已删除 {OLD_TABLE}")
+    except Exception as e:
+        print(f"❌ 操作失败: {e}")
+        conn.rollback()
+        sys.exit(1)
+    finally:
+        conn.close()
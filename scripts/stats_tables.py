@@ -0,0 +1,141 @@
+"""
+统计汇总表（stats_summary_*）
+把 /api/stats 的四项统计按 年份 × 院校所在地 × 学科门类 的全部组合（CUBE）预先聚合：
+    stats_summary_totals   每个组合的记录数、最低分合计与个数（地区统计、年份趋势）
+    stats_summary_scores   每个组合下各最低分的记录数（分数分布）
+    stats_summary_majors   每个组合下记录数最多的专业（专业统计）
+不筛选某一维度时该列取汇总值（年份为0，地区/门类为"全部"），后端按主键读取对应组合即可。
+按专业名称模糊筛选无法预先聚合，后端仍使用实时查询。
+
+用法: python stats_tables.py    查看汇总表的行数
+"""
+import sys
+
+STATS_TABLES = 'stats_summary'
+TOTALS_TABLE = 'stats_summary_totals'
+SCORES_TABLE = 'stats_summary_scores'
+MAJORS_TABLE = 'stats_summary_majors'
+
+# 汇总行使用的年份和地区/门类
+ALL_YEARS = 0
+ALL_VALUES = '全部'
+
+# 每个组合保留的专业数（与 getStats 的 take 一致）
+TOP_MAJORS = 20
+
+CREATE_STATS_SQL = f"""
+CREATE TABLE IF NOT EXISTS {TOTALS_TABLE} (
+    year INTEGER NOT NULL,
+    school_location VARCHAR(100) NOT NULL,
+    subject_category VARCHAR(50) NOT NULL,
+    row_count INTEGER NOT NULL,
+    score_count INTEGER NOT NULL,
+    score_sum BIGINT NOT NULL,
+    PRIMARY KEY (year, school_location, subject_category)
+);
+CREATE TABLE IF NOT EXISTS {SCORES_TABLE} (
+    year INTEGER NOT NULL,
+    school_location VARCHAR(100) NOT NULL,
+    subject_category VARCHAR(50) NOT NULL,
+    min_score INTEGER NOT NULL,
+    row_count INTEGER NOT NULL,
+    PRIMARY KEY (year, school_location, subject_category, min_score)
+);
+CREATE TABLE IF NOT EXISTS {MAJORS_TABLE} (
+    year INTEGER NOT NULL,
+    school_location VARCHAR(100) NOT NULL,
+    subject_category VARCHAR(50) NOT NULL,
+    position INTEGER NOT NULL,
+    major VARCHAR(200) NOT NULL,
+    row_count INTEGER NOT NULL,
+    PRIMARY KEY (year, school_location, subject_category, position)
+);
+"""
+
+# CUBE 的汇总行换成汇总值；数据中本身为空的地区/门类不能作为筛选条件，只计入汇总
+CUBE_KEYS = f"""
+    CASE WHEN GROUPING(year) = 1 THEN {ALL_YEARS} ELSE year END,
+    CASE WHEN GROUPING(school_location) = 1 THEN '{ALL_VALUES}' ELSE school_location END,
+    CASE WHEN GROUPING(subject_category) = 1 THEN '{ALL_VALUES}' ELSE subject_category END
+"""
+
+CUBE_HAVING = """
+    HAVING (GROUPING(school_location) = 1 OR school_location IS NOT NULL)
+       AND (GROUPING(subject_category) = 1 OR subject_category IS NOT NULL)
+"""
+
+INSERT_TOTALS_SQL = f"""
+    INSERT INTO {TOTALS_TABLE}
+        (year, school_location, subject_category, row_count, score_count, score_sum)
+    SELECT {CUBE_KEYS}, COUNT(*), COUNT(min_score), COALESCE(SUM(min_score), 0)
+    FROM admission_data
+    GROUP BY CUBE (year, school_location, subject_category)
+    {CUBE_HAVING}
+"""
+
+INSERT_SCORES_SQL = f"""
+    INSERT INTO {SCORES_TABLE}
+        (year, school_location, subject_category, min_score, row_count)
+    SELECT {CUBE_KEYS}, min_score, COUNT(*)
+    FROM admission_data
+    WHERE min_score IS NOT NULL
+    GROUP BY min_score, CUBE (year, school_location, subject_category)
+    {CUBE_HAVING}
+"""
+
+INSERT_MAJORS_SQL = f"""
+    INSERT INTO {MAJORS_TABLE}
+        (year, school_location, subject_category, position, major, row_count)
+    SELECT year, school_location, subject_category, position, major, row_count
+    FROM (
+        SELECT year, school_location, subject_category, major, row_count,
+               ROW_NUMBER() OVER (
+                   PARTITION BY year, school_location, subject_category
+                   ORDER BY row_count DESC, major
+               ) AS position
+        FROM (
+            SELECT {CUBE_KEYS}, major, COUNT(*) AS row_count
+            FROM admission_data
+            WHERE major IS NOT NULL
+            GROUP BY major, CUBE (year, school_location, subject_category)
+            {CUBE_HAVING}
+        ) AS counts (year, school_location, subject_category, major, row_count)
+    ) AS ranked
+    WHERE position <= {TOP_MAJORS}
+"""
+
+
+def refresh_stats_tables(cursor):
+    """重建三张统计汇总表（在调用方的事务中），返回写入行数"""
+    cursor.execute(CREATE_STATS_SQL)
+    total = 0
+    for table, insert_sql in ((TOTALS_TABLE, INSERT_TOTALS_SQL),
+                              (SCORES_TABLE, INSERT_SCORES_SQL),
+                              (MAJORS_TABLE, INSERT_MAJORS_SQL)):
+        cursor.execute(f"DELETE FROM {table}")
+        cursor.execute(insert_sql)
+        total += cursor.rowcount
+        cursor.execute(f"ANALYZE {table}")
+    return total
+
+
+if __name__ == '__main__':
+    if sys.platform == 'win32':
+        import io
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+        sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+    from db import connect
+
+    conn = connect()
+    cursor = conn.cursor()
+    print("【统计汇总表】")
+    for table in (TOTALS_TABLE, SCORES_TABLE, MAJORS_TABLE):
+        cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (table,))
+        if not cursor.fetchone()[0]:
+            print(f"  {table}: 未生成（运行 python derived_tables.py）")
+            continue
+        cursor.execute(f"SELECT COUNT(*) FROM {table}")
+        print(f"  {table}: {cursor.fetchone()[0]:,} 行")
+    cursor.close()
+    conn.close()
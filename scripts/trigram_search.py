@@ -0,0 +1,161 @@
+"""
+模糊搜索的三元组索引（pg_trgm）
+后端的 contains + mode: 'insensitive' 查询会生成 ILIKE '%关键词%'，普通B树索引无法使用，只能顺序扫描。
+本脚本启用 pg_trgm 扩展，按 index_manager.py 的声明在 major、university_name、major_note 上
+建三元组GIN索引，再用 EXPLAIN 检查各服务的模糊搜索是否走了这些索引。
+
+注意：
+- 启用扩展需要数据库所有者权限（pg_trgm 为可信扩展，PostgreSQL 13 起无需超级用户）
+- 数据库的 LC_CTYPE 为 C 时 pg_trgm 不把中文当作单词字符，中文关键词无法使用索引（检查时会提示）
+- 关键词至少3个字才能提取出三元组，1~2个字的关键词仍为顺序扫描
+
+用法: python trigram_search.py               启用扩展、建索引并检查执行计划
+      python trigram_search.py --check       只检查执行计划
+"""
+import argparse
+import json
+import sys
+
+from index_manager import (
+    ADMISSION_INDEXES, analyze, create_indexes, is_trigram_index, trigram_available,
+)
+
+# (说明, 列, 对应的后端查询)；与 Prisma 生成的条件一致（"列"::text ILIKE $1）
+SEARCH_QUERIES = [
+    ('专业名称', 'major', 'searchAdmission / getCompare / getStats'),
+    ('院校名称', 'university_name', 'searchAdmission / getCompare / searchUniversities'),
+    ('专业备注', 'major_note', '暂无后端查询'),
+]
+
+# 检查执行计划时使用的关键词
+DEFAULT_KEYWORDS = {
+    'major': '计算机科学',
+    'university_name': '浙江大学',
+    'major_note': '中外合作',
+}
+
+
+def enable_trigram(cursor):
+    cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+
+def trigram_index_names(cursor):
+    """声明的三元组索引及其在各分区上对应的索引名"""
+    names = set()
+    for name, columns in ADMISSION_INDEXES:
+        if not is_trigram_index(columns):
+            continue
+        names.add(name)
+        cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (name,))
+        if not cursor.fetchone()[0]:
+            continue
+        # 分区表的索引在每个分区上各有一个子索引
+        cursor.execute("""
+            WITH RECURSIVE children AS (
+                SELECT inhrelid FROM pg_inherits WHERE inhparent = %s::regclass
+                UNION ALL
+                SELECT i.inhrelid FROM pg_inherits i JOIN children c ON i.inhparent = c.inhrelid
+            )
+            SELECT c.relname FROM children JOIN pg_class c ON c.oid = children.inhrelid
+        """, (name,))
+        names.update(row[0] for row in cursor.fetchall())
+    return names
+
+
+def trigram_extracts_cjk(cursor):
+    """当前数据库的字符分类是否能从中文中提取三元组"""
+    cursor.execute("SELECT array_length(show_trgm('中文测试'), 1) IS NOT NULL")
+    return cursor.fetchone()[0]
+
+
+def plan_index_scans(plan):
+    """执行计划（JSON）中用到的索引名"""
+    used = set()
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        if 'Index Name' in node:
+            used.add(node['Index Name'])
+        stack.extend(node.get('Plans', []))
+    return used
+
+
+def check_plans(cursor, keywords=None):
+    """对每个模糊搜索条件 EXPLAIN 一次，返回 [(说明, 列, 是否使用三元组索引, 计划节点)]"""
+    keywords = {**DEFAULT_KEYWORDS, **(keywords or {})}
+    trigram_names = trigram_index_names(cursor)
+    results = []
+    for label, column, _ in SEARCH_QUERIES:
+        cursor.execute(f"""
+            EXPLAIN (FORMAT JSON)
+            SELECT COUNT(*) FROM admission_data WHERE {column}::text ILIKE %s
+        """, (f"%{keywords[column]}%",))
+        plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        root = plan[0]['Plan']
+        used = plan_index_scans(root) & trigram_names
+        results.append((label, column, bool(used), root['Node Type']))
+    return results
+
+
+def print_plan_check(cursor, keywords=None):
+    """打印执行计划检查结果，全部使用索引时返回 True"""
+    if not trigram_extracts_cjk(cursor):
+        print("⚠️  数据库的 LC_CTYPE 不能识别中文字符，中文关键词无法使用三元组索引")
+    print("【模糊搜索执行计划】")
+    ok = True
+    for (label, column, used, node_type), (_, _, services) in zip(check_plans(cursor, keywords),
+                                                                   SEARCH_QUERIES):
+        mark = '✅' if used else '❌'
+        print(f"  {mark} {label}（{column}）: {'三元组索引' if used else node_type}  ← {services}")
+        ok = ok and used
+    return ok
+
+
+if __name__ == '__main__':
+    if sys.platform == 'win32':
+        import io
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+        sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+    from db import connect
+
+    parser = argparse.ArgumentParser(description='模糊搜索的三元组索引')
+    parser.add_argument('--check', action='store_true', help='只检查执行计划，不建索引')
+    parser.add_argument('--major', help=f"检查用的专业关键词（默认 {DEFAULT_KEYWORDS['major']}）")
+    parser.add_argument('--university', help=f"检查用的院校关键词（默认 {DEFAULT_KEYWORDS['university_name']}）")
+    args = parser.parse_args()
+
+    keywords = {}
+    if args.major:
+        keywords['major'] = args.major
+    if args.university:
+        keywords['university_name'] = args.university
+
+    conn = connect(statement_timeout=0)
+    cursor = conn.cursor()
+    try:
+        if not args.check:
+            print("正在启用 pg_trgm 并建立三元组索引...")
+            enable_trigram(cursor)
+            create_indexes(cursor)
+            analyze(cursor)
+            conn.commit()
+            print("✅ 索引已就绪")
+        else:
+            if not trigram_available(cursor):
+                print("❌ 数据库未启用 pg_trgm，先运行 python trigram_search.py")
+                sys.exit(1)
+        ok = print_plan_check(cursor, keywords)
+        conn.rollback()
+    except Exception as e:
+        print(f"❌ 操作失败: {e}")
+        conn.rollback()
+        sys.exit(1)
+    finally:
+        cursor.close()
+        conn.close()
+    if not ok:
+        print("\n⚠️  部分搜索未使用三元组索引（关键词过短、表太小或统计信息过期时，顺序扫描可能更快）")
+        sys.exit(1)
@@ -0,0 +1,328 @@
+"""
+高校详情汇总（university_summary）
+为每所高校预先生成 /api/admission/university/:name 返回的完整详情（JSONB）：
+基本信息、扩展信息（university_details）、年份列表、各年最低/平均/最高分、
+最近一年的专业（含专业排名 major_rankings）和录取数据，后端按主键读取一行即可。
+
+刷新时按高校计算相关数据（录取数据、扩展信息、专业排名）的指纹，只重新生成并写入指纹变化的高校，
+删除已不在录取数据中的高校。计算指纹需要聚合扫描整张 admission_data 和 major_rankings，
+因此无论改动多少，刷新耗时都与表大小成正比；省下的是生成和写入详情的开销。
+university_details、major_rankings 不记录数据版本，单独修改这两张表后运行本脚本同步。
+
+用法: python university_summary.py                  刷新（只重写有变化的高校）
+      python university_summary.py --rebuild        全部重建
+      python university_summary.py --show 浙江大学    查看某所高校的汇总
+"""
+import argparse
+import json
+import math
+import sys
+
+from bulk_loader import copy_rows
+
+UNIVERSITY_SUMMARY_TABLE = 'university_summary'
+
+CREATE_UNIVERSITY_SUMMARY_SQL = f"""
+CREATE TABLE IF NOT EXISTS {UNIVERSITY_SUMMARY_TABLE} (
+    university_name VARCHAR(200) PRIMARY KEY,
+    source_hash CHAR(32) NOT NULL,
+    document JSONB NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+STAGE_TABLE = 'university_summary_stage'
+
+# 每次读取多少所高校的录取数据来生成汇总
+BATCH_UNIVERSITIES = 200
+
+# 最近一年的录取数据最多保留的条数（与原接口一致）
+LATEST_ADMISSION_LIMIT = 100
+
+# 没有任何年份时使用的最近年份（与原接口一致）
+DEFAULT_LATEST_YEAR = 2025
+
+# 汇总用到的录取数据列，也参与指纹计算
+SUMMARY_COLUMNS = [
+    'year', 'university_code', 'school_location', 'school_nature', 'is_985', 'is_211',
+    'major', 'major_code', 'min_score', 'min_rank', 'category', 'batch',
+]
+
+EXTENDED_COLUMNS = [
+    ('postgraduate_rate', 'postgraduateRate'),
+    ('ranking', 'ranking'),
+    ('school_type', 'schoolType'),
+    ('affiliation', 'affiliation'),
+    ('founding_year', 'foundingYear'),
+    ('master_points', 'masterPoints'),
+    ('doctoral_points', 'doctoralPoints'),
+    ('national_special_majors', 'nationalSpecialMajors'),
+    ('website', 'website'),
+    ('description', 'description'),
+]
+
+
+def _table_exists(cursor, table):
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (table,))
+    return cursor.fetchone()[0]
+
+
+def source_fingerprints(cursor):
+    """每所高校相关数据的指纹 {高校名: md5}，一次聚合扫描"""
+    has_details = _table_exists(cursor, 'university_details')
+    has_rankings = _table_exists(cursor, 'major_rankings')
+    parts = ["a.content"]
+    joins = []
+    if has_details:
+        parts.append("COALESCE(d.content, '')")
+        joins.append("""
+            LEFT JOIN (
+                SELECT university_name, d::text AS content FROM university_details d
+            ) d USING (university_name)""")
+    if has_rankings:
+        parts.append("COALESCE(r.content, '')")
+        joins.append("""
+            LEFT JOIN (
+                SELECT university_name, string_agg(r::text, E'\\n' ORDER BY r.id) AS content
+                FROM major_rankings r
+                GROUP BY university_name
+            ) r USING (university_name)""")
+    cursor.execute(f"""
+        SELECT a.university_name, md5({' || '.join(parts)})
+        FROM (
+            SELECT university_name,
+                   string_agg(line, E'\\n' ORDER BY line) AS content
+            FROM (
+                SELECT university_name, ROW({', '.join(SUMMARY_COLUMNS)})::text AS line
+                FROM admission_data
+                WHERE university_name IS NOT NULL
+            ) lines
+            GROUP BY university_name
+        ) a
+        {''.join(joins)}
+    """)
+    return dict(cursor.fetchall())
+
+
+def _js_round(value):
+    """与 JavaScript 的 Math.round 一致（.5 向上取整）"""
+    return math.floor(value + 0.5)
+
+
+def _compact(item):
+    """去掉值为 None 的键（对应接口中的 undefined）"""
+    return {key: value for key, value in item.items() if value is not None}
+
+
+def build_document(name, rows, extended=None, rankings=None):
+    """由一所高校的录取数据行生成详情
+
+    rows 按 (年份降序, 专业, id) 排列，每行为 SUMMARY_COLUMNS 对应的值。
+    """
+    rows = [dict(zip(SUMMARY_COLUMNS, row)) for row in rows]
+    years = sorted({row['year'] for row in rows}, reverse=True)
+    latest_year = years[0] if years else DEFAULT_LATEST_YEAR
+    basic = next((row for row in rows if row['year'] == latest_year), rows[0])
+
+    # 每个 (专业, 年份) 取排在最前的一行
+    majors = {}
+    for row in rows:
+        majors.setdefault((row['major'], row['year']), row)
+    latest_majors = [row for (_, year), row in majors.items() if year == latest_year]
+
+    # 同名专业有多条排名时以排名数值最大的一条为准（与原接口逐条覆盖一致）
+    ranking_map = {}
+    for major_name, rating, rank, score in rankings or []:
+        ranking_map[major_name] = {'rating': rating, 'rank': rank, 'score': score}
+
+    trends = {}
+    for row in rows:
+        if row['min_score'] is not None:
+            trends.setdefault(row['year'], []).append(row['min_score'])
+
+    # 最低分降序（无分数的排在最前，与 PostgreSQL 降序一致），同分按专业名称
+    latest_rows = [row for row in rows if row['year'] == latest_year]
+    latest_rows.sort(key=lambda row: (row['min_score'] is not None, -(row['min_score'] or 0)))
+
+    document = {
+        'basicInfo': {
+            'name': name,
+            'code': basic['university_code'] or '-',
+            'location': basic['school_location'],
+            'nature': basic['school_nature'],
+            'is985': basic['is_985'],
+            'is211': basic['is_211'],
+        },
+        'stats': {
+            'majorCount': len(latest_majors),
+            'admissionDataCount': len(majors),
+            'years': years,
+        },
+        'majors': [
+            _compact({
+                'name': row['major'],
+                'code': row['major_code'] or '-',
+                'minScore': row['min_score'],
+                'minRank': row['min_rank'],
+                'category': row['category'],
+                'batch': row['batch'],
+                'ranking': ranking_map.get(row['major']),
+            })
+            for row in latest_majors
+        ],
+        'scoreTrends': [
+            {
+                'year': year,
+                'avgScore': _js_round(sum(scores) / len(scores)),
+                'minScore': min(scores),
+                'maxScore': max(scores),
+            }
+            for year, scores in sorted(trends.items(), reverse=True)
+        ],
+        'admissionData': [
+            _compact({
+                'year': row['year'],
+                'major': row['major'],
+                'minScore': row['min_score'],
+                'minRank': row['min_rank'],
+                'category': row['category'],
+                'batch': row['batch'],
+            })
+            for row in latest_rows[:LATEST_ADMISSION_LIMIT]
+        ],
+    }
+    if extended:
+        document['extendedInfo'] = {
+            key: extended[column] for column, key in EXTENDED_COLUMNS
+        }
+    return document
+
+
+def _build_documents(cursor, names, has_details, has_rankings):
+    cursor.execute(f"""
+        SELECT university_name, {', '.join(SUMMARY_COLUMNS)}
+        FROM admission_data
+        WHERE university_name IS NOT NULL AND university_name = ANY(%s)
+        ORDER BY university_name, year DESC, major, id
+    """, (names,))
+    rows_by_name = {}
+    for name, *row in cursor.fetchall():
+        rows_by_name.setdefault(name, []).append(row)
+
+    extended_by_name = {}
+    if has_details:
+        cursor.execute(f"""
+            SELECT DISTINCT ON (university_name)
+                   university_name, {', '.join(column for column, _ in EXTENDED_COLUMNS)}
+            FROM university_details
+            WHERE university_name = ANY(%s)
+            ORDER BY university_name, id
+        """, (names,))
+        for name, *values in cursor.fetchall():
+            extended_by_name[name] = dict(zip((column for column, _ in EXTENDED_COLUMNS), values))
+
+    rankings_by_name = {}
+    if has_rankings:
+        cursor.execute("""
+            SELECT university_name, major_name, rating, ranking, score
+            FROM major_rankings
+            WHERE university_name = ANY(%s)
+            ORDER BY university_name, ranking
+        """, (names,))
+        for name, *ranking in cursor.fetchall():
+            rankings_by_name.setdefault(name, []).append(ranking)
+
+    for name in names:
+        if name in rows_by_name:
+            yield name, build_document(name, rows_by_name[name],
+                                       extended_by_name.get(name), rankings_by_name.get(name))
+
+
+def refresh_university_summary(cursor):
+    """刷新高校详情汇总（在调用方的事务中），返回重建的高校数
+
+    每次都全表计算指纹，只有指纹变化的高校会重新生成详情。
+    """
+    cursor.execute(CREATE_UNIVERSITY_SUMMARY_SQL)
+    fingerprints = source_fingerprints(cursor)
+    cursor.execute(f"SELECT university_name, source_hash FROM {UNIVERSITY_SUMMARY_TABLE}")
+    existing = dict(cursor.fetchall())
+
+    removed = [name for name in existing if name not in fingerprints]
+    if removed:
+        cursor.execute(f"DELETE FROM {UNIVERSITY_SUMMARY_TABLE} WHERE university_name = ANY(%s)",
+                       (removed,))
+    changed = sorted(name for name, digest in fingerprints.items() if existing.get(name) != digest)
+    if not changed:
+        return 0
+
+    has_details = _table_exists(cursor, 'university_details')
+    has_rankings = _table_exists(cursor, 'major_rankings')
+    cursor.execute(f"""
+        CREATE TEMP TABLE IF NOT EXISTS {STAGE_TABLE} (
+            university_name VARCHAR(200),
+            source_hash CHAR(32),
+            document JSONB
+        ) ON COMMIT DROP
+    """)
+    for start in range(0, len(changed), BATCH_UNIVERSITIES):
+        names = changed[start:start + BATCH_UNIVERSITIES]
+        documents = _build_documents(cursor, names, has_details, has_rankings)
+        copy_rows(cursor, (
+            (name, fingerprints[name], json.dumps(document, ensure_ascii=False, default=float))
+            for name, document in documents
+        ), table=STAGE_TABLE, columns=['university_name', 'source_hash', 'document'])
+
+    cursor.execute(f"""
+        INSERT INTO {UNIVERSITY_SUMMARY_TABLE} (university_name, source_hash, document, updated_at)
+        SELECT university_name, source_hash, document, CURRENT_TIMESTAMP
+        FROM {STAGE_TABLE}
+        ON CONFLICT (university_name) DO UPDATE
+        SET source_hash = EXCLUDED.source_hash,
+            document = EXCLUDED.document,
+            updated_at = EXCLUDED.updated_at
+    """)
+    cursor.execute(f"ANALYZE {UNIVERSITY_SUMMARY_TABLE}")
+    return len(changed)
+
+
+if __name__ == '__main__':
+    if sys.platform == 'win32':
+        import io
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+        sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+    from db import connect
+    from derived_tables import refresh_derived_tables
+
+    parser = argparse.ArgumentParser(description='高校详情汇总')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--rebuild', action='store_true', help='全部重建')
+    group.add_argument('--show', metavar='NAME', help='查看某所高校的汇总')
+    args = parser.parse_args()
+
+    failed = {}
+    conn = connect()
+    if args.show:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT document FROM {UNIVERSITY_SUMMARY_TABLE} WHERE university_name = %s",
+                       (args.show,))
+        row = cursor.fetchone()
+        if not row:
+            print(f"❌ 没有 {args.show} 的汇总")
+            sys.exit(1)
+        print(json.dumps(row[0], ensure_ascii=False, indent=2))
+        cursor.close()
+    else:
+        if args.rebuild:
+            # 清空指纹而不删除汇总，重建期间接口仍可读取旧的汇总
+            cursor = conn.cursor()
+            cursor.execute(CREATE_UNIVERSITY_SUMMARY_SQL)
+            cursor.execute(f"UPDATE {UNIVERSITY_SUMMARY_TABLE} SET source_hash = ''")
+            conn.commit()
+            cursor.close()
+        # 数据版本未变时也检查 university_details、major_rankings 的改动
+        _, failed = refresh_derived_tables(conn, names=[UNIVERSITY_SUMMARY_TABLE], force=True)
+    conn.close()
+    if failed:
+        sys.exit(1)
@@ -1,47 +1,93 @@
 """
 从Excel文件更新专业备注字段到数据库
+
+用法: python update_major_notes.py            逐行UPDATE
+      python update_major_notes.py --bulk     COPY到临时表后用一条关联UPDATE写入，
+                                              并统计实际匹配、变化和未匹配的记录数
 """
-import pandas as pd
-import psycopg2
 from psycopg2.extras import execute_batch
-from dotenv import load_dotenv
+import argparse
 import sys
 
+from bulk_loader import copy_rows, dataframe_rows
+from cleaning import clean_admission_data
+from dataset_version import bump_dataset_version
+from derived_tables import refresh_stale_tables
+from db import connect
+from excel_cache import load_source
+
 if sys.platform == 'win32':
     import io
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
-load_dotenv('../backend/.env')
-
-DB_CONFIG = {
-    'host': 'localhost',
-    'port': 5432,
-    'database': 'admission_query',
-    'user': 'postgres',
-    'password': 'rainworm'
-}
+parser = argparse.ArgumentParser(description='从Excel更新专业备注到数据库')
+parser.add_argument('--year', type=int, action='append',
+                    help='只更新指定年份（可重复指定），默认全部年份')
+parser.add_argument('--bulk', action='store_true',
+                    help='批量模式：COPY到临时表，一条关联UPDATE写入')
+args = parser.parse_args()
+
+# (year, university_name, major) 为一条备注对应的记录
+NOTE_KEY = ['year', 'university_name', 'major']
+NOTE_COLUMNS = NOTE_KEY + ['major_note']
+
+
+def bulk_update_notes(cursor, df):
+    """把备注COPY到临时表，用一条关联UPDATE写入，返回各项统计
+
+    同一 (年份, 院校, 专业) 在表格中出现多次时以最后一行为准（与逐行UPDATE的结果一致）。
+    只有备注实际变化的行会被改写。
+    """
+    notes = df.drop_duplicates(subset=NOTE_KEY, keep='last')
+    cursor.execute("""
+        CREATE TEMP TABLE major_note_stage (
+            year INTEGER,
+            university_name VARCHAR(200),
+            major VARCHAR(200),
+            major_note TEXT
+        ) ON COMMIT DROP
+    """)
+    copy_rows(cursor, dataframe_rows(notes, NOTE_COLUMNS),
+              table='major_note_stage', columns=NOTE_COLUMNS)
+    cursor.execute("ANALYZE major_note_stage")
+
+    join = "a.year = s.year AND a.university_name = s.university_name AND a.major = s.major"
+    cursor.execute(f"""
+        SELECT COUNT(*),
+               COUNT(*) FILTER (WHERE EXISTS (SELECT 1 FROM admission_data a WHERE {join}))
+        FROM major_note_stage s
+    """)
+    keys, matched_keys = cursor.fetchone()
+    cursor.execute(f"SELECT COUNT(*) FROM admission_data a JOIN major_note_stage s ON {join}")
+    matched_rows = cursor.fetchone()[0]
+
+    cursor.execute(f"""
+        UPDATE admission_data a
+        SET major_note = s.major_note
+        FROM major_note_stage s
+        WHERE {join}
+          AND a.major_note IS DISTINCT FROM s.major_note
+    """)
+    return {
+        'source_rows': len(df),
+        'source_duplicates': len(df) - len(notes),
+        'matched': matched_keys,
+        'unmatched': keys - matched_keys,
+        'matched_rows': matched_rows,
+        'changed': cursor.rowcount,
+    }
 
-EXCEL_FILE = '../22-25年全国高校在浙江的专业录取分数.xlsx'
 
 print("=== 从Excel更新专业备注到数据库 ===\n")
 
-# 读取Excel文件
+# 读取Excel文件（只需要这四列）
 print("步骤1: 读取Excel文件...")
-df = pd.read_excel(EXCEL_FILE)
+df = load_source(columns=['年份', '院校名称', '专业', '专业备注'], years=args.year)
 print(f"✅ 读取到 {len(df)} 行数据\n")
 
-# 重命名列
-column_mapping = {
-    '年份': 'year',
-    '院校名称': 'university_name',
-    '专业': 'major',
-    '专业备注': 'major_note'
-}
-df = df.rename(columns=column_mapping)
-
-# 清洗数据
-df['major_note'] = df['major_note'].apply(lambda x: x.strip() if pd.notna(x) and isinstance(x, str) else None)
+# 清洗数据（重命名列、去除空白，空备注为None）
+df = clean_admission_data(df)
 
 # 只保留有专业备注的记录
 df_with_notes = df[df['major_note'].notna()].copy()
@@ -49,7 +95,7 @@ print(f"步骤2: 找到 {len(df_with_notes)} 条有专业备注的记录\n")
 
 # 连接数据库
 print("步骤3: 连接数据库...")
-conn = psycopg2.connect(**DB_CONFIG)
+conn = connect()
 cursor = conn.cursor()
 
 # 显示一些示例
@@ -61,37 +107,57 @@ print()
 
 # 更新数据库
 print("步骤4: 更新数据库...")
-updated_count = 0
-batch_updates = []
-
-for idx, row in df_with_notes.iterrows():
-    batch_updates.append((
-        row['major_note'],
-        row['year'],
-        row['university_name'],
-        row['major']
-    ))
-
-# 批量更新
-update_sql = """
-    UPDATE admission_data
-    SET major_note = %s
-    WHERE year = %s
-      AND university_name = %s
-      AND major = %s
-"""
-
-try:
-    execute_batch(cursor, update_sql, batch_updates, page_size=1000)
-    conn.commit()
-    updated_count = len(batch_updates)
-    print(f"✅ 成功更新 {updated_count} 条记录\n")
-except Exception as e:
-    print(f"❌ 更新失败: {e}")
-    conn.rollback()
-    cursor.close()
-    conn.close()
-    sys.exit(1)
+if args.bulk:
+    try:
+        summary = bulk_update_notes(cursor, df_with_notes)
+        # 备注都没有变化时数据版本不变，派生表无需重建
+        if summary['changed']:
+            bump_dataset_version(cursor, 'update_major_notes --bulk')
+        conn.commit()
+    except Exception as e:
+        print(f"❌ 更新失败: {e}")
+        conn.rollback()
+        cursor.close()
+        conn.close()
+        sys.exit(1)
+    print(f"  表格中的备注: {summary['source_rows']} 条"
+          f"（重复的院校+专业 {summary['source_duplicates']} 条，以最后一条为准）")
+    print(f"  匹配到数据库记录: {summary['matched']} 条（对应 {summary['matched_rows']} 行）")
+    print(f"  未匹配: {summary['unmatched']} 条")
+    print(f"✅ 备注有变化并已更新: {summary['changed']} 行\n")
+else:
+    updated_count = 0
+    batch_updates = []
+
+    for idx, row in df_with_notes.iterrows():
+        batch_updates.append((
+            row['major_note'],
+            row['year'],
+            row['university_name'],
+            row['major']
+        ))
+
+    # 批量更新
+    update_sql = """
+        UPDATE admission_data
+        SET major_note = %s
+        WHERE year = %s
+          AND university_name = %s
+          AND major = %s
+    """
+
+    try:
+        execute_batch(cursor, update_sql, batch_updates, page_size=1000)
+        bump_dataset_version(cursor, 'update_major_notes')
+        conn.commit()
+        updated_count = len(batch_updates)
+        print(f"✅ 成功更新 {updated_count} 条记录\n")
+    except Exception as e:
+        print(f"❌ 更新失败: {e}")
+        conn.rollback()
+        cursor.close()
+        conn.close()
+        sys.exit(1)
 
 # 验证更新结果
 print("步骤5: 验证更新结果...")
@@ -123,3 +189,4 @@ cursor.close()
 conn.close()
 
 print("✅ 专业备注更新完成！")
+refresh_stale_tables()